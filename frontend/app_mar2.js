@@ -79,8 +79,40 @@ const appendMessage = (role, text) => {
   bubble.innerHTML = toSafeHtml(text);
   chatLog.appendChild(bubble);
   chatLog.scrollTop = chatLog.scrollHeight;
+  return bubble;
 };
 
+// Lee los eventos SSE de POST /chat/stream: invoca onDelta por cada fragmento
+// del LLM y devuelve el ChatResponse final (evento "done").
+async function readChatStream(response, onDelta) {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  let final = null;
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let sep;
+    while ((sep = buffer.indexOf("\n\n")) >= 0) {
+      const frame = buffer.slice(0, sep);
+      buffer = buffer.slice(sep + 2);
+      let event = "message";
+      const data = [];
+      for (const line of frame.split("\n")) {
+        if (line.startsWith("event:")) event = line.slice(6).trim();
+        else if (line.startsWith("data:")) data.push(line.slice(5).trimStart());
+      }
+      if (data.length === 0) continue;
+      const payload = JSON.parse(data.join("\n"));
+      if (event === "delta") onDelta(payload.text ?? "");
+      else if (event === "done") final = payload;
+      else if (event === "error") throw new Error(payload.detail || "Error en streaming");
+    }
+  }
+  return final;
+}
+
 const setSubmitting = (isSubmitting) => {
   form.querySelector("button").disabled = isSubmitting;
   input.disabled = isSubmitting;
@@ -97,7 +129,7 @@ form.addEventListener("submit", async (event) => {
 
   try {
     currentController = new AbortController();
-    const response = await fetch(`${API_BASE_URL}/chat/message`, {
+    const response = await fetch(`${API_BASE_URL}/chat/stream`, {
       method: "POST",
       headers: { "Content-Type": "application/json" },
       signal: currentController.signal,
@@ -109,12 +141,22 @@ form.addEventListener("submit", async (event) => {
       }),
     });
 
-    if (!response.ok) {
+    if (!response.ok || !response.body) {
       throw new Error(`Error HTTP ${response.status}`);
     }
 
-    const payload = await response.json();
-    appendMessage("bot", payload.reply ?? "Sin respuesta");
+    // La burbuja aparece con el primer fragmento (time-to-first-token)
+    let bubble = null;
+    let partial = "";
+    const payload = await readChatStream(response, (delta) => {
+      partial += delta;
+      if (!bubble) bubble = appendMessage("bot", partial);
+      else bubble.innerHTML = toSafeHtml(partial);
+      chatLog.scrollTop = chatLog.scrollHeight;
+    });
+    const reply = payload?.reply ?? (partial || "Sin respuesta");
+    if (!bubble) appendMessage("bot", reply);
+    else bubble.innerHTML = toSafeHtml(reply);
   } catch (error) {
     console.error(error);
     appendMessage(
@@ -222,7 +264,8 @@ ensureExitButton();
 //
 // Comportamiento
 // --------------
-// - Envía mensajes a POST /chat/message con channel="mar2" y bot_id="mar2".
+// - Envía mensajes a POST /chat/stream (SSE) con channel="mar2" y bot_id="mar2";
+//   la respuesta se va mostrando a medida que el LLM genera.
 // - No usa menú inicial ni reglas: conversa directo con el LLM (o placeholder),
 //   aunque puede mostrar un resumen de parámetros/pre_prompts provenientes del servidor.
 //
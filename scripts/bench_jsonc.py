@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""Micro-benchmark del cargador JSONC (versión actual vs. implementación previa) sobre FAQs de varios MB."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from services.orchestrator import jsonc  # noqa: E402
+
+
+def legacy_strip_json_comments(text: str) -> str:
+    """Copia de la implementación previa (rag._strip_json_comments: recorrido carácter a carácter)."""
+    result: list[str] = []
+    i = 0
+    n = len(text)
+    in_string = False
+    escaped = False
+    in_sl_comment = False
+    in_ml_comment = False
+    while i < n:
+        ch = text[i]
+        nxt = text[i + 1] if i + 1 < n else ""
+        if in_sl_comment:
+            if ch == "\n":
+                in_sl_comment = False
+                result.append(ch)
+            i += 1
+            continue
+        if in_ml_comment:
+            if ch == "*" and nxt == "/":
+                in_ml_comment = False
+                i += 2
+            else:
+                i += 1
+            continue
+        if in_string:
+            result.append(ch)
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            i += 1
+            continue
+        if ch == '"':
+            in_string = True
+            escaped = False
+            result.append(ch)
+            i += 1
+            continue
+        if ch == "/" and nxt == "/":
+            in_sl_comment = True
+            i += 2
+            continue
+        if ch == "/" and nxt == "*":
+            in_ml_comment = True
+            i += 2
+            continue
+        result.append(ch)
+        i += 1
+    return "".join(result)
+
+
+def legacy_load(path: Path) -> object:
+    return json.loads(legacy_strip_json_comments(path.read_text(encoding="utf-8")))
+
+
+def synthetic_faqs(size_mb: float) -> str:
+    """Archivo de FAQs tipo municipal_faqs.json con comentarios, URLs y comillas escapadas."""
+    parts = ["/* FAQs sintéticas para benchmark */\n["]
+    size = 0
+    i = 0
+    target = int(size_mb * 1024 * 1024)
+    while size < target:
+        entry = (
+            f'  // Trámite {i}\n'
+            f'  {{"uid": "faq-{i:06d}", "question": "¿Cómo hago el trámite {i} /* online */?", '
+            f'"answer": "Ingresá a https://tramites.municipio.gob/t/{i} y elegí \\"Iniciar\\". '
+            f'Atención de lunes a viernes de 8 a 14 hs en la oficina de Mesa de Entradas.", '
+            f'"tags": ["tramite", "online", "t{i % 50}"]}},\n'
+        )
+        parts.append(entry)
+        size += len(entry)
+        i += 1
+    parts[-1] = parts[-1].rstrip(",\n") + "\n"
+    parts.append("]\n")
+    return "".join(parts)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=float, default=4.0, help="Tamaño del archivo sintético (default 4 MB)")
+    parser.add_argument("--repeat", type=int, default=3, help="Repeticiones por medición (default 3)")
+    parser.add_argument("--file", type=Path, default=None, help="Usar un archivo JSONC existente en lugar del sintético")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.file
+        if path is None:
+            path = Path(tmp) / "faqs.json"
+            path.write_text(synthetic_faqs(args.size_mb), encoding="utf-8")
+
+        if legacy_load(path) != jsonc.load(path):
+            print("ERROR: el resultado difiere de la implementación previa", file=sys.stderr)
+            return 1
+
+        t_old = min(timeit.repeat(lambda: legacy_load(path), number=args.repeat, repeat=3))
+        t_new = min(timeit.repeat(lambda: jsonc.load(path), number=args.repeat, repeat=3))
+        size = path.stat().st_size
+    print(f"archivo: {size / 1024 / 1024:.2f} MB, {args.repeat} iteraciones")
+    print(f"previo : {t_old / args.repeat * 1e3:8.2f} ms/carga")
+    print(f"actual : {t_new / args.repeat * 1e3:8.2f} ms/carga")
+    print(f"speedup: {t_old / t_new:5.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""Benchmark end-to-end de ChatOrchestrator.respond por camino de ruteo.
+
+Reproduce un corpus de consultas municipales (chips del menú, FAQ/reglas,
+preguntas de la KB y consultas desconocidas) contra el orquestador en
+proceso y reporta p50/p95/p99 por camino (`source` de la respuesta: faq,
+rag, llm, fallback). Con `--kb-size N` amplía la KB con N entradas
+sintéticas (10k–1M) para medir cómo escala el RAG en latencia y memoria.
+
+Modo regresión: `--save-baseline` guarda los resultados (por tamaño de KB) y
+`--check` falla (exit 1) si el p95 de algún camino o la memoria superan la
+línea base más la tolerancia.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import json
+import random
+import resource
+import sys
+import time
+from pathlib import Path
+from typing import Any, Sequence
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from services.chatbots.models import defaults_for  # noqa: E402
+from services.orchestrator.rag import KnowledgeEntry, SimpleRagResponder, _tokenize  # noqa: E402
+from services.orchestrator.schema import ChatRequest  # noqa: E402
+from services.orchestrator.service import ChatOrchestrator  # noqa: E402
+
+DEFAULT_BASELINE = PROJECT_ROOT / "scripts" / "baselines" / "bench_orchestrator.json"
+
+# Consultas que resuelven reglas por defecto (horarios, pagos, turnos, saludo)
+FAQ_QUERIES = (
+    "¿Cuál es el horario de atención?",
+    "¿Cómo pago mis impuestos?",
+    "Quiero sacar un turno",
+    "Necesito el contacto de la municipalidad",
+    "Quiero hacer un reclamo",
+    "hola",
+)
+# Opciones numéricas y palabras clave del menú (frontend/app.js)
+MENU_KEYWORDS = ("menu", "ayuda", "1", "2", "3", "4", "5", "6")
+UNKNOWN_QUERIES = (
+    "¿Cuál es la capital de Marte?",
+    "asdf qwerty",
+    "¿Quién ganó el mundial de 1950?",
+    "Recomendame una receta de ñoquis",
+    "¿Cuánto es la raíz cuadrada de 2?",
+    "contame un chiste",
+)
+
+
+def build_corpus(entries: Sequence[KnowledgeEntry], seed: int = 7, rag_sample: int = 40) -> list[tuple[str, str]]:
+    """Corpus (categoría, mensaje): menú, FAQ, preguntas de la KB y desconocidas."""
+    rng = random.Random(seed)
+    menu = [m.message for m in defaults_for("municipal").menu_suggestions] + list(MENU_KEYWORDS)
+    real = [e for e in entries if not e.uid.startswith("syn-")]
+    sample = rng.sample(real, min(rag_sample, len(real))) if real else []
+    # Variantes como las escribe la gente: sin signos, en minúscula
+    rag = [e.question.lower().strip("¿?¡! ") for e in sample]
+    corpus = (
+        [("menu", m) for m in menu]
+        + [("faq", q) for q in FAQ_QUERIES]
+        + [("rag", q) for q in rag]
+        + [("unknown", q) for q in UNKNOWN_QUERIES]
+    )
+    rng.shuffle(corpus)
+    return corpus
+
+
+def vocabulary_from(entries: Sequence[KnowledgeEntry]) -> list[str]:
+    words = sorted({t for e in entries for t in _tokenize(f"{e.question} {e.answer}") if len(t) > 3})
+    return words or ["tramite", "municipal", "turno", "licencia", "tasa", "oficina", "servicio", "barrio"]
+
+
+def synthetic_entries(n: int, vocabulary: Sequence[str], seed: int = 13) -> list[KnowledgeEntry]:
+    """N entradas con vocabulario de la KB real (la similitud se comporta como en producción)."""
+    rng = random.Random(seed)
+    out: list[KnowledgeEntry] = []
+    for i in range(n):
+        question = " ".join(rng.choices(vocabulary, k=rng.randint(5, 10)))
+        answer = " ".join(rng.choices(vocabulary, k=rng.randint(25, 60)))
+        tags = tuple(rng.sample(vocabulary, k=min(3, len(vocabulary))))
+        out.append(KnowledgeEntry(uid=f"syn-{i:07d}", question=question, answer=answer, tags=tags))
+    return out
+
+
+def rss_mb() -> float:
+    """Pico de memoria residente del proceso (ru_maxrss está en KB en Linux)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024.0 if sys.platform != "darwin" else peak / (1024.0 * 1024.0)
+
+
+def percentile(ordered: Sequence[float], q: float) -> float:
+    """Percentil por rango más cercano sobre una lista ya ordenada."""
+    if not ordered:
+        return 0.0
+    rank = max(1, min(len(ordered), int(round(q * len(ordered) + 0.5))))
+    return ordered[rank - 1]
+
+
+def summarize(samples: dict[str, list[float]]) -> dict[str, dict[str, float]]:
+    out: dict[str, dict[str, float]] = {}
+    for key, values in sorted(samples.items()):
+        ordered = sorted(values)
+        out[key] = {
+            "count": len(ordered),
+            "mean_ms": sum(ordered) / len(ordered) * 1e3 if ordered else 0.0,
+            "p50_ms": percentile(ordered, 0.50) * 1e3,
+            "p95_ms": percentile(ordered, 0.95) * 1e3,
+            "p99_ms": percentile(ordered, 0.99) * 1e3,
+        }
+    return out
+
+
+def build_orchestrator(kb_size: int, seed: int) -> tuple[ChatOrchestrator, float]:
+    """Orquestador con la KB real más `kb_size` entradas sintéticas; devuelve el tiempo de indexado."""
+    orchestrator = ChatOrchestrator()
+    if kb_size <= 0:
+        return orchestrator, 0.0
+    real = list(orchestrator._rag_entries or [])
+    entries = real + synthetic_entries(kb_size, vocabulary_from(real), seed)
+    started = time.perf_counter()
+    responder = SimpleRagResponder(entries, threshold=0.28)
+    build_s = time.perf_counter() - started
+    orchestrator._rag_entries = entries
+    orchestrator._rag_cache = {0.28: responder}
+    orchestrator._static_replies.clear()
+    orchestrator.attach_rag(responder)
+    return orchestrator, build_s
+
+
+async def replay(
+    orchestrator: ChatOrchestrator,
+    corpus: Sequence[tuple[str, str]],
+    *,
+    rounds: int,
+    warmup: int,
+    channel: str = "web",
+    bot_id: str | None = None,
+) -> tuple[dict[str, list[float]], dict[str, list[float]]]:
+    """Ejecuta el corpus `warmup + rounds` veces; devuelve latencias por camino y por categoría."""
+    by_path: dict[str, list[float]] = {}
+    by_category: dict[str, list[float]] = {}
+    for round_idx in range(warmup + rounds):
+        for i, (category, message) in enumerate(corpus):
+            request = ChatRequest(session_id=f"bench-{round_idx}-{i}", message=message, channel=channel, bot_id=bot_id)
+            started = time.perf_counter()
+            response = await orchestrator.respond(request)
+            elapsed = time.perf_counter() - started
+            if round_idx < warmup:
+                continue
+            by_path.setdefault(response.source, []).append(elapsed)
+            by_category.setdefault(category, []).append(elapsed)
+    return by_path, by_category
+
+
+def check_regression(
+    result: dict[str, Any], baseline: dict[str, Any], *, tolerance: float, slack_ms: float
+) -> list[str]:
+    """Compara p95 por camino y memoria contra la línea base; devuelve las violaciones."""
+    failures: list[str] = []
+    for path, stats in result["paths"].items():
+        base = baseline.get("paths", {}).get(path)
+        if not base:
+            continue
+        limit = base["p95_ms"] * (1 + tolerance) + slack_ms
+        if stats["p95_ms"] > limit:
+            failures.append(f"{path}: p95 {stats['p95_ms']:.2f} ms > {limit:.2f} ms (base {base['p95_ms']:.2f})")
+    base_rss = baseline.get("rss_mb")
+    if base_rss and result["rss_mb"] > base_rss * (1 + tolerance):
+        failures.append(f"memoria: {result['rss_mb']:.1f} MB > {base_rss * (1 + tolerance):.1f} MB (base {base_rss:.1f})")
+    return failures
+
+
+def run_benchmark(kb_size: int, *, rounds: int, warmup: int, seed: int, channel: str = "web") -> dict[str, Any]:
+    gc.collect()
+    orchestrator, build_s = build_orchestrator(kb_size, seed)
+    corpus = build_corpus(orchestrator._rag_entries or [], seed)
+    by_path, by_category = asyncio.run(replay(orchestrator, corpus, rounds=rounds, warmup=warmup, channel=channel))
+    return {
+        "kb_size": kb_size,
+        "kb_entries": len(orchestrator._rag_entries or []),
+        "index_build_s": build_s,
+        "queries": sum(len(v) for v in by_path.values()),
+        "paths": summarize(by_path),
+        "categories": summarize(by_category),
+        "rss_mb": rss_mb(),
+    }
+
+
+def _print_table(title: str, table: dict[str, dict[str, float]]) -> None:
+    print(f"{title:<10} {'n':>6} {'mean':>9} {'p50':>9} {'p95':>9} {'p99':>9}  (ms)")
+    for key, s in table.items():
+        print(f"{key:<10} {s['count']:>6} {s['mean_ms']:>9.3f} {s['p50_ms']:>9.3f} {s['p95_ms']:>9.3f} {s['p99_ms']:>9.3f}")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--kb-size", type=int, nargs="+", default=[0], help="Entradas sintéticas extra (p. ej. 10000 100000 1000000)")
+    parser.add_argument("--rounds", type=int, default=5, help="Pasadas medidas del corpus (default 5)")
+    parser.add_argument("--warmup", type=int, default=1, help="Pasadas de calentamiento no medidas (default 1)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--channel", default="web")
+    parser.add_argument("--json", action="store_true", help="Imprimir el resultado como JSON")
+    parser.add_argument("--save-baseline", type=Path, nargs="?", const=DEFAULT_BASELINE, help="Guardar como línea base")
+    parser.add_argument("--check", type=Path, nargs="?", const=DEFAULT_BASELINE, help="Comparar contra la línea base")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Margen relativo permitido (default 0.25)")
+    parser.add_argument("--slack-ms", type=float, default=0.5, help="Margen absoluto para caminos sub-ms (default 0.5)")
+    args = parser.parse_args(argv)
+
+    results = [
+        run_benchmark(size, rounds=args.rounds, warmup=args.warmup, seed=args.seed, channel=args.channel)
+        for size in args.kb_size
+    ]
+
+    if args.json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+    else:
+        for result in results:
+            print(
+                f"\nKB: {result['kb_entries']} entradas (+{result['kb_size']} sintéticas), "
+                f"indexado {result['index_build_s']:.2f} s, {result['queries']} consultas, "
+                f"RSS pico {result['rss_mb']:.1f} MB"
+            )
+            _print_table("camino", result["paths"])
+            _print_table("categoría", result["categories"])
+
+    if args.save_baseline:
+        store: dict[str, Any] = {}
+        if args.save_baseline.exists():
+            store = json.loads(args.save_baseline.read_text(encoding="utf-8"))
+        for result in results:
+            store[f"kb_{result['kb_size']}"] = {"paths": result["paths"], "rss_mb": result["rss_mb"]}
+        args.save_baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.save_baseline.write_text(json.dumps(store, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"\nLínea base guardada en {args.save_baseline}")
+
+    if args.check:
+        if not args.check.exists():
+            print(f"ERROR: no existe la línea base {args.check} (generala con --save-baseline)", file=sys.stderr)
+            return 2
+        store = json.loads(args.check.read_text(encoding="utf-8"))
+        failures: list[str] = []
+        for result in results:
+            baseline = store.get(f"kb_{result['kb_size']}")
+            if baseline is None:
+                print(f"AVISO: sin línea base para kb_{result['kb_size']}", file=sys.stderr)
+                continue
+            failures += [f"kb_{result['kb_size']} {f}" for f in check_regression(
+                result, baseline, tolerance=args.tolerance, slack_ms=args.slack_ms
+            )]
+        if failures:
+            print("\nREGRESIÓN:", *failures, sep="\n- ", file=sys.stderr)
+            return 1
+        print("\nSin regresiones respecto de la línea base.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
+
+# ================================================================
+# Guía de uso (Benchmark del orquestador)
+# ================================================================
+#
+# python scripts/bench_orchestrator.py                         # KB real, 5 pasadas
+# python scripts/bench_orchestrator.py --kb-size 10000 100000  # escalado del RAG
+# python scripts/bench_orchestrator.py --kb-size 0 10000 --save-baseline   # máquina de referencia
+# python scripts/bench_orchestrator.py --kb-size 0 10000 --check           # CI: exit 1 si empeora
+#
+# Consideraciones
+# ---------------
+# - Las líneas base dependen del hardware: generarlas y verificarlas en la misma máquina
+#   (default scripts/baselines/bench_orchestrator.json, una clave por tamaño de KB).
+# - Sin modelo configurado el camino "llm" mide sólo ruteo + armado de prompt (el cliente
+#   devuelve el placeholder al instante); el cache de respuestas se puede desactivar con
+#   WEBCHATBOT_ANSWER_CACHE=0.
+# - El RSS es el pico del proceso: para comparar tamaños de KB conviene una corrida por tamaño.
+# - 1M entradas con el RAG léxico en memoria requiere varios GB y minutos de indexado.
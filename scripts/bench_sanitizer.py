@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""Micro-benchmark del sanitizador de salidas (versión actual vs. implementación previa)."""
+
+from __future__ import annotations
+
+import argparse
+import re
+import sys
+import timeit
+from pathlib import Path
+from urllib.parse import urlparse
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from services.chatbots.models import defaults_for  # noqa: E402
+from services.orchestrator.sanitizer import _sanitize_llm_output  # noqa: E402
+
+
+def legacy_sanitize(text: str, allowed_domains: list[str] | None = None, pre_prompts: list[str] | None = None) -> str:
+    """Copia de la implementación previa (regex sin precompilar, closure por línea)."""
+    s = text
+    normalized_pre: set[str] = set()
+    if pre_prompts:
+        for p in pre_prompts:
+            val = p.strip()
+            if val:
+                normalized_pre.add(val.lower())
+    s = re.sub(r"```[\s\S]*?```", "", s)
+    drop_patterns = (
+        r"^\s*respuesta\s*:.*$",
+        r"^\s*respuesta\s+final\s*:.*$",
+        r"^\s*resposta\s*:.*$",
+        r"^\s*resposta\s+final\s*:.*$",
+        r"^\s*answer\s*:.*$",
+        r"^\s*response\s*:.*$",
+        r"^\s*la\s+respuesta\s+es.*$",
+        r"^\s*explicaci[oó]n.*$",
+        r"^\s*evaluaci[oó]n.*$",
+        r"^\s*comentari[oa]s?\s*:.*$",
+        r"^\s*language\s*:.*$",
+        r"^\s*idioma\s*:.*$",
+        r"^\s*tags?\s*:.*$",
+        r"^\s*c[oó]digo\s*:.*$",
+        r"^\s*segu[ií]\s+estas\s+instrucciones\s+al\s+responder\s*:?.*$",
+        r"^\s*us[aá]\s+exclusivamente\s+el\s+contexto\s+provisto\s+para\s+responder.*$",
+        r"^\s*\"\"\".*$",
+        r"^\s*'''.*$",
+        r"^\s*tests?\s+the\s+response.*$",
+    )
+    lines: list[str] = []
+    for raw in s.splitlines():
+        l = raw.strip()
+        low = l.lower()
+        if any(re.match(p, low) for p in drop_patterns):
+            continue
+        if l.startswith("```"):
+            continue
+        if re.match(r"^(def\s+|class\s+|from\s+\S+\s+import\s+|import\s+\S+)", l):
+            continue
+        if normalized_pre:
+            candidate = low[2:].strip() if low.startswith("- ") else low
+            if candidate in normalized_pre:
+                continue
+        if allowed_domains:
+            def _filter_urls(segment: str) -> str:
+                def _repl(m):
+                    url = m.group(0)
+                    try:
+                        netloc = urlparse(url).netloc.lower()
+                        if any(netloc.endswith(d.lower()) for d in allowed_domains):
+                            return url
+                    except Exception:
+                        pass
+                    return ""
+                return re.sub(r"https?://[^\s)]+", _repl, segment)
+            l = _filter_urls(l)
+        lines.append(l)
+    cleaned: list[str] = []
+    prev = None
+    for l in lines:
+        if not l:
+            if cleaned and cleaned[-1] == "":
+                continue
+            cleaned.append("")
+            prev = ""
+            continue
+        if l == prev:
+            continue
+        cleaned.append(l)
+        prev = l
+    return "\n".join(cleaned).strip()
+
+
+def synthetic_llm_output(paragraphs: int) -> str:
+    """Salida tipo LLM larga: viñetas, URLs permitidas/no permitidas, meta y código."""
+    block = (
+        "Respuesta: para sacar la licencia de conducir:\n"
+        "- Pedí turno en https://tramites.municipio.gob/licencias (sección turnos).\n"
+        "- Presentá DNI y certificado de grupo sanguíneo.\n"
+        "- Consultá requisitos en http://ejemplo-no-oficial.com/licencia?x=1\n"
+        "\n"
+        "Preferí fuentes oficiales y mencioná el área responsable cuando aplique.\n"
+        "```python\nprint('hola')\n```\n"
+        "La oficina atiende de lunes a viernes de 8 a 14 hs.\n"
+        "La oficina atiende de lunes a viernes de 8 a 14 hs.\n"
+        "Explicación: el texto anterior resume los pasos.\n"
+    )
+    return block * paragraphs
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--paragraphs", type=int, default=200, help="Bloques por texto sintético (default 200)")
+    parser.add_argument("--repeat", type=int, default=20, help="Repeticiones por medición (default 20)")
+    args = parser.parse_args()
+
+    st = defaults_for("municipal")
+    allowed, pre = list(st.allowed_domains), list(st.pre_prompts)
+    text = synthetic_llm_output(args.paragraphs)
+
+    if legacy_sanitize(text, allowed, pre) != _sanitize_llm_output(text, allowed, pre):
+        print("ERROR: la salida difiere de la implementación previa", file=sys.stderr)
+        return 1
+
+    t_old = min(timeit.repeat(lambda: legacy_sanitize(text, allowed, pre), number=args.repeat, repeat=3))
+    t_new = min(timeit.repeat(lambda: _sanitize_llm_output(text, allowed, pre), number=args.repeat, repeat=3))
+    lines = text.count("\n")
+    print(f"texto: {len(text)} chars / {lines} líneas, {args.repeat} iteraciones")
+    print(f"previo : {t_old / args.repeat * 1e3:8.2f} ms/llamada")
+    print(f"actual : {t_new / args.repeat * 1e3:8.2f} ms/llamada")
+    print(f"speedup: {t_old / t_new:5.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
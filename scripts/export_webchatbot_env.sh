@@ -43,6 +43,9 @@ if [[ -n "${LLM_MODEL_PATH:-}" && ! -f "${LLM_MODEL_PATH}" ]]; then
     echo "       Ajustá WEBCHATBOT_DEFAULT_LLM_MODEL_PATH o exportá LLM_MODEL_PATH antes de activar el venv." >&2
 fi
 
+# Estados KV de prefijos por bot (LLM_PREFIX_CACHE_DIR): arranques en caliente.
+export LLM_PREFIX_CACHE_DIR="${LLM_PREFIX_CACHE_DIR:-${PROJECT_ROOT}/modelos/kv_cache}"
+
 # Directorio base de datos/conocimiento para usos futuros.
 export WEBCHATBOT_DATA_DIR="${WEBCHATBOT_DATA_DIR:-${PROJECT_ROOT}/knowledge}"
 
@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""Generador de carga HTTP para /chat/message y /chat/stream (httpx, asyncio).
+
+Simula ciudadanos con el flujo del cliente web (frontend/app.js): cada sesión
+pide los chips de `/chatbots/<bot>/settings`, escribe "ayuda", elige una
+opción numérica del menú, toca un chip y hace una consulta libre, con pausas
+de lectura entre mensajes.
+
+Dos modelos de carga:
+- `--concurrency N` (cerrado): N usuarios virtuales, cada uno espera su
+  respuesta antes de enviar el siguiente mensaje.
+- `--rps R` (abierto): llegadas a tasa fija, independientes de la latencia
+  (revela colas que el modelo cerrado oculta); `--max-inflight` acota.
+
+Reporta throughput, tasa de error (503 del planificador aparte) e
+histogramas de latencia tipo HDR (error relativo < 1%) por endpoint; en
+streaming también el tiempo al primer fragmento.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterator
+
+import httpx
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+FREE_QUESTIONS = (
+    "¿Cuál es el horario de atención?",
+    "¿Cómo pago mis impuestos?",
+    "¿Dónde pago la tasa de abasto?",
+    "Quiero hacer un reclamo por una luminaria",
+    "¿Qué necesito para la licencia de conducir?",
+    "¿Cuál es la capital de Marte?",
+)
+FALLBACK_CHIPS = ("¿Qué trámites puedo hacer online?", "Necesito números de contacto y emergencias")
+PERCENTILES = (0.50, 0.90, 0.95, 0.99, 0.999)
+
+
+class LatencyHistogram:
+    """Histograma log-lineal tipo HDR en microsegundos.
+
+    Cada potencia de 2 se divide en 2**sub_bucket_bits sub-buckets: el error
+    relativo de cualquier percentil es < 1/2**sub_bucket_bits en todo el rango
+    (1 µs a minutos) con memoria acotada.
+    """
+
+    def __init__(self, sub_bucket_bits: int = 7) -> None:
+        self.sub_bits = sub_bucket_bits
+        self.counts: dict[tuple[int, int], int] = {}
+        self.total = 0
+        self.sum_us = 0
+        self.min_us = 0
+        self.max_us = 0
+
+    def record(self, seconds: float) -> None:
+        value = max(1, int(seconds * 1e6))
+        shift = max(0, value.bit_length() - (self.sub_bits + 1))
+        key = (shift, value >> shift)
+        self.counts[key] = self.counts.get(key, 0) + 1
+        self.total += 1
+        self.sum_us += value
+        self.min_us = value if self.total == 1 else min(self.min_us, value)
+        self.max_us = max(self.max_us, value)
+
+    def merge(self, other: LatencyHistogram) -> None:
+        for key, n in other.counts.items():
+            self.counts[key] = self.counts.get(key, 0) + n
+        if other.total:
+            self.min_us = other.min_us if not self.total else min(self.min_us, other.min_us)
+        self.total += other.total
+        self.sum_us += other.sum_us
+        self.max_us = max(self.max_us, other.max_us)
+
+    def value_at(self, q: float) -> float:
+        """Latencia (ms) en el percentil q ∈ [0, 1] (límite superior del bucket)."""
+        if not self.total:
+            return 0.0
+        target = max(1, int(q * self.total + 0.999999))
+        seen = 0
+        for shift, sub in sorted(self.counts):
+            seen += self.counts[(shift, sub)]
+            if seen >= target:
+                return min(self.max_us, ((sub + 1) << shift) - 1) / 1e3
+        return self.max_us / 1e3
+
+    def summary(self) -> dict[str, float]:
+        out = {f"p{q * 100:g}_ms": self.value_at(q) for q in PERCENTILES}
+        out.update(
+            count=self.total,
+            mean_ms=(self.sum_us / self.total / 1e3) if self.total else 0.0,
+            min_ms=self.min_us / 1e3,
+            max_ms=self.max_us / 1e3,
+        )
+        return out
+
+    def distribution(self, steps: int = 12) -> list[tuple[float, float]]:
+        """Escalera de percentiles estilo HdrHistogram: 50%, 75%, 87.5%, ... (percentil, ms)."""
+        ladder: list[tuple[float, float]] = []
+        q = 0.5
+        for _ in range(steps):
+            ladder.append((q, self.value_at(q)))
+            q = 1 - (1 - q) / 2
+        ladder.append((1.0, self.max_us / 1e3))
+        return ladder
+
+
+@dataclass
+class EndpointStats:
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+    first_chunk: LatencyHistogram = field(default_factory=LatencyHistogram)
+    ok: int = 0
+    rejected: int = 0  # 503/429: planificador saturado o rate limit
+    errors: dict[str, int] = field(default_factory=dict)
+
+    def error(self, kind: str) -> None:
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    @property
+    def requests(self) -> int:
+        return self.ok + self.rejected + sum(self.errors.values())
+
+
+def session_flow(rng: random.Random, chips: list[str]) -> list[str]:
+    """Mensajes de una sesión típica del cliente web municipal."""
+    return [
+        "ayuda",
+        str(rng.randint(1, 6)),
+        rng.choice(chips or list(FALLBACK_CHIPS)),
+        rng.choice(FREE_QUESTIONS),
+    ]
+
+
+class LoadRunner:
+    """Ejecuta sesiones contra la API y acumula estadísticas por endpoint."""
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        *,
+        endpoint: str = "message",
+        bot_id: str = "municipal",
+        channel: str = "web",
+        think_s: float = 0.0,
+        seed: int = 7,
+    ) -> None:
+        self.client = client
+        self.endpoint = endpoint
+        self.bot_id = bot_id
+        self.channel = channel
+        self.think_s = think_s
+        self.rng = random.Random(seed)
+        self.stats: dict[str, EndpointStats] = {}
+        self.chips: list[str] | None = None
+
+    def _stats(self, name: str) -> EndpointStats:
+        return self.stats.setdefault(name, EndpointStats())
+
+    async def fetch_chips(self) -> list[str]:
+        """GET de settings como hace el cliente al abrir la página (también se mide)."""
+        stats = self._stats("settings")
+        started = time.perf_counter()
+        try:
+            resp = await self.client.get(f"/chatbots/{self.bot_id}/settings", params={"channel": self.channel})
+        except httpx.HTTPError as exc:
+            stats.error(type(exc).__name__)
+            return self.chips or []
+        stats.latency.record(time.perf_counter() - started)
+        if resp.status_code != 200:
+            stats.error(str(resp.status_code))
+            return self.chips or []
+        stats.ok += 1
+        items = resp.json().get("menu_suggestions") or []
+        self.chips = [str(it.get("message")) for it in items if it.get("message")]
+        return self.chips
+
+    def _pick_endpoint(self) -> str:
+        if self.endpoint == "mixed":
+            return self.rng.choice(("message", "stream"))
+        return self.endpoint
+
+    async def send(self, session_id: str, message: str) -> None:
+        endpoint = self._pick_endpoint()
+        payload = {"session_id": session_id, "message": message, "channel": self.channel, "bot_id": self.bot_id}
+        stats = self._stats(endpoint)
+        started = time.perf_counter()
+        try:
+            if endpoint == "stream":
+                status = await self._send_stream(payload, stats, started)
+            else:
+                resp = await self.client.post("/chat/message", json=payload)
+                status = resp.status_code
+        except httpx.HTTPError as exc:
+            stats.error(type(exc).__name__)
+            return
+        elapsed = time.perf_counter() - started
+        if status == 200:
+            stats.ok += 1
+            stats.latency.record(elapsed)
+        elif status in {429, 503}:
+            stats.rejected += 1
+        else:
+            stats.error(str(status))
+
+    async def _send_stream(self, payload: dict[str, Any], stats: EndpointStats, started: float) -> int:
+        async with self.client.stream("POST", "/chat/stream", json=payload) as resp:
+            if resp.status_code != 200:
+                await resp.aread()
+                return resp.status_code
+            first = True
+            async for line in resp.aiter_lines():
+                if first and line.startswith("event:"):
+                    stats.first_chunk.record(time.perf_counter() - started)
+                    first = False
+                if line.startswith("event: error"):
+                    return 500
+            return 200
+
+    async def run_session(self) -> None:
+        chips = await self.fetch_chips()
+        session_id = str(uuid.uuid4())
+        for message in session_flow(self.rng, chips):
+            await self.send(session_id, message)
+            if self.think_s > 0:
+                await asyncio.sleep(self.rng.expovariate(1.0 / self.think_s))
+
+    def _messages(self) -> Iterator[tuple[str, str]]:
+        """Secuencia infinita (session_id, mensaje) intercalando sesiones (modelo abierto)."""
+        while True:
+            session_id = str(uuid.uuid4())
+            for message in session_flow(self.rng, self.chips or []):
+                yield session_id, message
+
+    async def closed_loop(self, concurrency: int, duration_s: float) -> None:
+        deadline = time.monotonic() + duration_s
+
+        async def _user() -> None:
+            while time.monotonic() < deadline:
+                await self.run_session()
+
+        await asyncio.gather(*(_user() for _ in range(concurrency)))
+
+    async def open_loop(self, rps: float, duration_s: float, max_inflight: int) -> int:
+        """Lanza mensajes a tasa fija; devuelve cuántos se descartaron por `max_inflight`."""
+        await self.fetch_chips()
+        interval = 1.0 / rps
+        inflight: set[asyncio.Task[None]] = set()
+        dropped = 0
+        messages = self._messages()
+        started = time.monotonic()
+        for n in itertools.count():
+            at = started + n * interval
+            if at - started >= duration_s:
+                break
+            await asyncio.sleep(max(0.0, at - time.monotonic()))
+            if len(inflight) >= max_inflight:
+                dropped += 1
+                continue
+            session_id, message = next(messages)
+            task = asyncio.create_task(self.send(session_id, message))
+            inflight.add(task)
+            task.add_done_callback(inflight.discard)
+        if inflight:
+            await asyncio.gather(*inflight)
+        return dropped
+
+
+def build_client(args: argparse.Namespace) -> httpx.AsyncClient:
+    timeout = httpx.Timeout(args.timeout, connect=5.0)
+    if args.in_process:
+        from services.api.main import create_app
+
+        transport = httpx.ASGITransport(app=create_app())
+        return httpx.AsyncClient(transport=transport, base_url="http://in-process", timeout=timeout)
+    limits = httpx.Limits(max_connections=max(args.concurrency, args.max_inflight), max_keepalive_connections=args.concurrency)
+    return httpx.AsyncClient(base_url=args.base_url.rstrip("/"), timeout=timeout, limits=limits)
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    async with build_client(args) as client:
+        runner = LoadRunner(
+            client,
+            endpoint=args.endpoint,
+            bot_id=args.bot,
+            channel=args.channel,
+            think_s=args.think_ms / 1000.0,
+            seed=args.seed,
+        )
+        started = time.perf_counter()
+        dropped = 0
+        if args.rps:
+            dropped = await runner.open_loop(args.rps, args.duration, args.max_inflight)
+        else:
+            await runner.closed_loop(args.concurrency, args.duration)
+        elapsed = time.perf_counter() - started
+
+    report: dict[str, Any] = {
+        "mode": f"open {args.rps} rps" if args.rps else f"closed {args.concurrency} usuarios",
+        "elapsed_s": elapsed,
+        "dropped": dropped,
+        "endpoints": {},
+    }
+    for name, stats in sorted(runner.stats.items()):
+        requests = stats.requests
+        entry: dict[str, Any] = {
+            "requests": requests,
+            "ok": stats.ok,
+            "rejected": stats.rejected,
+            "errors": stats.errors,
+            "error_rate": (requests - stats.ok) / requests if requests else 0.0,
+            "throughput_rps": stats.ok / elapsed if elapsed > 0 else 0.0,
+            "latency": stats.latency.summary(),
+        }
+        if stats.first_chunk.total:
+            entry["first_chunk"] = stats.first_chunk.summary()
+        if args.histogram:
+            entry["distribution"] = stats.latency.distribution()
+        report["endpoints"][name] = entry
+    return report
+
+
+def print_report(report: dict[str, Any]) -> None:
+    print(f"modo: {report['mode']}, duración {report['elapsed_s']:.1f} s, descartados {report['dropped']}")
+    for name, e in report["endpoints"].items():
+        lat = e["latency"]
+        print(
+            f"\n[{name}] {e['requests']} req, ok {e['ok']}, 503/429 {e['rejected']}, "
+            f"errores {sum(e['errors'].values())} ({e['error_rate'] * 100:.2f}%), {e['throughput_rps']:.1f} req/s"
+        )
+        if e["errors"]:
+            print("  errores:", ", ".join(f"{k}={v}" for k, v in sorted(e["errors"].items())))
+        print("  latencia ms: " + "  ".join(f"{k[:-3]}={lat[k]:.2f}" for k in lat if k.startswith("p")) + f"  max={lat['max_ms']:.2f}")
+        if "first_chunk" in e:
+            fc = e["first_chunk"]
+            print("  1er fragmento ms: " + "  ".join(f"{k[:-3]}={fc[k]:.2f}" for k in fc if k.startswith("p")))
+        for q, value in e.get("distribution", []):
+            print(f"    {q * 100:10.5f}%  {value:10.2f} ms")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--in-process", action="store_true", help="Levantar la app en el mismo proceso (httpx.ASGITransport)")
+    parser.add_argument("--endpoint", choices=("message", "stream", "mixed"), default="message")
+    parser.add_argument("--concurrency", type=int, default=10, help="Usuarios virtuales (modelo cerrado)")
+    parser.add_argument("--rps", type=float, default=0.0, help="Tasa de llegadas (modelo abierto; ignora --concurrency)")
+    parser.add_argument("--max-inflight", type=int, default=256, help="Tope de solicitudes simultáneas en modelo abierto")
+    parser.add_argument("--duration", type=float, default=30.0, help="Segundos de carga")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="Pausa media entre mensajes de una sesión")
+    parser.add_argument("--bot", default="municipal")
+    parser.add_argument("--channel", default="web")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--histogram", action="store_true", help="Mostrar la distribución completa de percentiles")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        print_report(report)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
+
+# ================================================================
+# Guía de uso (Generador de carga)
+# ================================================================
+#
+# API corriendo aparte (medición realista, incluye red y uvicorn):
+#   python scripts/load_chat.py --concurrency 50 --duration 60 --think-ms 2000
+#   python scripts/load_chat.py --rps 20 --endpoint stream --histogram
+# En proceso (sin servidor; útil en CI o para perfilar el pipeline):
+#   python scripts/load_chat.py --in-process --concurrency 20 --duration 10
+#
+# Lectura de resultados
+# ---------------------
+# - throughput: respuestas 200 por segundo; error_rate incluye 503/429 (saturación).
+# - Modelo abierto: si p99 crece sin límite o aparecen "descartados", la tasa supera
+#   la capacidad del nodo. El modelo cerrado mide capacidad con N usuarios concurrentes.
+# - "1er fragmento" (stream): tiempo hasta el primer evento SSE.
+#
+# Consideraciones
+# ---------------
+# - En proceso, httpx.ASGITransport entrega la respuesta completa: el tiempo al primer
+#   fragmento coincide con el total. Usar la API real para medir streaming.
+# - Sin modelo el LLM responde al instante; para cargas realistas sin GGUF usar
+#   LLM_BACKEND=sim (services/llm_adapter/simulated.py).
+# - Todo el tráfico sale de una IP: con el rate limiting por IP activo (WEBCHATBOT_RATE_IP,
+#   default 600/60) la API responde 429. Para medir capacidad, WEBCHATBOT_RATE_IP=0 en el
+#   servidor (o en este proceso con --in-process); para probar los límites, dejarlo activo.
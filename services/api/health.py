@@ -0,0 +1,33 @@
+"""Sondas de salud del proceso (liveness/readiness) para balanceadores y orquestadores."""
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from services.orchestrator import router as chat_routes
+
+router = APIRouter()
+
+
+@router.get("/healthz")
+def healthz() -> dict:
+    """Liveness: el proceso responde (no depende del modelo)."""
+    return {"status": "ok"}
+
+
+@router.get("/readyz")
+def readyz() -> JSONResponse:
+    """Readiness por componente; 503 mientras algún componente (p. ej. el LLM) se está cargando."""
+    report = chat_routes._orchestrator.readiness()
+    return JSONResponse(status_code=200 if report["ready"] else 503, content=report)
+
+# ================================================================
+# Guía de uso (Sondas)
+# ================================================================
+#
+# - GET /healthz → 200 {"status": "ok"} mientras el proceso esté vivo.
+# - GET /readyz  → 200 si reglas, RAG y LLM están listos (o el LLM está deshabilitado
+#   por falta de modelo); 503 con el detalle por componente mientras el modelo se
+#   carga en segundo plano ({"components": {"llm": {"state": "loading"}}}).
+# - Ejemplo (Kubernetes): livenessProbe → /healthz, readinessProbe → /readyz.
+#   Si se prefiere recibir tráfico de reglas/RAG durante la carga, usar /healthz
+#   también como readiness: las consultas al LLM responden "iniciando".
@@ -1,16 +1,61 @@
 """Entrypoint del API Gateway basado en FastAPI."""
 
+import asyncio
+import logging
 import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
+from services.api.health import router as health_router
+from services.api.metrics import router as metrics_router
+from services.api.rate_limit import RateLimiter, RateLimitMiddleware
+from services.orchestrator import router as chat_routes
+from services.orchestrator.change_bus import get_bus
 from services.orchestrator.router import router as orchestrator_router
 from services.chatbots.router import router as chatbots_router
+from services.llm_adapter.scheduler import SchedulerRejected
+from services.observability.tracing import TracingMiddleware, configure_tracing, enabled as tracing_enabled
+
+
+async def _llm_busy_handler(request: Request, exc: SchedulerRejected) -> JSONResponse:
+    # Cola de inferencia saturada o vencida: 503 inmediato para que el cliente reintente
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(int(max(1, exc.retry_after_s)))},
+    )
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+async def _prewarm_menu() -> None:
+    try:
+        warmed = await chat_routes._orchestrator.prewarm_menu()
+        LOGGER.info("Chips del menú precalculados: %s", warmed)
+    except Exception:  # pragma: no cover - no debe impedir el arranque
+        LOGGER.exception("Falló el precalculado de los chips del menú")
+
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # Chips del menú en segundo plano: el servidor atiende mientras se calientan
+    task = asyncio.create_task(_prewarm_menu()) if os.getenv("WEBCHATBOT_PREWARM", "1").lower() not in {"0", "false", "no"} else None
+    # Cambios publicados por otros workers (intents, reindexado, settings)
+    bus = get_bus()
+    watcher = asyncio.create_task(bus.watch(chat_routes._orchestrator.apply_change)) if bus.enabled else None
+    yield
+    for background in (task, watcher):
+        if background is not None and not background.done():
+            background.cancel()
 
 
 def create_app() -> FastAPI:
-    app = FastAPI(title="Chatbot Municipal", version="0.1.0")
+    app = FastAPI(title="Chatbot Municipal", version="0.1.0", lifespan=_lifespan)
     # Orígenes por defecto (desarrollo local)
     default_origins = [
         "http://localhost:5173",
@@ -29,12 +74,25 @@ def create_app() -> FastAPI:
             allowed_origins = [o.strip() for o in env_origins.split(",") if o.strip()]
     else:
         allowed_origins = default_origins
+    # Rate limiting y tope de solicitudes en curso antes del orquestador; se agrega
+    # antes que CORS para que los 429/503 lleven los headers CORS (CORS queda por fuera)
+    limiter = RateLimiter()
+    if limiter.enabled:
+        app.add_middleware(RateLimitMiddleware, limiter=limiter)
+        # El WebSocket no pasa por el middleware: admite cada frame con el mismo limiter
+        app.state.rate_limiter = limiter
     app.add_middleware(
         CORSMiddleware,
         allow_origins=allowed_origins,
         allow_methods=["GET", "POST", "PUT", "OPTIONS"],
         allow_headers=["*"],
     )
+    app.add_exception_handler(SchedulerRejected, _llm_busy_handler)
+    # Trazas OpenTelemetry opcionales (WEBCHATBOT_TRACING); sin configurar no se agrega el middleware
+    if tracing_enabled() or configure_tracing():
+        app.add_middleware(TracingMiddleware)
+    app.include_router(health_router, tags=["health"])
+    app.include_router(metrics_router, tags=["metrics"])
     app.include_router(orchestrator_router, prefix="/chat", tags=["chat"])
     app.include_router(chatbots_router, prefix="/chatbots", tags=["chatbots"])
     return app
@@ -50,6 +108,8 @@ app = create_app()
 # -------------------
 # - /chat (endpoints del orquestador)
 # - /chatbots (endpoints de configuración por bot)
+# - /healthz y /readyz (sondas; ver services/api/health.py)
+# - /metrics (Prometheus; ver services/api/metrics.py)
 #
 # CORS
 # ----
@@ -57,6 +117,31 @@ app = create_app()
 # - Personalizable con la variable WEBCHATBOT_ALLOWED_ORIGINS (coma-separadas o "*").
 #   Ej.: WEBCHATBOT_ALLOWED_ORIGINS="https://mi-dominio.com,https://otro.com"
 #
+# Trazas
+# -----
+# - WEBCHATBOT_TRACING=console|otlp|global activa spans OpenTelemetry por request, etapa
+#   del orquestador, búsqueda RAG y generación (ver services/observability/tracing.py).
+#
+# Rate limiting
+# -------------
+# - Token buckets por sesión e IP y tope global de solicitudes en curso en /chat/message
+#   y /chat/stream (429/503 con Retry-After; ver services/api/rate_limit.py).
+#
+# Saturación del LLM
+# ------------------
+# - Si la cola de inferencia está llena o una consulta vence su espera en cola,
+#   los endpoints responden 503 con `Retry-After` (ver services/llm_adapter/scheduler.py).
+#
+# Arranque
+# --------
+# - Al iniciar se precalculan en segundo plano las respuestas de los chips del menú
+#   (menu_suggestions de cada bot; WEBCHATBOT_PREWARM=0 lo desactiva).
+# - El modelo GGUF se carga en segundo plano (LLM_LAZY_LOAD=1): el servidor acepta
+#   tráfico de inmediato y /readyz informa cuándo el LLM está listo.
+# - Cada worker sondea los cambios publicados por los demás (intents, reindexado,
+#   settings) y recarga sólo lo afectado (services/orchestrator/change_bus.py;
+#   WEBCHATBOT_CHANGE_BUS=0 lo desactiva).
+#
 # Ejecución local
 # ---------------
 # uvicorn services.api.main:app --reload
@@ -64,4 +149,4 @@ app = create_app()
 # Seguridad
 # ---------
 # - No incluye autenticación por defecto. Para exponer públicamente, configurar
-#   CORS, rate limiting y auth (token/sesiones) según necesidad del entorno.
+#   CORS, límites (WEBCHATBOT_RATE_*) y auth (token/sesiones) según necesidad del entorno.
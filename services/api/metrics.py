@@ -0,0 +1,28 @@
+"""Exposición de métricas del proceso en formato Prometheus."""
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from services.observability.metrics import REGISTRY
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> PlainTextResponse:
+    """Histogramas por etapa, por consulta y de tokens del LLM (text/plain 0.0.4)."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# ================================================================
+# Guía de uso (Métricas)
+# ================================================================
+#
+# - GET /metrics → exposición de texto de Prometheus. Ejemplo de scrape:
+#     scrape_configs:
+#       - job_name: webchatbot
+#         static_configs: [{targets: ["127.0.0.1:8000"]}]
+# - Consultas útiles (PromQL):
+#     histogram_quantile(0.95, sum by (le, stage) (rate(webchatbot_stage_seconds_bucket[5m])))
+#     histogram_quantile(0.5, sum by (le, bot) (rate(webchatbot_llm_tokens_per_second_bucket[5m])))
+# - Con varios workers de uvicorn cada proceso expone sus propias series.
+# - Definición de métricas y etapas: services/observability/metrics.py.
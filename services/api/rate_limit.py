@@ -0,0 +1,369 @@
+"""Rate limiting por sesión e IP y tope global de solicitudes en curso.
+
+Middleware ASGI que corre antes de cualquier trabajo del orquestador en
+POST /chat/message y /chat/stream:
+
+1. tope global de solicitudes en curso → 503 inmediato (con `Retry-After`);
+2. token bucket por IP del cliente → 429;
+3. token bucket por `session_id` → 429.
+
+El cuerpo JSON se lee una sola vez (orjson) para obtener `session_id`,
+`bot_id` y `channel`, y se reentrega intacto a la aplicación. Los buckets
+viven en memoria con un tope de claves (LRU): una ráfaga de sesiones nuevas no
+hace crecer la tabla sin límite. Los rechazos se cuentan en
+`webchatbot_rate_limited_total{reason,bot,channel}` (GET /metrics), con bot y
+canal acotados a valores conocidos.
+
+El WebSocket /chat/ws no pasa por el middleware: cada frame "message" se admite
+con `RateLimiter.acquire` (mismos buckets y mismo tope en curso) y se libera con
+`release` al terminar.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import math
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Mapping
+
+import orjson
+
+from services.observability.metrics import REGISTRY, bounded_labels
+
+LOGGER = logging.getLogger(__name__)
+
+RATE_LIMITED = REGISTRY.counter(
+    "webchatbot_rate_limited_total",
+    "Solicitudes rechazadas antes del orquestador (reason=session|ip|inflight)",
+    ("reason", "bot", "channel"),
+)
+
+LIMITED_PATHS: frozenset[str] = frozenset({"/chat/message", "/chat/stream"})
+
+BUSY_DETAIL = "Servidor saturado; reintentá en unos segundos."
+RATE_DETAIL = "Demasiadas solicitudes; esperá antes de enviar otro mensaje."
+
+
+@dataclass(frozen=True)
+class RateSpec:
+    """`count` solicitudes por `per_s` segundos (ráfaga máxima = count)."""
+
+    count: int
+    per_s: float
+
+    @property
+    def rate(self) -> float:
+        return self.count / self.per_s
+
+    @classmethod
+    def parse(cls, value: str | None) -> RateSpec | None:
+        """"30/60" → 30 por minuto; "" o "0" → sin límite."""
+        raw = (value or "").strip()
+        if not raw or raw == "0":
+            return None
+        count, _, per = raw.partition("/")
+        spec = cls(int(count), float(per or 1))
+        return spec if spec.count > 0 and spec.per_s > 0 else None
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, capacity: float, now: float) -> None:
+        self.tokens = capacity
+        self.updated = now
+
+    def wait(self, spec: RateSpec, now: float) -> float:
+        """Recarga según el tiempo transcurrido; 0 si hay un token o los segundos hasta el próximo."""
+        self.tokens = min(float(spec.count), self.tokens + (now - self.updated) * spec.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= 1.0 else (1.0 - self.tokens) / spec.rate
+
+
+class BucketTable:
+    """Buckets por clave con desalojo LRU (una clave desalojada vuelve con el bucket lleno)."""
+
+    def __init__(self, max_keys: int = 50_000) -> None:
+        self.max_keys = max(1, max_keys)
+        self._buckets: OrderedDict[tuple[str, ...], TokenBucket] = OrderedDict()
+
+    def get(self, key: tuple[str, ...], spec: RateSpec, now: float) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(float(spec.count), now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+@dataclass(frozen=True)
+class _Limits:
+    session: RateSpec | None
+    ip: RateSpec | None
+
+
+class RateLimiter:
+    """Límites configurables globalmente y por bot o canal.
+
+    - session / ip: límites por defecto (WEBCHATBOT_RATE_SESSION, WEBCHATBOT_RATE_IP).
+    - overrides: {bot_id|canal: {"session": "10/60", "ip": "60/60"}}
+      (WEBCHATBOT_RATE_LIMITS, JSON). El bot tiene precedencia sobre el canal.
+    - max_inflight: solicitudes simultáneas (WEBCHATBOT_MAX_INFLIGHT; 0 = sin tope).
+    - trust_proxy: proxies confiables delante de la API (WEBCHATBOT_TRUST_PROXY; 0 = usar
+      la IP del socket). La IP es la entrada de X-Forwarded-For que agregó el más externo.
+    """
+
+    def __init__(
+        self,
+        *,
+        session: str | None = None,
+        ip: str | None = None,
+        overrides: Mapping[str, Mapping[str, str]] | None = None,
+        max_inflight: int | None = None,
+        max_keys: int | None = None,
+        trust_proxy: int | None = None,
+    ) -> None:
+        self.default = _Limits(
+            RateSpec.parse(session if session is not None else os.getenv("WEBCHATBOT_RATE_SESSION", "30/60")),
+            RateSpec.parse(ip if ip is not None else os.getenv("WEBCHATBOT_RATE_IP", "600/60")),
+        )
+        if overrides is None:
+            try:
+                overrides = json.loads(os.getenv("WEBCHATBOT_RATE_LIMITS", "") or "{}")
+            except ValueError:
+                LOGGER.warning("WEBCHATBOT_RATE_LIMITS no es JSON válido; se ignoran los límites por bot/canal.")
+                overrides = {}
+        self.overrides = {
+            str(name).lower(): _Limits(
+                RateSpec.parse(cfg.get("session")) if "session" in cfg else self.default.session,
+                RateSpec.parse(cfg.get("ip")) if "ip" in cfg else self.default.ip,
+            )
+            for name, cfg in (overrides or {}).items()
+        }
+        inflight = max_inflight if max_inflight is not None else int(os.getenv("WEBCHATBOT_MAX_INFLIGHT", "256") or 0)
+        self.max_inflight = max(0, inflight)
+        self.inflight = 0
+        keys = max_keys or int(os.getenv("WEBCHATBOT_RATE_MAX_KEYS", "50000") or 50000)
+        self._buckets = BucketTable(keys)
+        if trust_proxy is None:
+            raw = os.getenv("WEBCHATBOT_TRUST_PROXY", "0").strip().lower()
+            trust_proxy = 1 if raw in {"true", "yes"} else (int(raw) if raw.isdigit() else 0)
+        self.trust_proxy = max(0, int(trust_proxy))
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.max_inflight or self.default.session or self.default.ip or self.overrides)
+
+    def _limits_for(self, bot_id: str, channel: str) -> tuple[str, _Limits]:
+        for key in (bot_id.lower(), channel.lower()):
+            if key and key in self.overrides:
+                return key, self.overrides[key]
+        return "", self.default
+
+    def check(self, *, ip: str, session_id: str, bot_id: str, channel: str, now: float | None = None) -> tuple[str, float] | None:
+        """None si se admite; (motivo, segundos de espera sugeridos) si se rechaza por rate."""
+        now = time.monotonic() if now is None else now
+        name, limits = self._limits_for(bot_id, channel)
+        buckets: list[TokenBucket] = []
+        # Se consume de todos los buckets sólo si todos admiten: un rechazo no gasta los demás
+        for reason, spec, key in (("ip", limits.ip, ip), ("session", limits.session, session_id)):
+            if spec is None or not key:
+                continue
+            bucket = self._buckets.get((reason, name, key), spec, now)
+            wait = bucket.wait(spec, now)
+            if wait:
+                return reason, wait
+            buckets.append(bucket)
+        for bucket in buckets:
+            bucket.tokens -= 1.0
+        return None
+
+    def client_ip(self, scope: Mapping[str, Any]) -> str:
+        return _client_ip(scope, self.trust_proxy)
+
+    def acquire(self, *, ip: str, session_id: str, bot_id: str, channel: str) -> tuple[int, str, float] | None:
+        """Tope en curso + buckets para solicitudes que no pasan por el middleware (frames del WS).
+
+        None si se admite (queda contada en curso hasta `release`); si no, (status HTTP
+        equivalente, detalle, segundos de espera), con el rechazo ya contado en la métrica.
+        """
+        if self.max_inflight and self.inflight >= self.max_inflight:
+            count_rejection("inflight")
+            return 503, BUSY_DETAIL, 1.0
+        rejected = self.check(ip=ip, session_id=session_id, bot_id=bot_id, channel=channel)
+        if rejected is not None:
+            reason, wait = rejected
+            count_rejection(reason, bot_id, channel)
+            return 429, RATE_DETAIL, wait
+        self.inflight += 1
+        return None
+
+    def release(self) -> None:
+        self.inflight = max(0, self.inflight - 1)
+
+    def stats(self) -> dict[str, Any]:
+        return {"inflight": self.inflight, "max_inflight": self.max_inflight, "buckets": len(self._buckets)}
+
+
+def count_rejection(reason: str, bot_id: str = "", channel: str = "") -> None:
+    """Suma un rechazo; bot y canal vienen del cliente y se acotan a valores conocidos."""
+    bot, channel = bounded_labels(bot_id, channel)
+    RATE_LIMITED.inc(reason=reason, bot=bot, channel=channel)
+
+
+def _client_ip(scope: Mapping[str, Any], trusted_hops: int) -> str:
+    """IP del cliente: con `trusted_hops` proxies, la entrada N-ésima desde la derecha de X-Forwarded-For.
+
+    Cada proxy agrega la IP de su par a la derecha; lo que está más a la izquierda lo
+    escribe el cliente y no sirve para limitar (un valor inventado esquivaría el bucket).
+    """
+    if trusted_hops:
+        hops = [
+            part.strip()
+            for name, value in scope.get("headers") or []
+            if name == b"x-forwarded-for"
+            for part in value.decode("latin-1").split(",")
+        ]
+        hops = [hop for hop in hops if hop]
+        # Menos entradas que proxies: no hay una escrita por un proxy confiable → IP del socket
+        if len(hops) >= trusted_hops:
+            return hops[-trusted_hops]
+    client = scope.get("client")
+    return str(client[0]) if client else ""
+
+
+class RateLimitMiddleware:
+    """Middleware ASGI que aplica `RateLimiter` a los endpoints de chat."""
+
+    def __init__(self, app: Any, limiter: RateLimiter | None = None, paths: frozenset[str] = LIMITED_PATHS) -> None:
+        self.app = app
+        self.limiter = limiter or RateLimiter()
+        self.paths = paths
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or scope.get("method") != "POST" or scope.get("path") not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        limiter = self.limiter
+        # Tope global antes de leer el cuerpo: el rechazo más barato posible
+        if limiter.max_inflight and limiter.inflight >= limiter.max_inflight:
+            count_rejection("inflight")
+            await _reject(send, 503, BUSY_DETAIL, 1.0)
+            return
+        limiter.inflight += 1
+        try:
+            body, more = await _read_body(receive)
+            fields = _fields(body) if not more else {}
+            bot_id = str(fields.get("bot_id") or "")
+            channel = str(fields.get("channel") or "web")
+            rejected = limiter.check(
+                ip=limiter.client_ip(scope),
+                session_id=str(fields.get("session_id") or ""),
+                bot_id=bot_id,
+                channel=channel,
+            )
+            if rejected is not None:
+                reason, wait = rejected
+                count_rejection(reason, bot_id, channel)
+                await _reject(send, 429, RATE_DETAIL, wait)
+                return
+            await self.app(scope, _replay(body, more, receive), send)
+        finally:
+            limiter.inflight -= 1
+
+
+_MAX_PEEK_BYTES = 64 * 1024
+
+
+async def _read_body(receive: Any) -> tuple[bytes, bool]:
+    """Lee el cuerpo (hasta 64 KiB); devuelve (bytes, quedan_más_mensajes)."""
+    chunks: list[bytes] = []
+    size = 0
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            return b"".join(chunks), False
+        chunk = message.get("body", b"")
+        chunks.append(chunk)
+        size += len(chunk)
+        if not message.get("more_body", False):
+            return b"".join(chunks), False
+        if size > _MAX_PEEK_BYTES:
+            return b"".join(chunks), True
+
+
+def _replay(body: bytes, more: bool, receive: Any) -> Any:
+    sent = False
+
+    async def _receive() -> dict[str, Any]:
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": more}
+        return await receive()
+
+    return _receive
+
+
+def _fields(body: bytes) -> dict[str, Any]:
+    try:
+        data = orjson.loads(body)
+    except orjson.JSONDecodeError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+async def _reject(send: Any, status: int, detail: str, retry_after_s: float) -> None:
+    payload = orjson.dumps({"detail": detail})
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(payload)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after_s))).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": payload})
+
+# ================================================================
+# Guía de uso (Rate limiting)
+# ================================================================
+#
+# Variables de entorno
+# --------------------
+# - WEBCHATBOT_RATE_SESSION ("30/60"): mensajes por sesión por ventana (N/segundos; 0 = sin límite).
+# - WEBCHATBOT_RATE_IP ("600/60"): solicitudes por IP de cliente.
+# - WEBCHATBOT_RATE_LIMITS: JSON por bot o canal, p. ej.
+#     {"mar2": {"session": "10/60"}, "whatsapp": {"ip": "0"}}
+#   (el bot tiene precedencia sobre el canal; claves ausentes heredan el default).
+# - WEBCHATBOT_MAX_INFLIGHT (256): solicitudes de chat simultáneas por proceso; 0 = sin tope.
+# - WEBCHATBOT_RATE_MAX_KEYS (50000): buckets en memoria (LRU).
+# - WEBCHATBOT_TRUST_PROXY (0): cantidad de proxies confiables delante de la API; la IP es
+#   la entrada de X-Forwarded-For a esa distancia desde la derecha (1 = la que agregó el
+#   proxy más cercano). Las entradas de la izquierda las controla el cliente.
+#
+# Respuestas
+# ----------
+# - 429 + Retry-After: bucket de sesión o IP agotado.
+# - 503 + Retry-After: tope global de solicitudes en curso (igual que la cola del LLM llena).
+#
+# Consideraciones
+# ---------------
+# - Estado por proceso: con N workers el límite efectivo por IP es hasta N veces el configurado.
+# - Un bridge (WhatsApp, kiosco) concentra muchas sesiones en una IP: darle un override de "ip".
+# - El WebSocket /chat/ws no pasa por este middleware: cada frame "message" se admite con
+#   limiter.acquire(...) (mismos buckets por sesión/IP y mismo tope en curso) y responde un
+#   frame de error con status 429/503 y retry_after; la tarea libera con limiter.release().
+# - create_app deja el limiter en app.state.rate_limiter para que lo use el WebSocket.
@@ -3,10 +3,12 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Any, Literal
+from typing import Literal
 
 from pydantic import BaseModel, Field, PositiveInt, field_validator
 
+from services.orchestrator import jsonc
+
 
 class GenerationSettings(BaseModel):
     temperature: float = Field(0.7, ge=0.0, le=2.0, description="Temperatura de muestreo")
@@ -90,6 +92,15 @@ class BotSettings(BaseModel):
         default_factory=list,
         description="Lista de reglas personalizadas a sumar (o reemplazar) al motor de reglas.",
     )
+    latency_slo_ms: int = Field(
+        0,
+        ge=0,
+        le=600_000,
+        description=(
+            "SLO de latencia por consulta en milisegundos (0 = sin límite). Al acercarse el vencimiento "
+            "se corta la generación y se responde con el mejor fragmento RAG o el texto parcial."
+        ),
+    )
 
     def clamped(self) -> "BotSettings":
         return BotSettings(
@@ -108,6 +119,7 @@ class BotSettings(BaseModel):
                 for r in (getattr(self, "rules", []) or [])
                 if isinstance(r, (dict, RuleConfig))
             ],
+            latency_slo_ms=min(max(int(getattr(self, "latency_slo_ms", 0) or 0), 0), 600_000),
         )
 
 
@@ -127,6 +139,24 @@ def settings_path(bot_id: str) -> Path:
     return bot_dir(bot_id) / "settings.json"
 
 
+def known_bots() -> list[tuple[str, str]]:
+    """(bot_id, canal) de cada bot con carpeta en chatbots/ (canal de config.json, "web" si falta)."""
+    bots: list[tuple[str, str]] = []
+    root = chatbots_dir()
+    if not root.is_dir():
+        return bots
+    for folder in sorted(p for p in root.iterdir() if p.is_dir()):
+        channel = "web"
+        try:
+            config = jsonc.load(folder / "config.json")
+            channel = str(config.get("channel") or channel)
+        except (OSError, ValueError, AttributeError):
+            if not (folder / "settings.json").exists():
+                continue
+        bots.append((folder.name, channel.lower()))
+    return bots
+
+
 def defaults_for(bot_id: str, channel: str | None = None) -> BotSettings:
     # Baselines por variante conocidas
     if bot_id == "mar2" or (channel or "").lower() in {"mar2", "free"}:
@@ -200,14 +230,22 @@ def load_settings(bot_id: str, channel: str | None = None) -> BotSettings:
     p = settings_path(bot_id)
     if p.exists():
         try:
-            data: dict[str, Any] = BotSettings.model_validate_json(p.read_text(encoding="utf-8")).model_dump()
-            return BotSettings.model_validate(data).clamped()
+            return BotSettings.model_validate(jsonc.load(p)).clamped()
         except Exception:
             # Si el archivo está corrupto, volvemos a defaults
             return defaults_for(bot_id, channel)
     return defaults_for(bot_id, channel)
 
 
+def settings_version(bot_id: str) -> str:
+    """Versión del archivo de settings (mtime + tamaño): cambia con cada guardado, sin parsear."""
+    try:
+        st = settings_path(bot_id).stat()
+    except OSError:
+        return "defaults"
+    return f"{st.st_mtime_ns}:{st.st_size}"
+
+
 def save_settings(bot_id: str, settings: BotSettings) -> None:
     d = bot_dir(bot_id)
     d.mkdir(parents=True, exist_ok=True)
@@ -247,11 +285,14 @@ def reset_settings(bot_id: str, channel: str | None = None) -> BotSettings:
 #   "generation": {"temperature": 0.7, "top_p": 0.9, "max_tokens": 256},
 #   "features": {"use_rules": true, "use_rag": true},
 #   "menu_suggestions": [{"label": "Pagar impuestos", "message": "¿Cómo pago mis impuestos?"}],
-#   "pre_prompts": ["Responde con tono claro"]
+#   "pre_prompts": ["Responde con tono claro"],
+#   "latency_slo_ms": 8000
 # }
 #
 # Consideraciones
 # ---------------
+# - latency_slo_ms: presupuesto de tiempo por consulta (0 = sin límite); el orquestador
+#   lo convierte en un deadline (services/orchestrator/deadline.py).
 # - clamped(): asegura que valores numéricos respeten límites seguros.
 # - defaults_for(): define defaults por bot/canal (mar2 desactiva reglas y RAG por defecto).
 # - IO: los helpers crean directorios si hiciera falta; manejo básico de corrupción → vuelve a defaults.
@@ -11,6 +11,7 @@ from services.chatbots.models import (
     save_settings,
     defaults_for,
 )
+from services.orchestrator.change_bus import get_bus
 
 
 router = APIRouter()
@@ -27,15 +28,19 @@ def put_settings(bot_id: str, payload: BotSettings) -> BotSettings:
         save_settings(bot_id, payload)
     except Exception as exc:  # pragma: no cover - errores de IO
         raise HTTPException(status_code=500, detail=str(exc))
+    # Los demás workers recalientan los chips de este bot
+    get_bus().publish(f"settings.{bot_id}")
     return load_settings(bot_id)
 
 
 @router.post("/{bot_id}/settings/reset", response_model=BotSettings)
 def post_reset(bot_id: str, channel: str | None = None) -> BotSettings:
     try:
-        return reset_settings(bot_id, channel=channel)
+        settings = reset_settings(bot_id, channel=channel)
     except Exception as exc:  # pragma: no cover - errores de IO
         raise HTTPException(status_code=500, detail=str(exc))
+    get_bus().publish(f"settings.{bot_id}")
+    return settings
 
 
 @router.get("/{bot_id}/defaults", response_model=BotSettings)
@@ -63,6 +68,8 @@ def get_defaults(bot_id: str, channel: str | None = None) -> BotSettings:
 # Consideraciones
 # ---------------
 # - Persistencia en disco: chatbots/<id>/settings.json (crea carpeta si falta).
+# - Cada guardado publica "settings.<id>" (services/orchestrator/change_bus.py): los demás
+#   workers recalientan los chips precalculados de ese bot.
 # - Validación Pydantic: estructura y límites por modelo (ver services.chatbots.models).
 # - Errores de IO → 500 con detalle del error.
 # - Seguridad/CORS: depende de configuración en services.api.main (variable WEBCHATBOT_ALLOWED_ORIGINS).
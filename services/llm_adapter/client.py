@@ -3,10 +3,22 @@
 from __future__ import annotations
 
 import asyncio
+import functools
 import logging
-from typing import Any, Final
+import threading
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Final
 
+from services.llm_adapter.pool import LlamaProcessPool, auto_pool_size, load_llama
+from services.llm_adapter.prefix_cache import PrefixCache, create_completion_with_prefix, model_identity
+from services.llm_adapter.openai_backend import OpenAICompatBackend
+from services.llm_adapter.remote import UnixSocketBackend
+from services.llm_adapter.scheduler import InferenceScheduler, SchedulerRejected
 from services.llm_adapter.settings import LLMSettings
+from services.llm_adapter.simulated import SimulatedLlama
+from services.observability import tracing
+from services.observability.metrics import StageTimer, current_timer, observe_generation
 
 try:  # pragma: no cover - import opcional
     from llama_cpp import Llama  # type: ignore
@@ -18,6 +30,7 @@ PLACEHOLDER_REPLY: Final[str] = (
     "[LLM placeholder] Aún no estoy conectado a un modelo real. "
     "Se agregará generación dinámica en próximos sprints."
 )
+_STREAM_END: Final = object()
 
 
 class LLMClient:
@@ -26,10 +39,211 @@ class LLMClient:
     def __init__(self, model_name: str = "llama-cpp", settings: LLMSettings | None = None) -> None:
         self.model_name = model_name
         self.settings = settings or LLMSettings()
-        self._llama: Llama | None = None
-        self._init_backend()
+        self._llama: Llama | LlamaProcessPool | SimulatedLlama | None = None
+        self._prefix_cache: PrefixCache | None = None
+        # disabled (sin modelo/backend) | loading | ready | failed
+        self._state = "disabled"
+        self._ready = threading.Event()
+        self._load_time_s: float | None = None
+        self._pool_size = 0
+        # Backend remoto (servidor de inferencia): este proceso no carga el modelo
+        self._remote: Any = None
+        if self.settings.backend == "unix":
+            self._remote = UnixSocketBackend(self.settings.socket_path, health_poll_s=self.settings.health_poll_s)
+        elif self.settings.backend == "openai":
+            self._remote = OpenAICompatBackend(
+                self.settings.openai_base_url,
+                model=self.settings.openai_model,
+                api_key=self.settings.openai_api_key,
+                timeout_s=self.settings.http_timeout_s,
+                connect_timeout_s=self.settings.http_connect_timeout_s,
+                retries=self.settings.http_retries,
+                max_connections=self.settings.http_max_connections,
+                defaults={"max_tokens": self.settings.max_tokens, "temperature": self.settings.temperature, "top_p": self.settings.top_p},
+            )
+        else:
+            self._init_backend()
+        # Con pool de procesos, una generación simultánea por worker
+        self._scheduler = InferenceScheduler(
+            concurrency=self._pool_size or self.settings.concurrency,
+            max_queue=self.settings.queue_max,
+            queue_timeout_s=self.settings.queue_timeout_s,
+        )
+
+    @property
+    def state(self) -> str:
+        """Estado del backend: disabled | loading | ready | failed (remoto: el informado por el servidor)."""
+        if self._remote is not None:
+            return self._remote.state
+        return self._state
+
+    @property
+    def warming_up(self) -> bool:
+        """True mientras el modelo local se carga en segundo plano.
+
+        Con un backend remoto siempre False: las solicitudes se reenvían y, si el
+        servidor sigue cargando, responde `ModelLoading` (el estado puede estar viejo).
+        """
+        return self._remote is None and self._state == "loading"
+
+    def wait_ready(self, timeout: float | None = None) -> bool:
+        """Bloquea hasta que termine la carga (útil en scripts); True si hay modelo listo."""
+        if self._state == "loading":
+            self._ready.wait(timeout)
+        return self._state == "ready"
+
+    def readiness(self) -> dict[str, Any]:
+        if self._remote is not None:
+            return self._remote.readiness()
+        return {
+            "ready": self._state in {"ready", "disabled"},
+            "state": self._state,
+            "load_time_s": self._load_time_s,
+            "workers": self._pool_size or None,
+        }
+
+    def _init_pool(self, model_path: Path) -> None:
+        threads = max(1, self.settings.pool_threads)
+        factory = functools.partial(load_llama, str(model_path), self.settings.context_window, threads)
+        cache_factory = self._prefix_cache_factory(model_path)
+        try:
+            pool = LlamaProcessPool(factory, self._pool_size, cache_factory=cache_factory)
+            if not pool.wait_ready():
+                pool.close()
+                raise RuntimeError("los workers no pudieron cargar el modelo")
+            self._llama = pool
+            LOGGER.info("Pool LLM iniciado: %s workers × %s hilos desde %s", self._pool_size, threads, model_path)
+        except Exception:  # pragma: no cover - dependiente de entorno
+            LOGGER.exception("Falló el inicio del pool LLM desde %s", model_path)
+            self._llama = None
+
+    def _prefix_cache_factory(self, model_path: Path) -> functools.partial[PrefixCache] | None:
+        if not self.settings.prefix_cache:
+            return None
+        return functools.partial(
+            PrefixCache,
+            max_entries=self.settings.prefix_cache_max,
+            directory=self.settings.prefix_cache_dir,
+            model_id=model_identity(model_path),
+        )
+
+    def _completion_call(self, llama: Any, prompt: str, kwargs: dict[str, Any], *, stream: bool) -> functools.partial[Any]:
+        """Invocación bloqueante a create_completion (con reutilización de prefijo si aplica)."""
+        params: dict[str, Any] = {
+            "max_tokens": kwargs.get("max_tokens", self.settings.max_tokens),
+            "temperature": kwargs.get("temperature", self.settings.temperature),
+            "top_p": kwargs.get("top_p", self.settings.top_p),
+            "stream": stream,
+        }
+        prefix_len = int(kwargs.get("prefix_len") or 0) if self.settings.prefix_cache else 0
+        if 0 < prefix_len < len(prompt):
+            params["prefix"] = prompt[:prefix_len]
+            params["prefix_key"] = kwargs.get("bot_id") or kwargs.get("channel") or ""
+        if isinstance(llama, LlamaProcessPool):
+            return functools.partial(llama.create_completion, prompt, **params)
+        return functools.partial(create_completion_with_prefix, llama, self._prefix_cache, prompt, **params)
+
+    def _priority(self, kwargs: dict[str, Any]) -> int:
+        if "priority" in kwargs:
+            return int(kwargs["priority"])
+        return self.settings.priority_for(kwargs.get("bot_id"), kwargs.get("channel"))
+
+    def _queue_timeout(self, kwargs: dict[str, Any]) -> float | None:
+        """Vencimiento en cola: el menor entre LLM_QUEUE_TIMEOUT_S y el deadline de la consulta (deadline_s)."""
+        deadline_s = kwargs.get("deadline_s")
+        if not deadline_s:
+            return None
+        configured = self.settings.queue_timeout_s
+        return min(float(deadline_s), configured) if configured and configured > 0 else float(deadline_s)
+
+    def _span_attributes(self, prompt: str, kwargs: dict[str, Any], *, stream: bool) -> dict[str, Any]:
+        return {
+            "llm.backend": self.settings.backend,
+            "llm.stream": stream,
+            "llm.prompt_chars": len(prompt),
+            "llm.max_tokens": kwargs.get("max_tokens"),
+            "webchatbot.bot_id": kwargs.get("bot_id"),
+            "webchatbot.channel": kwargs.get("channel"),
+        }
+
+    def _observe(
+        self,
+        kwargs: dict[str, Any],
+        timer: StageTimer | None,
+        *,
+        queue_s: float | None = None,
+        prompt_s: float | None = None,
+        decode_s: float | None = None,
+        generate_s: float | None = None,
+        prompt_tokens: int | None = None,
+        completion_tokens: int | None = None,
+    ) -> None:
+        """Fases de una generación → etapas de la consulta actual + histogramas de tokens.
+
+        En streaming se separa evaluación del prompt (hasta el primer token) y
+        decodificación; sin streaming sólo se conoce el total (`llm_generate`).
+        """
+        if timer is not None:
+            for name, value in (
+                ("llm_queue", queue_s),
+                ("llm_prompt", prompt_s),
+                ("llm_decode", decode_s),
+                ("llm_generate", generate_s),
+            ):
+                if value is not None:
+                    timer.add(name, max(0.0, value))
+        observe_generation(
+            bot=str(kwargs.get("bot_id") or ""),
+            channel=str(kwargs.get("channel") or ""),
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            decode_s=decode_s if decode_s is not None else generate_s,
+        )
+
+    @property
+    def context_window(self) -> int:
+        return self.settings.context_window
+
+    @property
+    def token_counter(self) -> Callable[[str], int] | None:
+        """Contador con el tokenizador del modelo local (None si no hay modelo en este proceso)."""
+        llama = self._llama
+        if llama is None or isinstance(llama, LlamaProcessPool):
+            return None
+
+        def count(text: str) -> int:
+            return len(llama.tokenize(text.encode("utf-8"), add_bos=False))
+
+        return count
+
+    @property
+    def model_id(self) -> str:
+        """Identidad del modelo cargado (clave del cache de respuestas)."""
+        if self._remote is not None:
+            return self._remote.model_id or self.settings.backend
+        if self._llama is None:
+            return "placeholder"
+        if isinstance(self._llama, SimulatedLlama):
+            return "sim"
+        return model_identity(self.settings.model_path) or self.model_name
+
+    def scheduler_metrics(self) -> dict[str, Any]:
+        """Métricas del planificador (profundidad de cola, espera y servicio)."""
+        if self._remote is not None:
+            # La admisión ocurre en el servidor de inferencia
+            return {"backend": self.settings.backend, **self._remote.readiness()}
+        metrics = self._scheduler.metrics()
+        if isinstance(self._llama, LlamaProcessPool):
+            metrics["workers"] = self._llama.stats()
+        if self._prefix_cache is not None:
+            metrics["prefix_cache"] = self._prefix_cache.stats()
+        return metrics
 
     def _init_backend(self) -> None:
+        if self.settings.backend == "sim":
+            self._start_loading(None)
+            return
+
         if not self.settings.has_model_path:
             LOGGER.info("LLM model path no configurado. Se usa respuesta placeholder.")
             return
@@ -46,41 +260,252 @@ class LLMClient:
             LOGGER.error("No se encontró el archivo GGUF en %s", model_path)
             return
 
+        workers = self.settings.pool_workers
+        if workers == "auto":
+            self._pool_size = auto_pool_size(model_path, max(1, self.settings.pool_threads), self.settings.pool_worker_mem_mb)
+        elif workers:
+            self._pool_size = max(1, int(workers))
+
+        self._start_loading(model_path)
+
+    def _start_loading(self, model_path: Path | None) -> None:
+        self._state = "loading"
+        if self.settings.lazy_load:
+            # Carga en segundo plano: la API atiende reglas/RAG mientras el modelo se calienta
+            threading.Thread(target=self._load_model, args=(model_path,), name="llm-loader", daemon=True).start()
+        else:
+            self._load_model(model_path)
+
+    def _load_model(self, model_path: Path | None) -> None:
+        started = time.monotonic()
         try:
-            self._llama = Llama(
-                model_path=str(model_path),
-                n_ctx=self.settings.context_window,
-                logits_all=False,
-                embedding=False,
-            )
-            LOGGER.info("LLM local inicializado desde %s", model_path)
-        except Exception:  # pragma: no cover - inicialización dependiente de entorno
-            LOGGER.exception("Falló la inicialización del modelo LLaMA en %s", model_path)
-            self._llama = None
+            if model_path is None:
+                time.sleep(max(0.0, self.settings.sim_load_s))
+                self._llama = SimulatedLlama(
+                    prompt_ms_per_token=self.settings.sim_prompt_ms_per_token,
+                    tokens_per_s=self.settings.sim_tokens_per_s,
+                    jitter=self.settings.sim_jitter,
+                    reply_tokens=self.settings.sim_reply_tokens,
+                )
+                LOGGER.info("LLM simulado inicializado (%.1f tok/s)", self.settings.sim_tokens_per_s)
+                return
+            if self._pool_size:
+                self._init_pool(model_path)
+                return
+
+            try:
+                llama = Llama(
+                    model_path=str(model_path),
+                    n_ctx=self.settings.context_window,
+                    logits_all=False,
+                    embedding=False,
+                )
+                cache_factory = self._prefix_cache_factory(model_path)
+                self._prefix_cache = cache_factory() if cache_factory is not None else None
+                self._llama = llama
+                LOGGER.info("LLM local inicializado desde %s", model_path)
+            except Exception:  # pragma: no cover - inicialización dependiente de entorno
+                LOGGER.exception("Falló la inicialización del modelo LLaMA en %s", model_path)
+                self._llama = None
+        finally:
+            self._load_time_s = time.monotonic() - started
+            self._state = "ready" if self._llama is not None else "failed"
+            self._ready.set()
 
     async def generate(self, prompt: str, **kwargs: Any) -> str:
+        with tracing.span("llm.generate", self._span_attributes(prompt, kwargs, stream=False)):
+            return await self._generate(prompt, **kwargs)
+
+    async def _generate(self, prompt: str, **kwargs: Any) -> str:
+        timer = current_timer()
+        if self._remote is not None:
+            started = time.perf_counter()
+            try:
+                return await self._remote.generate(prompt, **kwargs) or PLACEHOLDER_REPLY
+            except SchedulerRejected:
+                raise
+            except Exception as exc:
+                LOGGER.error("Backend LLM remoto no disponible (%s). Devuelvo placeholder.", exc)
+                return PLACEHOLDER_REPLY
+            finally:
+                self._observe(kwargs, timer, generate_s=time.perf_counter() - started)
         if self._llama is None:
             return PLACEHOLDER_REPLY
 
+        call = self._completion_call(self._llama, prompt, kwargs, stream=False)
+        phases: dict[str, float] = {"submitted": time.perf_counter()}
+
+        def _timed() -> Any:
+            # Hilo de inferencia: el contexto (y el span llm.generate) llega copiado por to_thread
+            phases["start"] = time.perf_counter()
+            try:
+                with tracing.span("llama.create_completion"):
+                    return call()
+            finally:
+                phases["end"] = time.perf_counter()
+
+        # SchedulerRejected (cola llena / vencida) se propaga: la API responde 503
+        job = self._scheduler.submit(_timed, priority=self._priority(kwargs), queue_timeout_s=self._queue_timeout(kwargs))
         try:
-            completion = await asyncio.to_thread(
-                self._llama.create_completion,
-                prompt=prompt,
-                max_tokens=kwargs.get("max_tokens", self.settings.max_tokens),
-                temperature=kwargs.get("temperature", self.settings.temperature),
-                top_p=kwargs.get("top_p", self.settings.top_p),
-                stream=False,
-            )
+            completion = await job
+        except SchedulerRejected:
+            raise
         except Exception:  # pragma: no cover - depende del backend
             LOGGER.exception("Error generando respuesta con llama.cpp. Devuelvo placeholder.")
             return PLACEHOLDER_REPLY
 
+        usage = completion.get("usage") or {}
+        tracing.set_attributes(
+            {"llm.prompt_tokens": usage.get("prompt_tokens"), "llm.completion_tokens": usage.get("completion_tokens")}
+        )
+        self._observe(
+            kwargs,
+            timer,
+            queue_s=phases["start"] - phases["submitted"],
+            generate_s=phases["end"] - phases["start"],
+            prompt_tokens=usage.get("prompt_tokens"),
+            completion_tokens=usage.get("completion_tokens"),
+        )
         text = completion.get("choices", [{}])[0].get("text", "").strip()
         if not text:
             LOGGER.warning("Modelo LLaMA no generó texto. Devuelvo placeholder.")
             return PLACEHOLDER_REPLY
         return text
 
+    async def generate_stream(self, prompt: str, **kwargs: Any) -> AsyncIterator[str]:
+        """Genera la respuesta token a token (llama.cpp con stream=True).
+
+        La iteración de llama.cpp corre en un hilo y entrega los fragmentos al
+        event loop mediante una cola. Si el consumidor deja de iterar (p. ej.
+        el cliente cortó la conexión), el hilo se detiene en el próximo token.
+        """
+        timer = current_timer()
+        # El span no se vuelve actual: un generador async puede reanudarse en otro contexto
+        llm_span = tracing.start_span("llm.generate_stream", self._span_attributes(prompt, kwargs, stream=True))
+        chunks = self._generate_stream(prompt, kwargs, timer, llm_span)
+        try:
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            # Cerrar explícitamente: el finally interno detiene el hilo de llama.cpp
+            await chunks.aclose()
+            llm_span.end()
+
+    async def _generate_stream(
+        self, prompt: str, kwargs: dict[str, Any], timer: StageTimer | None, llm_span: Any
+    ) -> AsyncIterator[str]:
+        if self._remote is not None:
+            produced = False
+            started = time.perf_counter()
+            first: float | None = None
+            chunks = 0
+            try:
+                async for chunk in self._remote.generate_stream(prompt, **kwargs):
+                    if first is None:
+                        first = time.perf_counter()
+                    produced = True
+                    chunks += 1
+                    yield chunk
+            except SchedulerRejected:
+                raise
+            except Exception as exc:
+                LOGGER.error("Backend LLM remoto no disponible (%s) durante el stream.", exc)
+            finally:
+                if first is not None:
+                    self._observe(
+                        kwargs,
+                        timer,
+                        prompt_s=first - started,
+                        decode_s=time.perf_counter() - first,
+                        completion_tokens=chunks,
+                    )
+            if not produced:
+                yield PLACEHOLDER_REPLY
+            return
+        if self._llama is None:
+            yield PLACEHOLDER_REPLY
+            return
+
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue[object] = asyncio.Queue()
+        stop = threading.Event()
+        call = self._completion_call(self._llama, prompt, kwargs, stream=True)
+        llama = self._llama
+        # Marcas de tiempo del hilo: inicio, primer token y fin; cada fragmento es un token
+        phases: dict[str, float] = {"submitted": time.perf_counter(), "tokens": 0}
+
+        def _push(item: object) -> None:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+            except RuntimeError:  # pragma: no cover - loop cerrado
+                stop.set()
+
+        def _worker() -> None:
+            phases["start"] = time.perf_counter()
+            try:
+                with tracing.use_span(llm_span), tracing.span("llama.create_completion"):
+                    for part in call():
+                        if stop.is_set():
+                            break
+                        phases.setdefault("first", time.perf_counter())
+                        phases["tokens"] += 1
+                        text = part.get("choices", [{}])[0].get("text", "")
+                        if text:
+                            _push(text)
+            except Exception as exc:  # pragma: no cover - depende del backend
+                _push(exc)
+            finally:
+                phases["end"] = time.perf_counter()
+                if not isinstance(llama, LlamaProcessPool) and hasattr(llama, "tokenize"):
+                    try:
+                        phases["prompt_tokens"] = len(llama.tokenize(prompt.encode("utf-8"), add_bos=False))
+                    except Exception:  # pragma: no cover - depende del backend
+                        pass
+                _push(_STREAM_END)
+
+        # Admisión antes de producir cualquier fragmento: SchedulerRejected se propaga
+        worker = self._scheduler.submit(_worker, priority=self._priority(kwargs), queue_timeout_s=self._queue_timeout(kwargs))
+
+        def _on_rejected(fut: asyncio.Future[Any]) -> None:
+            # Vencido en cola: _worker nunca corre, avisar al consumidor
+            if not fut.cancelled() and fut.exception() is not None:
+                queue.put_nowait(fut.exception())
+
+        worker.add_done_callback(_on_rejected)
+        produced = False
+        try:
+            while True:
+                item = await queue.get()
+                if item is _STREAM_END:
+                    break
+                if isinstance(item, SchedulerRejected):
+                    raise item
+                if isinstance(item, Exception):
+                    LOGGER.error("Error generando respuesta con llama.cpp (stream): %s", item)
+                    break
+                produced = True
+                yield item  # type: ignore[misc]
+        finally:
+            stop.set()
+            if not worker.done():
+                # En cola: se descarta. En ejecución: el hilo corta en el próximo token.
+                worker.cancel()
+            llm_span.set_attributes({"llm.completion_tokens": int(phases["tokens"]), "llm.cancelled": "end" not in phases})
+            if "first" in phases:
+                # Stream cortado antes de terminar: se mide hasta el corte
+                self._observe(
+                    kwargs,
+                    timer,
+                    queue_s=phases["start"] - phases["submitted"],
+                    prompt_s=phases["first"] - phases["start"],
+                    decode_s=phases.get("end", time.perf_counter()) - phases["first"],
+                    prompt_tokens=int(phases.get("prompt_tokens", 0)) or None,
+                    completion_tokens=int(phases["tokens"]),
+                )
+        if not produced:
+            LOGGER.warning("Modelo LLaMA no generó texto. Devuelvo placeholder.")
+            yield PLACEHOLDER_REPLY
+
 # ================================================================
 # Guía de uso y parametrización (Cliente LLM)
 # ================================================================
@@ -107,6 +532,31 @@ class LLMClient:
 # ---------------
 # - Maneja excepciones y cae en PLACEHOLDER_REPLY si llama.cpp no está disponible
 #   o el modelo no carga.
-# - No implementa streaming; para ello habría que usar create_chat_completion/stream=True
-#   y adaptar el frontend/API.
+# - Concurrencia: todas las generaciones pasan por InferenceScheduler (cola acotada
+#   con prioridades por bot/canal y deadline de cola). Si está saturado, generate()
+#   y generate_stream() lanzan SchedulerRejected (la API lo traduce a 503).
+#   kwargs opcionales: bot_id, channel (prioridad) o priority explícita; deadline_s
+#   (segundos restantes del SLO del bot) acota la espera en cola.
+# - Pool de procesos: LLM_POOL_WORKERS=N|auto levanta N procesos llama.cpp que
+#   comparten los pesos vía mmap (ver services/llm_adapter/pool.py).
+# - Prefijo KV por bot: con kwargs prefix_len (LLMPlan) se restaura el estado del
+#   preludio + pre_prompts y sólo se evalúa el sufijo (ver prefix_cache.py).
+# - Carga diferida: con LLM_LAZY_LOAD=1 (default) el GGUF se carga en un hilo de
+#   fondo; `state`/`warming_up` informan el progreso (el orquestador responde
+#   "iniciando" mientras tanto) y `readiness()` alimenta GET /readyz.
+# - Despliegue dividido: LLM_BACKEND=unix delega en el servidor de inferencia
+#   (services/llm_adapter/inference_server.py) por LLM_SOCKET_PATH; los workers
+#   de la API no cargan el modelo.
+# - LLM_BACKEND=openai usa un servidor HTTP compatible con OpenAI (llama-server, vLLM)
+#   con pool keep-alive y reintentos (services/llm_adapter/openai_backend.py).
+# - LLM_BACKEND=sim reemplaza llama.cpp por SimulatedLlama (services/llm_adapter/simulated.py):
+#   mismo planificador, streaming y métricas, con latencias configurables (LLM_SIM_*).
+# - Streaming: generate_stream() itera create_completion(stream=True) en un hilo y
+#   entrega fragmentos; lo usa POST /chat/stream (SSE). Cortar la iteración detiene
+#   la generación en el próximo token.
+# - Trazas (WEBCHATBOT_TRACING): spans llm.generate / llm.generate_stream y, en el hilo
+#   de inferencia, llama.create_completion (services/observability/tracing.py).
+# - Métricas: cada generación suma sus fases (llm_queue, llm_prompt, llm_decode o
+#   llm_generate) a la consulta en curso y registra tokens de prompt/salida y tokens/s
+#   (services/observability/metrics.py, GET /metrics).
 # - Loggers: INFO/WARN/ERROR/EXCEPTION van a stdout (config del proceso Uvicorn).
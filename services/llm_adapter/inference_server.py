@@ -0,0 +1,176 @@
+"""Servidor de inferencia local: un proceso dueño del modelo, atendido por socket UNIX.
+
+Ejecuta un `LLMClient` con backend local (llama.cpp en proceso o pool de
+workers, planificador de admisión, cache de prefijos) y lo expone con el
+protocolo de líneas JSON descripto en `services/llm_adapter/remote.py`.
+
+Uso
+---
+python -m services.llm_adapter.inference_server --socket /tmp/webchatbot-llm.sock
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import logging
+import os
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+import orjson
+
+from services.llm_adapter.client import LLMClient
+from services.llm_adapter.remote import encode_frame
+from services.llm_adapter.scheduler import SchedulerRejected
+from services.llm_adapter.settings import LLMSettings
+
+LOGGER = logging.getLogger(__name__)
+
+Send = Callable[[dict[str, Any]], Awaitable[None]]
+
+
+class InferenceServer:
+    """Atiende conexiones de los workers de la API sobre un `LLMClient` local."""
+
+    def __init__(self, llm: Any, socket_path: Path | str) -> None:
+        self._llm = llm
+        self.socket_path = str(socket_path)
+        self._server: asyncio.AbstractServer | None = None
+
+    async def start(self) -> None:
+        path = Path(self.socket_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with contextlib.suppress(FileNotFoundError):
+            path.unlink()  # socket huérfano de una ejecución anterior
+        self._server = await asyncio.start_unix_server(self._handle, path=self.socket_path, limit=2**20)
+        os.chmod(self.socket_path, 0o660)
+        LOGGER.info("Servidor de inferencia escuchando en %s", self.socket_path)
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        assert self._server is not None
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def aclose(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        tasks: dict[str, asyncio.Task[None]] = {}
+        write_lock = asyncio.Lock()
+
+        async def send(frame: dict[str, Any]) -> None:
+            async with write_lock:
+                writer.write(encode_frame(frame))
+                await writer.drain()
+
+        try:
+            while line := await reader.readline():
+                try:
+                    msg = orjson.loads(line)
+                except ValueError:
+                    await send({"id": None, "type": "error", "status": 400, "detail": "JSON inválido"})
+                    continue
+                req_id = str(msg.get("id"))
+                op = msg.get("op")
+                if op == "cancel":
+                    task = tasks.get(req_id)
+                    if task is not None:
+                        task.cancel()
+                elif op == "health":
+                    await send({"id": req_id, "type": "done", **self._status()})
+                elif op in {"generate", "stream"} and req_id not in tasks:
+                    task = asyncio.create_task(self._serve(req_id, msg, send))
+                    tasks[req_id] = task
+                    task.add_done_callback(lambda _t, rid=req_id: tasks.pop(rid, None))
+                else:
+                    await send({"id": req_id, "type": "error", "status": 400, "detail": f"Operación inválida: {op!r}"})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for task in list(tasks.values()):
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            writer.close()
+
+    def _status(self) -> dict[str, Any]:
+        return {
+            "state": getattr(self._llm, "state", "ready"),
+            "model": getattr(self._llm, "model_id", ""),
+        }
+
+    async def _serve(self, req_id: str, msg: dict[str, Any], send: Send) -> None:
+        prompt = str(msg.get("prompt") or "")
+        kwargs = dict(msg.get("kwargs") or {})
+        try:
+            if getattr(self._llm, "warming_up", False):
+                await send({"id": req_id, "type": "error", "status": 503, "detail": "Modelo iniciando", **self._status()})
+                return
+            if msg.get("op") == "stream":
+                async for chunk in self._llm.generate_stream(prompt, **kwargs):
+                    await send({"id": req_id, "type": "chunk", "text": chunk})
+                await send({"id": req_id, "type": "done", **self._status()})
+            else:
+                text = await self._llm.generate(prompt, **kwargs)
+                await send({"id": req_id, "type": "done", "text": text, **self._status()})
+        except SchedulerRejected as exc:
+            await send({"id": req_id, "type": "error", "status": 503, "detail": str(exc), "retry_after_s": exc.retry_after_s})
+        except asyncio.CancelledError:
+            raise
+        except ConnectionError as exc:
+            LOGGER.warning("Solicitud %s interrumpida: %s", req_id, exc)
+        except Exception as exc:  # pragma: no cover - errores inesperados del backend
+            LOGGER.exception("Error atendiendo la solicitud %s", req_id)
+            with contextlib.suppress(Exception):
+                await send({"id": req_id, "type": "error", "status": 500, "detail": str(exc)})
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Servidor de inferencia LLM por socket UNIX")
+    parser.add_argument("--socket", default=None, help="Ruta del socket (default: LLM_SOCKET_PATH)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    # Este proceso es el dueño del modelo: siempre backend local
+    settings = LLMSettings().model_copy(update={"backend": "local"})
+    socket_path = args.socket or str(settings.socket_path)
+    server = InferenceServer(LLMClient(settings=settings), socket_path)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
+
+# ================================================================
+# Guía de uso (Despliegue dividido: API + servidor de inferencia)
+# ================================================================
+#
+# Arranque
+# --------
+# 1) Servidor de inferencia (un proceso, dueño del GGUF):
+#      make run-inference          # = python -m services.llm_adapter.inference_server
+# 2) API sin modelo, con varios workers:
+#      LLM_BACKEND=unix uvicorn services.api.main:app --workers 4
+#
+# Parametrización
+# ---------------
+# - LLM_SOCKET_PATH (/tmp/webchatbot-llm.sock): ruta compartida por ambos lados.
+# - La capacidad de inferencia se dimensiona en el servidor (LLM_CONCURRENCY,
+#   LLM_POOL_WORKERS, LLM_QUEUE_MAX); los workers de la API escalan aparte.
+#
+# Consideraciones
+# ---------------
+# - Cola llena o modelo iniciando en el servidor → la API responde 503 con Retry-After.
+# - Si el socket no existe o se cae la conexión, la API usa el placeholder y /readyz
+#   informa "unreachable"; la conexión se restablece en la siguiente solicitud.
+# - Cortar un stream en la API envía "cancel" y libera el modelo en el servidor.
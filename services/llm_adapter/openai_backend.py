@@ -0,0 +1,224 @@
+"""Backend LLM HTTP compatible con la API de OpenAI (`/v1/completions`).
+
+Sirve para el servidor de llama.cpp (`llama-server`), vLLM, LM Studio, Ollama
+(modo OpenAI) y similares. Se activa con `LLM_BACKEND=openai`.
+
+- Un `httpx.AsyncClient` compartido por proceso (por event loop), con pool de
+  conexiones y keep-alive: no se abre una conexión TCP por consulta.
+- Timeouts separados de conexión y lectura.
+- Reintentos con backoff exponencial y jitter ante errores de conexión y
+  respuestas 429/502/503/504 (respeta `Retry-After`). En streaming sólo se
+  reintenta antes de recibir el primer fragmento.
+- Saturación persistente (429/503) → `SchedulerBusy` (la API responde 503);
+  otros errores → `RemoteLLMError` (el cliente cae en el placeholder).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+from typing import Any, AsyncIterator
+
+import httpx
+import orjson
+
+from services.llm_adapter.remote import RemoteLLMError
+from services.llm_adapter.scheduler import SchedulerBusy
+
+LOGGER = logging.getLogger(__name__)
+
+_RETRY_STATUS = frozenset({429, 502, 503, 504})
+_BUSY_STATUS = frozenset({429, 503})
+# kwargs internos del orquestador que no forman parte de la API
+_GENERATION_KEYS = ("max_tokens", "temperature", "top_p")
+
+
+class OpenAICompatBackend:
+    """Cliente de `/v1/completions` con pool de conexiones y reintentos."""
+
+    def __init__(
+        self,
+        base_url: str,
+        *,
+        model: str = "local",
+        api_key: str | None = None,
+        timeout_s: float = 60.0,
+        connect_timeout_s: float = 5.0,
+        retries: int = 2,
+        backoff_s: float = 0.25,
+        max_connections: int = 16,
+        defaults: dict[str, Any] | None = None,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.retries = max(0, int(retries))
+        self.backoff_s = backoff_s
+        self.defaults = dict(defaults or {})
+        self.state = "unknown"
+        self.model_id = f"openai:{self.base_url}:{model}"
+        self._headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self._timeout = httpx.Timeout(timeout_s, connect=connect_timeout_s)
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=30.0,
+        )
+        self._transport = transport
+        self._client: httpx.AsyncClient | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._counters = {"requests": 0, "retries": 0, "errors": 0}
+
+    def readiness(self) -> dict[str, Any]:
+        return {
+            "ready": self.state != "unreachable",
+            "state": self.state,
+            "backend": "openai",
+            "base_url": self.base_url,
+            **self._counters,
+        }
+
+    async def generate(self, prompt: str, **kwargs: Any) -> str:
+        payload = self._payload(prompt, kwargs, stream=False)
+        response = await self._post(payload)
+        try:
+            data = orjson.loads(response.content)
+            return str(data["choices"][0].get("text") or "").strip()
+        except (ValueError, KeyError, IndexError, TypeError) as exc:
+            self._counters["errors"] += 1
+            raise RemoteLLMError(f"Respuesta inválida del backend OpenAI: {exc}") from exc
+
+    async def generate_stream(self, prompt: str, **kwargs: Any) -> AsyncIterator[str]:
+        payload = self._payload(prompt, kwargs, stream=True)
+        client = self._get_client()
+        yielded = False
+        for attempt in range(self.retries + 1):
+            self._counters["requests"] += 1
+            try:
+                async with client.stream("POST", "/completions", json=payload, headers=self._headers) as response:
+                    if response.status_code >= 400:
+                        await response.aread()
+                        if self._should_retry(response.status_code, attempt):
+                            await self._sleep_backoff(attempt, response)
+                            continue
+                        self._raise_status(response)
+                    self.state = "ready"
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[5:].strip()
+                        if data == "[DONE]":
+                            return
+                        try:
+                            text = orjson.loads(data)["choices"][0].get("text") or ""
+                        except (ValueError, KeyError, IndexError, TypeError):
+                            continue
+                        if text:
+                            yielded = True
+                            yield text
+                    return
+            except httpx.TransportError as exc:
+                # Reintentar a mitad de stream duplicaría texto ya entregado
+                if not yielded and attempt < self.retries:
+                    await self._sleep_backoff(attempt)
+                    continue
+                self._unreachable(exc)
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _payload(self, prompt: str, kwargs: dict[str, Any], *, stream: bool) -> dict[str, Any]:
+        payload: dict[str, Any] = {**self.defaults, "model": self.model, "prompt": prompt, "stream": stream}
+        for key in _GENERATION_KEYS:
+            if kwargs.get(key) is not None:
+                payload[key] = kwargs[key]
+        return payload
+
+    def _get_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            # Un cliente (pool de conexiones) por event loop; se reutiliza entre consultas
+            self._loop = loop
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self._timeout,
+                limits=self._limits,
+                transport=self._transport,
+            )
+        return self._client
+
+    async def _post(self, payload: dict[str, Any]) -> httpx.Response:
+        client = self._get_client()
+        for attempt in range(self.retries + 1):
+            self._counters["requests"] += 1
+            try:
+                response = await client.post("/completions", json=payload, headers=self._headers)
+            except httpx.TransportError as exc:
+                if attempt < self.retries:
+                    await self._sleep_backoff(attempt)
+                    continue
+                self._unreachable(exc)
+            if response.status_code < 400:
+                self.state = "ready"
+                return response
+            if self._should_retry(response.status_code, attempt):
+                await self._sleep_backoff(attempt, response)
+                continue
+            self._raise_status(response)
+        raise RemoteLLMError("Reintentos agotados")  # pragma: no cover - inalcanzable
+
+    def _should_retry(self, status: int, attempt: int) -> bool:
+        return status in _RETRY_STATUS and attempt < self.retries
+
+    async def _sleep_backoff(self, attempt: int, response: httpx.Response | None = None) -> None:
+        self._counters["retries"] += 1
+        delay = self.backoff_s * (2**attempt) * random.uniform(0.5, 1.5)
+        if response is not None:
+            try:
+                delay = max(delay, min(10.0, float(response.headers.get("Retry-After", 0))))
+            except ValueError:
+                pass
+        await asyncio.sleep(delay)
+
+    def _raise_status(self, response: httpx.Response) -> None:
+        self._counters["errors"] += 1
+        detail = f"Backend OpenAI respondió {response.status_code}"
+        if response.status_code in _BUSY_STATUS:
+            exc = SchedulerBusy(f"LLM ocupado: {detail}")
+            try:
+                exc.retry_after_s = float(response.headers.get("Retry-After", 1.0))
+            except ValueError:
+                pass
+            raise exc
+        raise RemoteLLMError(f"{detail}: {response.text[:200]}")
+
+    def _unreachable(self, exc: Exception) -> None:
+        self._counters["errors"] += 1
+        self.state = "unreachable"
+        raise RemoteLLMError(f"Backend OpenAI no disponible en {self.base_url}: {exc}") from exc
+
+# ================================================================
+# Guía de uso (Backend OpenAI-compatible)
+# ================================================================
+#
+# Ejemplo con el servidor de llama.cpp
+# ------------------------------------
+# llama-server -m modelos/gemma-3-1b-it-Q4_K_M.gguf --port 8080 --parallel 4
+# LLM_BACKEND=openai LLM_OPENAI_BASE_URL=http://127.0.0.1:8080/v1 uvicorn services.api.main:app
+#
+# Parametrización (vía LLMSettings / variables de entorno)
+# --------------------------------------------------------
+# - LLM_OPENAI_BASE_URL (http://127.0.0.1:8080/v1), LLM_OPENAI_MODEL (local),
+#   LLM_OPENAI_API_KEY (opcional, header Bearer).
+# - LLM_HTTP_TIMEOUT_S (60) / LLM_HTTP_CONNECT_TIMEOUT_S (5): lectura y conexión.
+# - LLM_HTTP_RETRIES (2): reintentos con backoff exponencial + jitter.
+# - LLM_HTTP_MAX_CONNECTIONS (16): tamaño del pool keep-alive.
+#
+# Consideraciones
+# ---------------
+# - Usa /v1/completions (el orquestador ya arma el prompt completo).
+# - La concurrencia la administra el servidor remoto; la API no aplica su cola local.
+# - Pruebas: tests/unit/test_openai_backend.py usa un servidor stub ASGI vía httpx.
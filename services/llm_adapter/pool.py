@@ -0,0 +1,324 @@
+"""Pool de procesos llama.cpp que comparten los pesos del modelo vía mmap.
+
+Cada worker es un proceso con su propio contexto `Llama` (KV cache, scratch)
+cargado desde el mismo GGUF con `use_mmap=True`: los pesos se mapean desde
+el page cache del sistema operativo, por lo que N workers no multiplican el
+uso de RAM del modelo; sólo suman su contexto.
+
+`LlamaProcessPool` expone `create_completion(...)` con la misma firma que
+`Llama`, así `LLMClient` lo usa sin cambios (stream=True/False). Cada worker
+mantiene su propio `PrefixCache` (kwargs prefix/prefix_key).
+
+- Despacho: al worker con menos solicitudes asignadas (least-loaded).
+- Un worker atiende una generación a la vez (lock por worker).
+- Caída de un worker (EOF en el pipe): la solicitud en curso falla, el
+  proceso se reinicia y el resto del pool sigue atendiendo.
+- Tamaño: fijo o automático según núcleos y RAM disponible (`auto_pool_size`).
+"""
+
+from __future__ import annotations
+
+import itertools
+import logging
+import multiprocessing as mp
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+from services.llm_adapter.prefix_cache import create_completion_with_prefix
+
+LOGGER = logging.getLogger(__name__)
+
+
+class WorkerCrashed(RuntimeError):
+    """El proceso worker terminó inesperadamente durante una solicitud."""
+
+
+def load_llama(model_path: str, n_ctx: int, n_threads: int | None) -> Any:
+    """Factory por defecto (se ejecuta dentro del proceso worker)."""
+    from llama_cpp import Llama  # type: ignore
+
+    return Llama(
+        model_path=model_path,
+        n_ctx=n_ctx,
+        n_threads=n_threads,
+        use_mmap=True,
+        use_mlock=False,
+        logits_all=False,
+        embedding=False,
+        verbose=False,
+    )
+
+
+def _worker_main(conn: Any, factory: Callable[[], Any], cache_factory: Callable[[], Any] | None = None) -> None:
+    """Bucle del proceso worker: recibe solicitudes y devuelve resultados/chunks."""
+    llm = factory()
+    cache = cache_factory() if cache_factory is not None else None
+    conn.send(("ready", os.getpid()))
+    while True:
+        try:
+            msg = conn.recv()
+        except (EOFError, OSError):
+            return
+        kind = msg[0]
+        if kind == "stop":
+            return
+        if kind != "gen":
+            continue  # cancelaciones tardías de solicitudes ya terminadas
+        _, req_id, prompt, params, stream = msg
+        try:
+            if stream:
+                for part in create_completion_with_prefix(llm, cache, prompt, stream=True, **params):
+                    conn.send(("chunk", req_id, part))
+                    if conn.poll():
+                        ctrl = conn.recv()
+                        if ctrl[0] == "stop":
+                            return
+                        if ctrl[0] == "cancel" and ctrl[1] == req_id:
+                            break
+                conn.send(("done", req_id, None))
+            else:
+                out = create_completion_with_prefix(llm, cache, prompt, stream=False, **params)
+                conn.send(("done", req_id, out))
+        except Exception as exc:  # pragma: no cover - depende del backend
+            conn.send(("error", req_id, repr(exc)))
+
+
+@dataclass
+class _Worker:
+    idx: int
+    process: Any = None
+    conn: Any = None
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    ready: bool = False
+    assigned: int = 0
+    served: int = 0
+    restarts: int = 0
+
+
+class LlamaProcessPool:
+    """Pool de N procesos llama.cpp con interfaz compatible con `Llama`."""
+
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        size: int,
+        *,
+        mp_context: str = "spawn",
+        cache_factory: Callable[[], Any] | None = None,
+    ) -> None:
+        self._factory = factory
+        self._cache_factory = cache_factory
+        self._ctx = mp.get_context(mp_context)
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._workers = [_Worker(idx=i) for i in range(max(1, int(size)))]
+        self._closed = False
+        for worker in self._workers:
+            self._spawn(worker)
+
+    @property
+    def size(self) -> int:
+        return len(self._workers)
+
+    def create_completion(self, prompt: str, stream: bool = False, **params: Any) -> Any:
+        """Misma firma que `Llama.create_completion` (bloqueante; usar desde un hilo)."""
+        if stream:
+            return self._stream(prompt, params)
+        result = None
+        for kind, payload in self._dispatch(prompt, params, stream=False):
+            if kind == "done":
+                result = payload
+        return result
+
+    def wait_ready(self, timeout: float | None = None) -> bool:
+        """Espera el aviso "ready" de cada worker (modelo cargado). True si todos cargaron."""
+        deadline = (time.monotonic() + timeout) if timeout is not None else None
+        for worker in self._workers:
+            with worker.lock:
+                while not worker.ready:
+                    remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                    if not worker.conn.poll(remaining):
+                        return False
+                    try:
+                        msg = self._recv(worker)
+                    except WorkerCrashed:
+                        if worker.restarts >= 3:
+                            return False  # el modelo no carga: no reintentar indefinidamente
+                        continue
+                    if msg[0] == "ready":
+                        worker.ready = True
+        return True
+
+    def stats(self) -> list[dict[str, Any]]:
+        return [
+            {
+                "idx": w.idx,
+                "pid": w.process.pid if w.process is not None else None,
+                "alive": bool(w.process is not None and w.process.is_alive()),
+                "ready": w.ready,
+                "assigned": w.assigned,
+                "served": w.served,
+                "restarts": w.restarts,
+            }
+            for w in self._workers
+        ]
+
+    def close(self) -> None:
+        self._closed = True
+        for worker in self._workers:
+            try:
+                worker.conn.send(("stop",))
+            except Exception:
+                pass
+            if worker.process is not None:
+                worker.process.join(timeout=2)
+                if worker.process.is_alive():
+                    worker.process.kill()
+
+    def _stream(self, prompt: str, params: dict[str, Any]) -> Iterator[dict[str, Any]]:
+        for kind, payload in self._dispatch(prompt, params, stream=True):
+            if kind == "chunk":
+                yield payload
+
+    def _dispatch(self, prompt: str, params: dict[str, Any], stream: bool) -> Iterator[tuple[str, Any]]:
+        if self._closed:
+            raise RuntimeError("LlamaProcessPool cerrado")
+        with self._lock:
+            worker = min(self._workers, key=lambda w: (w.assigned, w.idx))
+            worker.assigned += 1
+        try:
+            with worker.lock:
+                if worker.process is None or not worker.process.is_alive():
+                    self._restart(worker)
+                yield from self._exchange(worker, prompt, params, stream)
+                worker.served += 1
+        finally:
+            with self._lock:
+                worker.assigned -= 1
+
+    def _exchange(self, worker: _Worker, prompt: str, params: dict[str, Any], stream: bool) -> Iterator[tuple[str, Any]]:
+        req_id = next(self._ids)
+        conn = worker.conn
+        finished = False
+        try:
+            worker.conn.send(("gen", req_id, prompt, params, stream))
+            while True:
+                msg = self._recv(worker)
+                if msg[0] == "ready":
+                    worker.ready = True
+                    continue
+                if msg[1] != req_id:
+                    continue
+                if msg[0] == "error":
+                    finished = True
+                    raise RuntimeError(f"Worker {worker.idx}: {msg[2]}")
+                if msg[0] == "done":
+                    finished = True
+                    yield ("done", msg[2])
+                    return
+                yield ("chunk", msg[2])
+        finally:
+            # Si el worker se reinició (conn distinta) no hay nada que drenar
+            if not finished and worker.conn is conn:
+                # El consumidor cortó el stream: cancelar y drenar hasta el cierre
+                # para dejar el pipe limpio antes de liberar el worker.
+                try:
+                    worker.conn.send(("cancel", req_id))
+                    while True:
+                        msg = self._recv(worker)
+                        if msg[0] in {"done", "error"} and msg[1] == req_id:
+                            break
+                except WorkerCrashed:
+                    pass
+
+    def _recv(self, worker: _Worker) -> tuple[Any, ...]:
+        try:
+            return worker.conn.recv()
+        except (EOFError, OSError):
+            LOGGER.error("Worker LLM %s terminó inesperadamente; reiniciando", worker.idx)
+            self._restart(worker)
+            raise WorkerCrashed(f"Worker {worker.idx} terminó inesperadamente")
+
+    def _spawn(self, worker: _Worker) -> None:
+        parent, child = self._ctx.Pipe(duplex=True)
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(child, self._factory, self._cache_factory),
+            name=f"llm-worker-{worker.idx}",
+            daemon=True,
+        )
+        process.start()
+        child.close()
+        worker.process = process
+        worker.conn = parent
+        worker.ready = False
+
+    def _restart(self, worker: _Worker) -> None:
+        if self._closed:
+            return
+        if worker.process is not None:
+            if worker.process.is_alive():
+                worker.process.kill()
+            worker.process.join(timeout=2)
+        if worker.conn is not None:
+            worker.conn.close()
+        worker.restarts += 1
+        self._spawn(worker)
+
+
+def _mem_available_bytes() -> int | None:
+    try:
+        with open("/proc/meminfo", encoding="utf-8") as fh:
+            for line in fh:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def auto_pool_size(model_path: Path, threads_per_worker: int = 4, worker_mem_mb: int = 512) -> int:
+    """Cantidad de workers según núcleos y RAM disponible.
+
+    - CPU: núcleos / threads_per_worker.
+    - RAM: (disponible − tamaño del GGUF, compartido una vez vía page cache) /
+      memoria propia estimada por worker (KV cache + buffers).
+    """
+    cores = os.cpu_count() or 1
+    by_cpu = max(1, cores // max(1, threads_per_worker))
+    available = _mem_available_bytes()
+    if available is None:
+        return by_cpu
+    try:
+        model_bytes = model_path.stat().st_size
+    except OSError:
+        model_bytes = 0
+    by_ram = max(1, (available - model_bytes) // max(1, worker_mem_mb * 2**20))
+    return int(max(1, min(by_cpu, by_ram)))
+
+# ================================================================
+# Guía de uso (Pool de workers llama.cpp)
+# ================================================================
+#
+# Activación (variables de entorno, ver services/llm_adapter/settings.py)
+# ----------------------------------------------------------------------
+# - LLM_POOL_WORKERS=0       → modelo en el mismo proceso (default).
+# - LLM_POOL_WORKERS=4       → 4 procesos worker.
+# - LLM_POOL_WORKERS=auto    → según núcleos y RAM (auto_pool_size).
+# - LLM_POOL_THREADS (4)     → hilos de llama.cpp por worker.
+# - LLM_POOL_WORKER_MEM_MB (512) → RAM propia estimada por worker para el cálculo automático.
+#
+# Consideraciones
+# ---------------
+# - La concurrencia del InferenceScheduler se iguala al tamaño del pool.
+# - Workers con contexto `spawn` (seguro con hilos del servidor); cada uno carga
+#   el modelo al iniciar (mmap: la primera carga calienta el page cache y las
+#   siguientes son rápidas).
+# - Estado por worker en GET /chat/admin/llm/scheduler ("workers").
@@ -0,0 +1,253 @@
+"""Reutilización del KV cache de prefijos fijos por bot (llama.cpp save/load_state).
+
+Los prompts del orquestador empiezan siempre con el mismo texto por bot
+(preludio "Usá exclusivamente el CONTEXTO…" + `pre_prompts`). Sin cache,
+llama.cpp re-evalúa ese prefijo en cada solicitud.
+
+`PrefixCache` guarda, por (bot, prefijo), el estado del modelo tras evaluar
+sólo el prefijo (`Llama.save_state()`). Antes de generar se restaura con
+`Llama.load_state()`: `create_completion` detecta el prefijo común de tokens
+con el estado cargado y evalúa únicamente el sufijo (contexto + pregunta).
+
+- Memoria: LRU con `max_entries` estados.
+- Disco (opcional): un archivo por estado en `directory`; al reiniciar el
+  proceso, el primer uso de cada bot carga el estado desde disco en vez de
+  re-evaluar el prefijo. La clave incluye la identidad del modelo (ruta,
+  tamaño, mtime) para no restaurar estados de otro GGUF.
+
+Formato en disco (sin pickle: el archivo nunca se deserializa como objetos
+Python): cabecera fija `WCKV` + versión + largo, un JSON con el modelo, la
+cantidad de tokens, el hash del prefijo y la semilla, y a continuación los
+bytes crudos del estado de llama.cpp. La cabecera se verifica contra el modelo
+y el prefijo actuales antes de `load_state`; si no coincide, el archivo se descarta.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import inspect
+import logging
+import os
+import re
+import struct
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+import orjson
+
+LOGGER = logging.getLogger(__name__)
+
+_UNSAFE_CHARS = re.compile(r"[^A-Za-z0-9_.-]+")
+
+_MAGIC = b"WCKV"
+_VERSION = 1
+_HEADER = struct.Struct("<4sBI")  # magic, versión, largo del JSON de metadatos
+
+
+def model_identity(model_path: Path | str | None) -> str:
+    """Identificador estable del modelo para invalidar estados persistidos."""
+    if not model_path:
+        return ""
+    path = Path(model_path)
+    try:
+        st = path.stat()
+    except OSError:
+        return str(path)
+    return f"{path.resolve()}:{st.st_size}:{int(st.st_mtime)}"
+
+
+class PrefixCache:
+    """Estados KV por (bot, prefijo) en memoria (LRU) y opcionalmente en disco."""
+
+    def __init__(self, *, max_entries: int = 8, directory: Path | str | None = None, model_id: str = "") -> None:
+        self.max_entries = max(1, int(max_entries))
+        self.directory = Path(directory) if directory else None
+        self.model_id = model_id
+        self._states: OrderedDict[str, Any] = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "disk_hits": 0, "misses": 0, "errors": 0}
+
+    def key(self, bot_id: str, prefix: str) -> str:
+        digest = hashlib.sha1(f"{self.model_id}\0{prefix}".encode("utf-8")).hexdigest()[:16]
+        return f"{_UNSAFE_CHARS.sub('_', bot_id or 'default')}-{digest}"
+
+    def prepare(self, llama: Any, bot_id: str, prefix: str) -> bool:
+        """Deja a `llama` con el prefijo evaluado. Devuelve True si se reutilizó un estado."""
+        if not prefix:
+            return False
+        key = self.key(bot_id, prefix)
+        state = self._get(key)
+        if state is None:
+            tokens = llama.tokenize(prefix.encode("utf-8"), add_bos=True)
+            if not tokens or len(tokens) >= llama.n_ctx():
+                return False
+            state = self._load(key, llama, prefix, tokens)
+            if state is None:
+                llama.reset()
+                llama.eval(tokens)
+                state = llama.save_state()
+                self._put(key, state, prefix)
+                self._counters["misses"] += 1
+                return False
+            self._counters["disk_hits"] += 1
+            with self._lock:
+                self._remember(key, state)
+        llama.load_state(state)
+        return True
+
+    def stats(self) -> dict[str, Any]:
+        return {"entries": len(self._states), "max_entries": self.max_entries, **self._counters}
+
+    def _get(self, key: str) -> Any:
+        with self._lock:
+            state = self._states.get(key)
+            if state is not None:
+                self._states.move_to_end(key)
+                self._counters["hits"] += 1
+            return state
+
+    def _put(self, key: str, state: Any, prefix: str) -> None:
+        with self._lock:
+            self._remember(key, state)
+        self._persist(key, state, prefix)
+
+    def _remember(self, key: str, state: Any) -> None:
+        self._states[key] = state
+        self._states.move_to_end(key)
+        while len(self._states) > self.max_entries:
+            self._states.popitem(last=False)
+
+    def _path(self, key: str) -> Path | None:
+        return (self.directory / f"{key}.state") if self.directory is not None else None
+
+    def _load(self, key: str, llama: Any, prefix: str, tokens: list[int]) -> Any:
+        """Estado desde disco si la cabecera coincide con este modelo y prefijo; None si no."""
+        path = self._path(key)
+        if path is None or not path.exists():
+            return None
+        try:
+            meta, raw = _decode(path.read_bytes())
+            expected = {"model": self.model_id, "n_tokens": len(tokens), "prefix": _prefix_hash(prefix)}
+            if any(meta.get(name) != value for name, value in expected.items()) or meta.get("size") != len(raw):
+                raise ValueError(f"cabecera no coincide: {meta}")
+            return _build_state(llama, tokens, raw, int(meta.get("seed") or 0))
+        except Exception:
+            self._counters["errors"] += 1
+            LOGGER.warning("Estado KV inválido en %s; se descarta", path, exc_info=True)
+            path.unlink(missing_ok=True)
+            return None
+
+    def _persist(self, key: str, state: Any, prefix: str) -> None:
+        path = self._path(key)
+        if path is None:
+            return
+        try:
+            raw = bytes(state.llama_state[: state.llama_state_size])
+            meta = {
+                "model": self.model_id,
+                "n_tokens": int(state.n_tokens),
+                "prefix": _prefix_hash(prefix),
+                "seed": int(getattr(state, "seed", 0) or 0),
+                "size": len(raw),
+            }
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Escritura atómica: varios workers del pool pueden escribir la misma clave
+            tmp = path.with_suffix(f".tmp{os.getpid()}")
+            tmp.write_bytes(_encode(meta, raw))
+            os.replace(tmp, path)
+        except Exception:
+            self._counters["errors"] += 1
+            LOGGER.exception("No se pudo persistir el estado KV en %s", path)
+
+
+def _prefix_hash(prefix: str) -> str:
+    return hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+
+
+def _encode(meta: dict[str, Any], raw: bytes) -> bytes:
+    header = orjson.dumps(meta)
+    return _HEADER.pack(_MAGIC, _VERSION, len(header)) + header + raw
+
+
+def _decode(data: bytes) -> tuple[dict[str, Any], bytes]:
+    """(metadatos, bytes del estado); ValueError si no es un archivo de esta versión."""
+    if len(data) < _HEADER.size:
+        raise ValueError("archivo truncado")
+    magic, version, length = _HEADER.unpack_from(data)
+    if magic != _MAGIC or version != _VERSION:
+        raise ValueError(f"formato desconocido: {magic!r} v{version}")
+    start = _HEADER.size
+    meta = orjson.loads(data[start : start + length])
+    if not isinstance(meta, dict):
+        raise ValueError("metadatos inválidos")
+    return meta, data[start + length :]
+
+
+def _build_state(llama: Any, tokens: list[int], raw: bytes, seed: int) -> Any:
+    """Arma un `LlamaState` a partir de los bytes crudos y los tokens del prefijo.
+
+    Pensado para `load_state` de llama-cpp-python 0.2.66:
+    - `input_ids` reemplaza el buffer del modelo: va con largo n_ctx (el prefijo
+      al principio), no con el largo del prefijo;
+    - `scores` se copia en las primeras n_tokens filas: una sola fila en cero se
+      propaga (broadcast) sin reservar n_tokens × n_vocab floats. Los logits del
+      prefijo no hacen falta: `generate` siempre re-evalúa el último token;
+    - `seed` sólo existe en versiones posteriores: se pasa si el constructor lo acepta.
+    """
+    import numpy as np  # type: ignore
+    from llama_cpp import LlamaState  # type: ignore
+
+    input_ids = np.zeros((llama.n_ctx(),), dtype=np.intc)
+    input_ids[: len(tokens)] = tokens
+    params: dict[str, Any] = {
+        "input_ids": input_ids,
+        "scores": np.zeros((1, llama.n_vocab()), dtype=np.single),
+        "n_tokens": len(tokens),
+        "llama_state": raw,
+        "llama_state_size": len(raw),
+    }
+    if "seed" in inspect.signature(LlamaState).parameters:
+        params["seed"] = seed
+    return LlamaState(**params)
+
+
+def create_completion_with_prefix(
+    llama: Any,
+    cache: PrefixCache | None,
+    prompt: str,
+    *,
+    prefix: str = "",
+    prefix_key: str = "",
+    **params: Any,
+) -> Any:
+    """`llama.create_completion` restaurando antes el estado del prefijo (si aplica)."""
+    if cache is not None and prefix and prompt.startswith(prefix):
+        try:
+            cache.prepare(llama, prefix_key, prefix)
+        except Exception:  # pragma: no cover - depende del backend
+            LOGGER.exception("Falló la restauración del prefijo KV; se evalúa el prompt completo")
+    return llama.create_completion(prompt=prompt, **params)
+
+# ================================================================
+# Guía de uso (Cache de prefijos KV)
+# ================================================================
+#
+# Parametrización (vía LLMSettings / variables de entorno)
+# --------------------------------------------------------
+# - LLM_PREFIX_CACHE (1): habilita la reutilización de prefijos.
+# - LLM_PREFIX_CACHE_MAX (8): estados en memoria (LRU). Cada estado ocupa
+#   aprox. tokens_del_prefijo × tamaño de KV por token.
+# - LLM_PREFIX_CACHE_DIR: carpeta para persistir estados entre reinicios
+#   (scripts/export_webchatbot_env.sh la define en modelos/kv_cache).
+#
+# Consideraciones
+# ---------------
+# - El orquestador indica el largo del prefijo estable en LLMPlan.prefix_len;
+#   el cliente lo pasa como prefix/prefix_key a create_completion_with_prefix.
+# - Cambiar pre_prompts genera otra clave; los estados viejos expiran por LRU
+#   (en disco pueden borrarse sin riesgo).
+# - Archivos en disco: cabecera versionada + bytes crudos de llama.cpp (nunca pickle);
+#   uno que no coincide con el modelo o el prefijo actual se descarta y se re-evalúa.
+# - Estadísticas en GET /chat/admin/llm/scheduler ("prefix_cache").
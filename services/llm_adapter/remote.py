@@ -0,0 +1,234 @@
+"""Backend LLM remoto: cliente del servidor de inferencia por socket UNIX.
+
+Con `LLM_BACKEND=unix`, los workers de la API no cargan el modelo: delegan
+cada generación en `services/llm_adapter/inference_server.py`, un proceso
+aparte que posee el GGUF (y su planificador/pool). Así se escalan los
+workers de uvicorn sin multiplicar copias del modelo.
+
+Protocolo (una línea JSON por frame, varias solicitudes multiplexadas por
+conexión, correlacionadas por `id`)
+------------------------------------------------------------------------
+Cliente → servidor
+- {"id", "op": "generate" | "stream", "prompt", "kwargs": {...}}
+- {"id", "op": "cancel"}                   corta una solicitud en curso
+- {"id", "op": "health"}                   estado del backend del servidor
+
+Servidor → cliente
+- {"id", "type": "chunk", "text"}          fragmento (op "stream")
+- {"id", "type": "done", "text"?, "model", "state"}   fin de la solicitud
+- {"id", "type": "error", "status", "detail", "state"?}
+  status 503 = saturado (SchedulerBusy) o modelo iniciando (ModelLoading)
+
+`state` se actualiza con cada respuesta y, mientras el servidor está
+"loading" o "unreachable", con un sondeo de "health" en segundo plano: así
+GET /readyz se recupera aunque no llegue tráfico. Las solicitudes se reenvían
+siempre; el servidor decide si puede atenderlas.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+from pathlib import Path
+from typing import Any, AsyncIterator
+
+import orjson
+
+from services.llm_adapter.scheduler import ModelLoading, SchedulerBusy
+
+LOGGER = logging.getLogger(__name__)
+
+# Estados en los que se sondea "health" hasta que el servidor informe otro
+_NOT_READY = frozenset({"loading", "unreachable"})
+
+
+class RemoteLLMError(RuntimeError):
+    """Error del servidor de inferencia o de la conexión con él."""
+
+
+def encode_frame(frame: dict[str, Any]) -> bytes:
+    return orjson.dumps(frame) + b"\n"
+
+
+class UnixSocketBackend:
+    """Cliente multiplexado y con reconexión del servidor de inferencia."""
+
+    def __init__(self, socket_path: Path | str, *, connect_timeout_s: float = 5.0, health_poll_s: float = 2.0) -> None:
+        self.socket_path = str(socket_path)
+        self.connect_timeout_s = connect_timeout_s
+        self.health_poll_s = max(0.05, health_poll_s)
+        self._state = "unknown"  # último estado informado por el servidor
+        self._poll_task: asyncio.Task[None] | None = None
+        self.model_id = ""
+        self._ids = itertools.count()
+        self._pending: dict[str, asyncio.Queue[dict[str, Any]]] = {}
+        self._writer: asyncio.StreamWriter | None = None
+        self._reader_task: asyncio.Task[None] | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._connect_lock: asyncio.Lock | None = None
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    @state.setter
+    def state(self, value: str) -> None:
+        self._state = value
+        if value in _NOT_READY:
+            self._watch()
+
+    def readiness(self) -> dict[str, Any]:
+        return {
+            "ready": self.state not in _NOT_READY,
+            "state": self.state,
+            "backend": "unix",
+            "socket": self.socket_path,
+        }
+
+    async def generate(self, prompt: str, **kwargs: Any) -> str:
+        async for frame in self._request("generate", prompt, kwargs):
+            if frame["type"] == "done":
+                return str(frame.get("text") or "")
+        return ""
+
+    async def generate_stream(self, prompt: str, **kwargs: Any) -> AsyncIterator[str]:
+        async for frame in self._request("stream", prompt, kwargs):
+            if frame["type"] == "chunk":
+                yield frame["text"]
+
+    async def health(self) -> dict[str, Any]:
+        async for frame in self._request("health", "", {}):
+            if frame["type"] == "done":
+                return frame
+        return {}
+
+    async def aclose(self) -> None:
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            await asyncio.gather(self._poll_task, return_exceptions=True)
+            self._poll_task = None
+        if self._writer is not None:
+            self._writer.close()
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            await asyncio.gather(self._reader_task, return_exceptions=True)
+        self._writer = None
+        self._reader_task = None
+
+    async def _request(self, op: str, prompt: str, kwargs: dict[str, Any]) -> AsyncIterator[dict[str, Any]]:
+        await self._connect()
+        req_id = str(next(self._ids))
+        queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+        self._pending[req_id] = queue
+        finished = False
+        try:
+            await self._send({"id": req_id, "op": op, "prompt": prompt, "kwargs": kwargs})
+            while True:
+                frame = await queue.get()
+                kind = frame.get("type")
+                if kind == "error":
+                    finished = True
+                    self._raise(frame)
+                if kind == "done":
+                    finished = True
+                    self.state = frame.get("state", self.state)
+                    self.model_id = frame.get("model", self.model_id)
+                yield frame
+                if finished:
+                    return
+        finally:
+            self._pending.pop(req_id, None)
+            if not finished and self._writer is not None:
+                # El consumidor cortó (cliente desconectado): liberar el modelo en el servidor
+                try:
+                    await self._send({"id": req_id, "op": "cancel"})
+                except Exception:
+                    pass
+
+    def _raise(self, frame: dict[str, Any]) -> None:
+        self.state = frame.get("state", self.state)
+        detail = str(frame.get("detail") or "error del servidor de inferencia")
+        if frame.get("status") == 503:
+            exc = ModelLoading(detail) if frame.get("state") == "loading" else SchedulerBusy(detail)
+            exc.retry_after_s = float(frame.get("retry_after_s") or 1.0)
+            raise exc
+        raise RemoteLLMError(detail)
+
+    async def _connect(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Nuevo event loop (p. ej. tests): descartar la conexión anterior
+            self._loop = loop
+            self._writer = None
+            self._reader_task = None
+            self._poll_task = None
+            self._connect_lock = asyncio.Lock()
+        assert self._connect_lock is not None
+        async with self._connect_lock:
+            if self._writer is not None and not self._writer.is_closing():
+                return
+            try:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_unix_connection(self.socket_path, limit=2**20),
+                    timeout=self.connect_timeout_s,
+                )
+            except (OSError, asyncio.TimeoutError) as exc:
+                self.state = "unreachable"
+                raise RemoteLLMError(f"Servidor de inferencia no disponible en {self.socket_path}: {exc}") from exc
+            self._writer = writer
+            self._reader_task = loop.create_task(self._read_loop(reader))
+
+    def _watch(self) -> None:
+        """Arranca el sondeo de "health" (uno por loop) si hay un event loop corriendo."""
+        if self._poll_task is not None and not self._poll_task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._poll_task = loop.create_task(self._poll_health())
+
+    async def _poll_health(self) -> None:
+        while self.state in _NOT_READY:
+            await asyncio.sleep(self.health_poll_s)
+            try:
+                await self.health()
+            except Exception as exc:
+                # Sin conexión: _connect ya dejó "unreachable"; se reintenta en el próximo ciclo
+                LOGGER.debug("Sondeo de health sin respuesta: %s", exc)
+
+    async def _send(self, frame: dict[str, Any]) -> None:
+        if self._writer is None:
+            raise RemoteLLMError("Sin conexión con el servidor de inferencia")
+        self._writer.write(encode_frame(frame))
+        await self._writer.drain()
+
+    async def _read_loop(self, reader: asyncio.StreamReader) -> None:
+        try:
+            while line := await reader.readline():
+                frame = orjson.loads(line)
+                queue = self._pending.get(str(frame.get("id")))
+                if queue is not None:
+                    queue.put_nowait(frame)
+        except (OSError, ValueError, asyncio.IncompleteReadError) as exc:
+            LOGGER.warning("Conexión con el servidor de inferencia interrumpida: %s", exc)
+        finally:
+            self._writer = None
+            lost = {"type": "error", "status": 502, "detail": "Conexión con el servidor de inferencia perdida"}
+            for queue in self._pending.values():
+                queue.put_nowait(lost)
+
+# ================================================================
+# Guía de uso (Cliente del servidor de inferencia)
+# ================================================================
+#
+# - Se activa con LLM_BACKEND=unix (LLMClient lo crea y delega generate/generate_stream).
+# - LLM_SOCKET_PATH debe coincidir con el del servidor (make run-inference).
+# - Una conexión por worker de la API; las solicitudes concurrentes se multiplexan
+#   por `id` y se reconecta automáticamente si el servidor se reinicia.
+# - `state` refleja lo último informado por el servidor ("loading" / "unreachable" →
+#   /readyz en 503). En esos estados se sondea "health" cada LLM_HEALTH_POLL_S, así que
+#   /readyz vuelve a 200 cuando el servidor termina de cargar aunque no haya tráfico.
+# - Las solicitudes se reenvían en cualquier estado: si el servidor sigue cargando
+#   responde 503 "loading" (ModelLoading) y el orquestador contesta "iniciando".
@@ -0,0 +1,262 @@
+"""Planificador de inferencia: admisión acotada, prioridades y métricas.
+
+`llama_cpp.Llama` no es seguro para uso concurrente y cada generación ocupa
+CPU durante segundos. En lugar de enviar cada llamada a `asyncio.to_thread`
+sin límite, el `LLMClient` encola trabajos aquí:
+
+- Cola acotada (`max_queue`): si está llena, `submit()` rechaza al instante
+  con `SchedulerBusy` (la API responde 503) en vez de acumular latencia.
+- Prioridades: número menor = se atiende antes; a igual prioridad, FIFO.
+- Deadline de cola (`queue_timeout_s`): un trabajo que espera más que eso se
+  descarta con `SchedulerTimeout` sin llegar a ejecutarse.
+- Concurrencia (`concurrency`, por defecto 1): trabajos ejecutándose a la vez
+  sobre el backend.
+- Métricas: profundidad de cola, en ejecución, tiempos de espera y servicio.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+
+class SchedulerRejected(RuntimeError):
+    """El trabajo no se ejecutó por saturación o vencimiento del deadline de cola."""
+
+    retry_after_s: float = 1.0
+
+
+class SchedulerBusy(SchedulerRejected):
+    """Cola llena: se rechaza sin encolar."""
+
+
+class ModelLoading(SchedulerBusy):
+    """El backend (servidor de inferencia) todavía está cargando el modelo."""
+
+
+class SchedulerTimeout(SchedulerRejected):
+    """El trabajo esperó en cola más que su deadline."""
+
+
+class _Stat:
+    """Acumulador liviano: conteo, suma, máximo y ventana para percentiles."""
+
+    __slots__ = ("count", "total", "max", "_window")
+
+    def __init__(self, window: int = 512) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._window: deque[float] = deque(maxlen=window)
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self._window.append(value)
+
+    def snapshot(self) -> dict[str, float]:
+        ordered = sorted(self._window)
+
+        def pct(q: float) -> float:
+            if not ordered:
+                return 0.0
+            return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+        return {
+            "count": self.count,
+            "avg_s": (self.total / self.count) if self.count else 0.0,
+            "p50_s": pct(0.50),
+            "p95_s": pct(0.95),
+            "max_s": self.max,
+        }
+
+
+@dataclass
+class _Job:
+    fn: Callable[..., Any]
+    args: tuple[Any, ...]
+    priority: int
+    enqueued_at: float
+    deadline: float | None
+    future: asyncio.Future[Any]
+    state: str = "queued"  # queued | running | done | dropped
+    timer: asyncio.TimerHandle | None = field(default=None, repr=False)
+
+
+class InferenceScheduler:
+    """Cola de prioridad acotada que ejecuta trabajos bloqueantes en hilos."""
+
+    def __init__(
+        self,
+        *,
+        concurrency: int = 1,
+        max_queue: int = 16,
+        queue_timeout_s: float | None = 30.0,
+    ) -> None:
+        self.concurrency = max(1, int(concurrency))
+        self.max_queue = max(0, int(max_queue))
+        self.queue_timeout_s = queue_timeout_s if queue_timeout_s and queue_timeout_s > 0 else None
+        self._heap: list[tuple[int, int, _Job]] = []
+        self._seq = itertools.count()
+        self._queued = 0
+        self._running = 0
+        self._wakeup: asyncio.Event | None = None
+        self._workers: list[asyncio.Task[None]] = []
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._counters = {"submitted": 0, "completed": 0, "failed": 0, "rejected_busy": 0, "rejected_timeout": 0, "cancelled": 0}
+        self._wait = _Stat()
+        self._service = _Stat()
+
+    def submit(
+        self,
+        fn: Callable[..., Any],
+        *args: Any,
+        priority: int = 0,
+        queue_timeout_s: float | None = None,
+    ) -> asyncio.Future[Any]:
+        """Encola `fn(*args)` para ejecutarse en un hilo; devuelve un future.
+
+        Lanza `SchedulerBusy` de inmediato si la cola está llena.
+        """
+        loop = asyncio.get_running_loop()
+        self._ensure_workers(loop)
+        # Capacidad = workers libres + cola; más allá de eso se rechaza sin encolar
+        if self._queued >= self.max_queue + max(0, self.concurrency - self._running):
+            self._counters["rejected_busy"] += 1
+            raise SchedulerBusy("LLM ocupado: cola de inferencia llena")
+        now = time.monotonic()
+        timeout = queue_timeout_s if queue_timeout_s is not None else self.queue_timeout_s
+        job = _Job(
+            fn=fn,
+            args=args,
+            priority=int(priority),
+            enqueued_at=now,
+            deadline=(now + timeout) if timeout else None,
+            future=loop.create_future(),
+        )
+        if job.deadline is not None:
+            job.timer = loop.call_at(loop.time() + timeout, self._expire, job)
+        job.future.add_done_callback(lambda fut, j=job: self._on_waiter_done(j))
+        heapq.heappush(self._heap, (job.priority, next(self._seq), job))
+        self._queued += 1
+        self._counters["submitted"] += 1
+        assert self._wakeup is not None
+        self._wakeup.set()
+        return job.future
+
+    async def run(self, fn: Callable[..., Any], *args: Any, priority: int = 0, queue_timeout_s: float | None = None) -> Any:
+        """Atajo: `submit` + await del resultado."""
+        return await self.submit(fn, *args, priority=priority, queue_timeout_s=queue_timeout_s)
+
+    def metrics(self) -> dict[str, Any]:
+        return {
+            "queue_depth": self._queued,
+            "running": self._running,
+            "concurrency": self.concurrency,
+            "max_queue": self.max_queue,
+            **self._counters,
+            "wait_time": self._wait.snapshot(),
+            "service_time": self._service.snapshot(),
+        }
+
+    async def aclose(self) -> None:
+        """Detiene los workers (los trabajos en cola quedan cancelados)."""
+        for _, _, job in self._heap:
+            if not job.future.done():
+                job.future.cancel()
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def _ensure_workers(self, loop: asyncio.AbstractEventLoop) -> None:
+        if self._loop is loop and self._workers:
+            return
+        # Primer uso (o nuevo event loop, p. ej. en tests): crear workers
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+        self._heap.clear()
+        self._queued = 0
+        self._running = 0
+        self._workers = [loop.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    def _expire(self, job: _Job) -> None:
+        if job.state == "queued" and not job.future.done():
+            self._counters["rejected_timeout"] += 1
+            job.future.set_exception(SchedulerTimeout("LLM ocupado: se agotó la espera en cola"))
+
+    def _on_waiter_done(self, job: _Job) -> None:
+        # Vencido o cancelado por el llamador mientras esperaba en cola
+        if job.state == "queued":
+            job.state = "dropped"
+            self._queued -= 1
+            if job.future.cancelled():
+                self._counters["cancelled"] += 1
+        if job.timer is not None:
+            job.timer.cancel()
+
+    async def _worker(self) -> None:
+        assert self._wakeup is not None
+        while True:
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            _, _, job = heapq.heappop(self._heap)
+            if job.state != "queued" or job.future.done():
+                # Cancelado/vencido: `_on_waiter_done` ajusta los contadores
+                continue
+            job.state = "running"
+            self._queued -= 1
+            self._running += 1
+            started = time.monotonic()
+            self._wait.add(started - job.enqueued_at)
+            if job.timer is not None:
+                job.timer.cancel()
+            try:
+                result = await asyncio.to_thread(job.fn, *job.args)
+            except Exception as exc:
+                self._counters["failed"] += 1
+                if not job.future.done():
+                    job.future.set_exception(exc)
+            else:
+                self._counters["completed"] += 1
+                if not job.future.done():
+                    job.future.set_result(result)
+            finally:
+                job.state = "done"
+                self._running -= 1
+                self._service.add(time.monotonic() - started)
+
+# ================================================================
+# Guía de uso (Planificador de inferencia)
+# ================================================================
+#
+# Uso básico
+# -----------
+# sched = InferenceScheduler(concurrency=1, max_queue=16, queue_timeout_s=30)
+# try:
+#     out = await sched.run(llama.create_completion, priority=0)
+# except SchedulerBusy: ...     # cola llena → 503 inmediato
+# except SchedulerTimeout: ...  # esperó demasiado → 503
+#
+# Parametrización (vía LLMSettings / variables de entorno)
+# --------------------------------------------------------
+# - LLM_CONCURRENCY (1): generaciones simultáneas (1 para una instancia Llama).
+# - LLM_QUEUE_MAX (16): trabajos en espera antes de rechazar.
+# - LLM_QUEUE_TIMEOUT_S (30): espera máxima en cola; 0 = sin límite.
+# - LLM_PRIORITIES: JSON {bot_id|canal: prioridad}; menor = antes.
+#   Ej.: LLM_PRIORITIES='{"whatsapp": 0, "municipal": 1, "mar2": 5}'
+#
+# Consideraciones
+# ---------------
+# - Cancelar el await de un trabajo en cola lo descarta sin ejecutarlo. Un
+#   trabajo ya en ejecución no se interrumpe (el hilo termina su tarea).
+# - metrics() expone profundidad de cola y tiempos de espera/servicio
+#   (GET /chat/admin/llm/scheduler).
@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 from pathlib import Path
+from typing import Literal
 
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -16,6 +17,39 @@ class LLMSettings(BaseSettings):
     temperature: float = Field(default=0.7, alias="LLM_TEMPERATURE")
     top_p: float = Field(default=0.9, alias="LLM_TOP_P")
     context_window: int = Field(default=2048, alias="LLM_CONTEXT_WINDOW")
+    lazy_load: bool = Field(default=True, alias="LLM_LAZY_LOAD")
+    # Backend: local (llama.cpp en este proceso) | unix (servidor de inferencia) | openai | sim
+    backend: Literal["local", "unix", "openai", "sim"] = Field(default="local", alias="LLM_BACKEND")
+    socket_path: Path = Field(default=Path("/tmp/webchatbot-llm.sock"), alias="LLM_SOCKET_PATH")
+    health_poll_s: float = Field(default=2.0, alias="LLM_HEALTH_POLL_S")
+    # Backend HTTP compatible con OpenAI (LLM_BACKEND=openai)
+    openai_base_url: str = Field(default="http://127.0.0.1:8080/v1", alias="LLM_OPENAI_BASE_URL")
+    openai_model: str = Field(default="local", alias="LLM_OPENAI_MODEL")
+    openai_api_key: str | None = Field(default=None, alias="LLM_OPENAI_API_KEY")
+    http_timeout_s: float = Field(default=60.0, alias="LLM_HTTP_TIMEOUT_S")
+    http_connect_timeout_s: float = Field(default=5.0, alias="LLM_HTTP_CONNECT_TIMEOUT_S")
+    http_retries: int = Field(default=2, alias="LLM_HTTP_RETRIES")
+    http_max_connections: int = Field(default=16, alias="LLM_HTTP_MAX_CONNECTIONS")
+    # Planificador de inferencia (admisión y prioridades)
+    concurrency: int = Field(default=1, alias="LLM_CONCURRENCY")
+    queue_max: int = Field(default=16, alias="LLM_QUEUE_MAX")
+    queue_timeout_s: float = Field(default=30.0, alias="LLM_QUEUE_TIMEOUT_S")
+    priorities: dict[str, int] = Field(default_factory=dict, alias="LLM_PRIORITIES")
+    default_priority: int = Field(default=5, alias="LLM_DEFAULT_PRIORITY")
+    # Pool de procesos llama.cpp (0 = modelo en el mismo proceso)
+    pool_workers: int | Literal["auto"] = Field(default=0, alias="LLM_POOL_WORKERS")
+    pool_threads: int = Field(default=4, alias="LLM_POOL_THREADS")
+    pool_worker_mem_mb: int = Field(default=512, alias="LLM_POOL_WORKER_MEM_MB")
+    # Reutilización del KV cache de prefijos fijos por bot
+    prefix_cache: bool = Field(default=True, alias="LLM_PREFIX_CACHE")
+    prefix_cache_max: int = Field(default=8, alias="LLM_PREFIX_CACHE_MAX")
+    prefix_cache_dir: Path | None = Field(default=None, alias="LLM_PREFIX_CACHE_DIR")
+    # Backend simulado (LLM_BACKEND=sim): latencia y throughput sin modelo
+    sim_prompt_ms_per_token: float = Field(default=2.0, alias="LLM_SIM_PROMPT_MS_PER_TOKEN")
+    sim_tokens_per_s: float = Field(default=15.0, alias="LLM_SIM_TOKENS_PER_S")
+    sim_jitter: float = Field(default=0.1, alias="LLM_SIM_JITTER")
+    sim_reply_tokens: int = Field(default=48, alias="LLM_SIM_REPLY_TOKENS")
+    sim_load_s: float = Field(default=0.0, alias="LLM_SIM_LOAD_S")
 
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -28,6 +62,13 @@ class LLMSettings(BaseSettings):
     def has_model_path(self) -> bool:
         return self.model_path is not None
 
+    def priority_for(self, bot_id: str | None = None, channel: str | None = None) -> int:
+        """Prioridad de cola para un bot/canal (menor = antes). Bot tiene precedencia."""
+        for key in (bot_id, (channel or "").lower()):
+            if key and key in self.priorities:
+                return int(self.priorities[key])
+        return self.default_priority
+
 # ================================================================
 # Guía de uso (Settings del LLM)
 # ================================================================
@@ -39,6 +80,29 @@ class LLMSettings(BaseSettings):
 # - LLM_TEMPERATURE: aleatoriedad (default 0.7).
 # - LLM_TOP_P: nucleus sampling (default 0.9).
 # - LLM_CONTEXT_WINDOW: tamaño de contexto (default 2048).
+# - LLM_LAZY_LOAD: cargar el modelo en segundo plano tras el arranque (default 1).
+# - LLM_BACKEND: "local" (modelo en este proceso), "unix" (servidor de inferencia aparte)
+#   u "openai" (servidor HTTP compatible con OpenAI, p. ej. llama-server).
+#   "sim" simula latencia de prompt/decodificación sin modelo (pruebas de carga).
+# - LLM_SOCKET_PATH: socket del servidor de inferencia (default /tmp/webchatbot-llm.sock).
+# - LLM_HEALTH_POLL_S (2): sondeo de "health" mientras el servidor está cargando o no responde.
+# - LLM_OPENAI_BASE_URL / LLM_OPENAI_MODEL / LLM_OPENAI_API_KEY: destino del backend "openai".
+# - LLM_HTTP_TIMEOUT_S (60), LLM_HTTP_CONNECT_TIMEOUT_S (5), LLM_HTTP_RETRIES (2),
+#   LLM_HTTP_MAX_CONNECTIONS (16): timeouts, reintentos y pool keep-alive del backend "openai".
+# - LLM_CONCURRENCY: generaciones simultáneas sobre el modelo (default 1).
+# - LLM_QUEUE_MAX: trabajos en espera antes de responder 503 (default 16).
+# - LLM_QUEUE_TIMEOUT_S: espera máxima en cola en segundos (default 30; 0 = sin límite).
+# - LLM_PRIORITIES: JSON {bot_id|canal: prioridad}, menor = antes (default {}).
+# - LLM_DEFAULT_PRIORITY: prioridad sin entrada en LLM_PRIORITIES (default 5).
+# - LLM_POOL_WORKERS: procesos llama.cpp (0 = en proceso, N, o "auto"; default 0).
+# - LLM_POOL_THREADS: hilos por worker del pool (default 4).
+# - LLM_POOL_WORKER_MEM_MB: RAM propia estimada por worker para "auto" (default 512).
+# - LLM_PREFIX_CACHE: reutilizar el estado KV del prefijo fijo por bot (default 1).
+# - LLM_PREFIX_CACHE_MAX: estados de prefijo en memoria por proceso (default 8).
+# - LLM_PREFIX_CACHE_DIR: carpeta para persistir esos estados entre reinicios (default: sin persistencia).
+# - LLM_SIM_PROMPT_MS_PER_TOKEN (2), LLM_SIM_TOKENS_PER_S (15), LLM_SIM_JITTER (0.1),
+#   LLM_SIM_REPLY_TOKENS (48), LLM_SIM_LOAD_S (0): perfil del backend "sim"
+#   (services/llm_adapter/simulated.py).
 #
 # Fuente de configuración
 # -----------------------
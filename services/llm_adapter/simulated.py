@@ -0,0 +1,125 @@
+"""Backend LLM simulado para pruebas de carga sin modelo GGUF.
+
+`SimulatedLlama` imita la interfaz de `llama_cpp.Llama` que usa `LLMClient`
+(`create_completion` con y sin stream, `tokenize`) y consume tiempo real:
+
+- evaluación del prompt: `prompt_ms_per_token` por token de entrada, salvo el
+  prefijo común con el prompt anterior (llama.cpp reutiliza ese KV);
+- decodificación: `tokens_per_s` tokens de salida por segundo;
+- jitter multiplicativo uniforme (±`jitter`) sobre cada fase;
+- un lock de instancia: como un único `Llama`, no genera dos respuestas a la
+  vez aunque LLM_CONCURRENCY > 1 (las esperas se notan como en producción).
+
+Se activa con `LLM_BACKEND=sim`; el resto del camino (planificador, cache de
+respuestas, deadlines, métricas y streaming) es el mismo que con llama.cpp.
+"""
+
+from __future__ import annotations
+
+import random
+import re
+import threading
+import time
+from typing import Any, Iterator
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+_WORDS = (
+    "según", "la", "información", "disponible", "el", "trámite", "se", "realiza", "en", "la",
+    "oficina", "municipal", "de", "lunes", "a", "viernes", "y", "también", "podés", "consultar",
+    "los", "requisitos", "en", "el", "sitio", "web", "del", "municipio", "antes", "de", "acercarte",
+)
+
+
+class SimulatedLlama:
+    """Sustituto de `llama_cpp.Llama` con latencia y throughput configurables."""
+
+    def __init__(
+        self,
+        *,
+        prompt_ms_per_token: float = 2.0,
+        tokens_per_s: float = 15.0,
+        jitter: float = 0.1,
+        reply_tokens: int = 48,
+        seed: int | None = None,
+    ) -> None:
+        self.prompt_s_per_token = max(0.0, prompt_ms_per_token) / 1000.0
+        self.token_s = 1.0 / tokens_per_s if tokens_per_s > 0 else 0.0
+        self.jitter = min(max(0.0, jitter), 0.95)
+        self.reply_tokens = max(1, reply_tokens)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._last_prompt: list[str] = []
+        self.calls = 0
+
+    def tokenize(self, text: bytes, add_bos: bool = True) -> list[int]:
+        tokens = _TOKEN_RE.findall(text.decode("utf-8", errors="ignore"))
+        return ([1] if add_bos else []) + [hash(t) & 0xFFFF for t in tokens]
+
+    def _scaled(self, seconds: float) -> float:
+        if seconds <= 0 or not self.jitter:
+            return seconds
+        return seconds * self._rng.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _evaluate(self, prompt: str) -> int:
+        """Duerme el costo del prompt (sin el prefijo reutilizado); devuelve sus tokens."""
+        tokens = _TOKEN_RE.findall(prompt)
+        reused = 0
+        for previous, current in zip(self._last_prompt, tokens):
+            if previous != current:
+                break
+            reused += 1
+        self._last_prompt = tokens
+        time.sleep(self._scaled((len(tokens) - reused) * self.prompt_s_per_token))
+        return len(tokens)
+
+    def _reply(self, max_tokens: int | None) -> list[str]:
+        count = min(self.reply_tokens, max_tokens or self.reply_tokens)
+        start = self._rng.randrange(len(_WORDS))
+        return [_WORDS[(start + i) % len(_WORDS)] for i in range(count)]
+
+    def create_completion(self, prompt: str, max_tokens: int | None = None, stream: bool = False, **_: Any) -> Any:
+        if stream:
+            return self._stream(prompt, max_tokens)
+        with self._lock:
+            self.calls += 1
+            prompt_tokens = self._evaluate(prompt)
+            words = self._reply(max_tokens)
+            time.sleep(self._scaled(len(words) * self.token_s))
+        return {
+            "choices": [{"text": " ".join(words) + ".", "finish_reason": "length"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(words)},
+        }
+
+    def _stream(self, prompt: str, max_tokens: int | None) -> Iterator[dict[str, Any]]:
+        # El lock se toma al iterar (como llama.cpp, que evalúa recién en el primer next())
+        with self._lock:
+            self.calls += 1
+            self._evaluate(prompt)
+            words = self._reply(max_tokens)
+            for i, word in enumerate(words):
+                time.sleep(self._scaled(self.token_s))
+                last = i == len(words) - 1
+                yield {"choices": [{"text": (" " if i else "") + word + ("." if last else ""), "finish_reason": "length" if last else None}]}
+
+# ================================================================
+# Guía de uso (Backend LLM simulado)
+# ================================================================
+#
+# LLM_BACKEND=sim uvicorn services.api.main:app
+# LLM_BACKEND=sim LLM_SIM_TOKENS_PER_S=8 python scripts/load_chat.py --in-process --rps 5
+# LLM_BACKEND=sim python scripts/bench_orchestrator.py --rounds 2
+#
+# Parámetros (LLMSettings)
+# ------------------------
+# - LLM_SIM_PROMPT_MS_PER_TOKEN (2.0): costo de evaluar cada token de entrada.
+# - LLM_SIM_TOKENS_PER_S (15): velocidad de decodificación.
+# - LLM_SIM_JITTER (0.1): variación uniforme ±10% por fase.
+# - LLM_SIM_REPLY_TOKENS (48): largo de la respuesta (acotado por max_tokens).
+# - LLM_SIM_LOAD_S (0): demora de "carga del modelo" (ejercita /readyz y LLM_LAZY_LOAD).
+#
+# Consideraciones
+# ---------------
+# - Los valores por defecto aproximan un modelo de 1B cuantizado en CPU de laptop.
+# - El lock serializa las generaciones: subir LLM_CONCURRENCY sólo agrega espera
+#   dentro del hilo, igual que con un único modelo llama.cpp.
+# - Los tokens son palabras y signos (regex), no el tokenizador del modelo.
@@ -0,0 +1,337 @@
+"""Métricas livianas en formato Prometheus y temporizadores por etapa.
+
+Sin dependencias externas: histogramas y contadores en memoria (por proceso)
+que se exponen en texto plano en GET /metrics, más un `StageTimer` por
+consulta que mide cada etapa del orquestador y del cliente LLM y arma el
+header `Server-Timing`.
+
+El temporizador de la consulta en curso viaja en un `ContextVar`: las etapas
+se marcan con `with stage("rag"): ...` sin pasar el objeto por parámetro. Si no
+hay consulta en curso (p. ej. llamadas directas en tests) `stage()` no hace nada.
+"""
+
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Iterable, Sequence
+
+from services.observability import tracing
+
+LATENCY_BUCKETS: tuple[float, ...] = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+TOKEN_BUCKETS: tuple[float, ...] = (8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096)
+RATE_BUCKETS: tuple[float, ...] = (1, 2, 5, 10, 15, 20, 30, 50, 100, 200)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+# Canales que el código conoce aunque ningún bot los declare en su config.json
+_BASE_CHANNELS = frozenset({"web", "whatsapp", "telegram", "mar2", "free"})
+_KNOWN_TTL_S = 60.0
+_known: tuple[float, frozenset[str], frozenset[str]] | None = None
+
+
+def _known_labels() -> tuple[frozenset[str], frozenset[str]]:
+    """(bots, canales) válidos como etiqueta; se relee chatbots/ como mucho cada minuto."""
+    global _known
+    now = time.monotonic()
+    if _known is None or now - _known[0] > _KNOWN_TTL_S:
+        from services.chatbots.models import known_bots
+
+        bots = known_bots()
+        _known = (now, frozenset(b for b, _ in bots), _BASE_CHANNELS | {c for _, c in bots})
+    return _known[1], _known[2]
+
+
+def bounded_labels(bot: str, channel: str) -> tuple[str, str]:
+    """Acota bot/canal a valores conocidos ("other" si no): vienen del cliente y no
+    pueden crear series nuevas sin límite."""
+    bots, channels = _known_labels()
+    channel = (channel or "").lower()
+    return (bot if not bot or bot in bots else "other", channel if not channel or channel in channels else "other")
+
+
+def _number(value: float) -> str:
+    value = float(value)
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+class Counter:
+    """Contador monotónico con etiquetas."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(str(labels.get(n, "")) for n in self.labelnames), 0.0)
+
+    def render(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"
+
+
+class Histogram:
+    """Histograma acumulativo (buckets fijos) con etiquetas."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # etiquetas → [conteo por bucket (no acumulado) ..., +Inf], suma, total
+        self._series: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0, 0.0])
+            series[0][idx] += 1
+            series[1][0] += value
+            series[1][1] += 1
+
+    def count(self, **labels: str) -> int:
+        series = self._series.get(tuple(str(labels.get(n, "")) for n in self.labelnames))
+        return int(series[1][1]) if series else 0
+
+    def render(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted((k, (list(c), list(s))) for k, (c, s) in self._series.items())
+        for key, (counts, (total, count)) in items:
+            cumulative = 0
+            for bound, n in zip((*self.buckets, float("inf")), counts):
+                cumulative += n
+                le = 'le="' + _number(bound) + '"'
+                yield f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}"
+            yield f"{self.name}_count{_labels(self.labelnames, key)} {_number(count)}"
+
+
+class Registry:
+    """Colección de métricas del proceso."""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, Counter | Histogram] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(name, lambda: Counter(name, help_text, labelnames))  # type: ignore[return-value]
+
+    def histogram(
+        self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self._get_or_create(name, lambda: Histogram(name, help_text, labelnames, buckets))  # type: ignore[return-value]
+
+    def _get_or_create(self, name: str, factory: Callable[[], Counter | Histogram]) -> Counter | Histogram:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = factory()
+            return metric
+
+    def render(self) -> str:
+        """Exposición en formato de texto de Prometheus (0.0.4)."""
+        lines: list[str] = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "webchatbot_stage_seconds",
+    "Duración de cada etapa del pipeline de chat",
+    ("stage", "bot", "channel", "source"),
+)
+REQUEST_SECONDS = REGISTRY.histogram(
+    "webchatbot_request_seconds",
+    "Duración total de la consulta en el orquestador",
+    ("bot", "channel", "source"),
+)
+LLM_TOKENS = REGISTRY.histogram(
+    "webchatbot_llm_tokens",
+    "Tokens por generación (kind=prompt|completion)",
+    ("kind", "bot", "channel"),
+    TOKEN_BUCKETS,
+)
+LLM_TOKENS_PER_SECOND = REGISTRY.histogram(
+    "webchatbot_llm_tokens_per_second",
+    "Velocidad de decodificación (tokens de salida por segundo)",
+    ("bot", "channel"),
+    RATE_BUCKETS,
+)
+
+
+class _Stage:
+    """Context manager de una etapa (sin generador: más barato que @contextmanager).
+
+    Con el trazado activo además abre el span `webchatbot.<etapa>`.
+    """
+
+    __slots__ = ("_timer", "_name", "_t0", "_span")
+
+    def __init__(self, timer: StageTimer | None, name: str) -> None:
+        self._timer = timer
+        self._name = name
+        self._t0 = 0.0
+        self._span: Any = None
+
+    def __enter__(self) -> _Stage:
+        if tracing.enabled():
+            self._span = tracing.span(f"webchatbot.{self._name}")
+            self._span.__enter__()
+        if self._timer is not None:
+            self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        if self._timer is not None:
+            self._timer.add(self._name, time.perf_counter() - self._t0)
+        if self._span is not None:
+            self._span.__exit__(*exc)
+
+
+class StageTimer:
+    """Duraciones por etapa de una consulta (segundos, acumuladas por nombre)."""
+
+    __slots__ = ("started", "stages", "bot", "channel", "_finished")
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.stages: dict[str, float] = {}
+        self.bot = ""
+        self.channel = ""
+        self._finished = False
+
+    def stage(self, name: str) -> _Stage:
+        return _Stage(self, name)
+
+    def add(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        """Valor del header Server-Timing (duraciones en ms)."""
+        parts = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.stages.items()]
+        parts.append(f"total;dur={self.elapsed() * 1000:.2f}")
+        return ", ".join(parts)
+
+    def finish(self, source: str) -> None:
+        """Vuelca las duraciones en los histogramas (una sola vez por consulta)."""
+        if self._finished:
+            return
+        self._finished = True
+        bot, channel = bounded_labels(self.bot, self.channel)
+        for name, seconds in list(self.stages.items()):
+            STAGE_SECONDS.observe(seconds, stage=name, bot=bot, channel=channel, source=source)
+        REQUEST_SECONDS.observe(self.elapsed(), bot=bot, channel=channel, source=source)
+
+
+_current: ContextVar[StageTimer | None] = ContextVar("webchatbot_stage_timer", default=None)
+
+
+def start_timer() -> StageTimer:
+    """Crea el temporizador de una consulta y lo deja como actual en el contexto."""
+    timer = StageTimer()
+    _current.set(timer)
+    return timer
+
+
+def current_timer() -> StageTimer | None:
+    return _current.get()
+
+
+def stage(name: str) -> _Stage:
+    """`with stage("rules"): ...` mide la etapa en la consulta actual (no-op si no hay)."""
+    return _Stage(_current.get(), name)
+
+
+def observe_generation(
+    *,
+    bot: str = "",
+    channel: str = "",
+    prompt_tokens: int | None = None,
+    completion_tokens: int | None = None,
+    decode_s: float | None = None,
+) -> None:
+    """Registra tokens de entrada/salida y tokens/s de una generación."""
+    bot, channel = bounded_labels(bot, channel)
+    if prompt_tokens:
+        LLM_TOKENS.observe(prompt_tokens, kind="prompt", bot=bot, channel=channel)
+    if completion_tokens:
+        LLM_TOKENS.observe(completion_tokens, kind="completion", bot=bot, channel=channel)
+        if decode_s and decode_s > 0:
+            LLM_TOKENS_PER_SECOND.observe(completion_tokens / decode_s, bot=bot, channel=channel)
+
+# ================================================================
+# Guía de uso (Métricas y Server-Timing)
+# ================================================================
+#
+# Etapas
+# ------
+# timer = start_timer()                 # al entrar la consulta (ChatOrchestrator.respond*)
+# with stage("rag"):                    # en cualquier punto del pipeline
+#     reply = await responder.search(msg)
+# timer.finish(source="rag")            # vuelca en webchatbot_stage_seconds / _request_seconds
+# response.headers["Server-Timing"] = timer.server_timing()
+#
+# Métricas expuestas (GET /metrics)
+# ---------------------------------
+# - webchatbot_stage_seconds{stage,bot,channel,source}: settings, classify, rules, rag,
+#   retrieval, cache, llm_queue, llm_prompt, llm_decode, llm_generate.
+# - webchatbot_request_seconds{bot,channel,source}: total de la consulta.
+# - webchatbot_llm_tokens{kind=prompt|completion,bot,channel} y
+#   webchatbot_llm_tokens_per_second{bot,channel}.
+#
+# Consideraciones
+# ---------------
+# - Métricas por proceso: con varios workers de uvicorn cada uno expone las suyas
+#   (Prometheus las agrega por instancia).
+# - Con WEBCHATBOT_TRACING activo cada etapa es también un span OpenTelemetry
+#   (services/observability/tracing.py).
+# - bot y channel vienen del cliente: `bounded_labels` deja sólo los bots de chatbots/
+#   y los canales conocidos; cualquier otro valor se etiqueta "other".
+# - Costo por etapa: dos perf_counter y una suma en un dict; los histogramas se
+#   actualizan una vez por consulta, al finalizar.
@@ -0,0 +1,205 @@
+"""Trazas OpenTelemetry opcionales para API, orquestador, RAG y LLM.
+
+`opentelemetry-api/sdk` es una dependencia opcional (requirements/rag.txt).
+Sin el paquete, o con `WEBCHATBOT_TRACING` vacío/0, todas las funciones de
+este módulo son no-op: `span()` devuelve un objeto compartido sin estado y
+`set_attributes()` retorna de inmediato, de modo que el costo deshabilitado
+es una comparación por llamada.
+
+Las etapas del orquestador (`services/observability/metrics.stage`) abren un
+span cuando el trazado está activo; el cliente LLM agrega `llm.generate` y,
+dentro del hilo de inferencia, `llama.create_completion` (el contexto viaja
+al hilo porque el planificador usa `asyncio.to_thread`, que copia los
+ContextVar).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from typing import Any, Mapping
+
+try:  # pragma: no cover - import opcional
+    from opentelemetry import propagate as otel_propagate
+    from opentelemetry import trace as otel_trace
+except ImportError:  # pragma: no cover - import opcional
+    otel_propagate = None  # type: ignore[assignment]
+    otel_trace = None  # type: ignore[assignment]
+
+LOGGER = logging.getLogger(__name__)
+
+_tracer: Any = None  # None = trazado deshabilitado
+
+
+class _NoopSpan:
+    """Span nulo: context manager y API mínima de Span sin efecto."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> _NoopSpan:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        return None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        return None
+
+    def set_attributes(self, attributes: Mapping[str, Any]) -> None:
+        return None
+
+    def record_exception(self, exc: BaseException) -> None:
+        return None
+
+    def end(self) -> None:
+        return None
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def enabled() -> bool:
+    return _tracer is not None
+
+
+def span(name: str, attributes: Mapping[str, Any] | None = None) -> Any:
+    """Context manager que abre `name` como span actual (no-op si está deshabilitado)."""
+    if _tracer is None:
+        return NOOP_SPAN
+    return _tracer.start_as_current_span(name, attributes=_clean(attributes))
+
+
+def start_span(name: str, attributes: Mapping[str, Any] | None = None) -> Any:
+    """Span que no se vuelve actual; cerrar con `.end()` (útil en generadores async)."""
+    if _tracer is None:
+        return NOOP_SPAN
+    return _tracer.start_span(name, attributes=_clean(attributes))
+
+
+def use_span(current: Any) -> Any:
+    """Vuelve actual un span creado con `start_span` (p. ej. dentro del hilo de inferencia)."""
+    if _tracer is None or current is NOOP_SPAN:
+        return NOOP_SPAN
+    return otel_trace.use_span(current, end_on_exit=False)
+
+
+def set_attributes(attributes: Mapping[str, Any]) -> None:
+    """Agrega atributos al span actual (ignora valores None)."""
+    if _tracer is None:
+        return
+    current = otel_trace.get_current_span()
+    if current.is_recording():
+        current.set_attributes(_clean(attributes))
+
+
+def _clean(attributes: Mapping[str, Any] | None) -> dict[str, Any] | None:
+    if not attributes:
+        return None
+    return {k: v for k, v in attributes.items() if v is not None}
+
+
+def configure_tracing(provider: Any = None, *, mode: str | None = None) -> bool:
+    """Activa (o desactiva) el trazado. Devuelve True si quedó activo.
+
+    - provider: TracerProvider explícito (tests: SDK + InMemorySpanExporter).
+    - mode / WEBCHATBOT_TRACING: "" | "0" (apagado), "console", "otlp"
+      (OTLP/HTTP, requiere opentelemetry-exporter-otlp) o "global" (usa el
+      provider ya registrado, p. ej. por `opentelemetry-instrument`).
+    """
+    global _tracer
+    selected = (mode if mode is not None else os.getenv("WEBCHATBOT_TRACING", "")).strip().lower()
+    if provider is None and selected in {"", "0", "false", "no", "off"}:
+        _tracer = None
+        return False
+    if otel_trace is None:
+        LOGGER.warning("WEBCHATBOT_TRACING=%s pero opentelemetry no está instalado; trazado deshabilitado.", selected)
+        _tracer = None
+        return False
+    if provider is None:
+        provider = otel_trace.get_tracer_provider() if selected == "global" else _sdk_provider(selected)
+    if provider is None:
+        _tracer = None
+        return False
+    _tracer = provider.get_tracer("webchatbot")
+    return True
+
+
+def _sdk_provider(mode: str) -> Any:
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+    except ImportError:
+        LOGGER.warning("opentelemetry-sdk no está instalado; trazado deshabilitado.")
+        return None
+    if mode == "console":
+        exporter: Any = ConsoleSpanExporter()
+    elif mode == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            LOGGER.warning("WEBCHATBOT_TRACING=otlp requiere opentelemetry-exporter-otlp; trazado deshabilitado.")
+            return None
+        exporter = OTLPSpanExporter()  # OTEL_EXPORTER_OTLP_ENDPOINT
+    else:
+        LOGGER.warning("WEBCHATBOT_TRACING=%s no reconocido (console|otlp|global); trazado deshabilitado.", mode)
+        return None
+    provider = TracerProvider(resource=Resource.create({"service.name": os.getenv("OTEL_SERVICE_NAME", "webchatbot")}))
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    return provider
+
+
+class TracingMiddleware:
+    """Middleware ASGI: un span SERVER por request HTTP (propaga `traceparent` entrante)."""
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or _tracer is None:
+            await self.app(scope, receive, send)
+            return
+        carrier = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope.get("headers") or []}
+        parent = otel_propagate.extract(carrier)
+        method = scope.get("method", "GET")
+        path = scope.get("path", "")
+        attributes = {"http.method": method, "http.target": path, "http.scheme": scope.get("scheme", "http")}
+        with _tracer.start_as_current_span(
+            f"{method} {path}", context=parent, kind=otel_trace.SpanKind.SERVER, attributes=attributes
+        ) as server_span:
+
+            async def _send(message: dict[str, Any]) -> None:
+                if message["type"] == "http.response.start":
+                    server_span.set_attribute("http.status_code", message["status"])
+                await send(message)
+
+            await self.app(scope, receive, _send)
+
+# ================================================================
+# Guía de uso (Trazas OpenTelemetry)
+# ================================================================
+#
+# Activación
+# ----------
+# pip install opentelemetry-api opentelemetry-sdk        # (requirements/rag.txt)
+# WEBCHATBOT_TRACING=console uvicorn services.api.main:app
+# WEBCHATBOT_TRACING=otlp OTEL_EXPORTER_OTLP_ENDPOINT=http://collector:4318 ...
+#   (requiere opentelemetry-exporter-otlp)
+#
+# Spans
+# -----
+# - "POST /chat/message" (SERVER, TracingMiddleware) → etapas del orquestador
+#   webchatbot.settings / classify / rules / rag / retrieval / prompt / cache
+#   (rag.hits y rag.best_score en búsquedas RAG) → llm.generate → llama.create_completion
+#   (en el hilo de inferencia; tokens de prompt/salida como atributos).
+#
+# Pruebas
+# -------
+# provider = TracerProvider(); provider.add_span_processor(SimpleSpanProcessor(InMemorySpanExporter()))
+# configure_tracing(provider)      # ...ejecutar...; configure_tracing(mode="0") para apagar
+#
+# Consideraciones
+# ---------------
+# - Deshabilitado (default) no se agrega el middleware y `span()` devuelve NOOP_SPAN.
+# - Con LLM_BACKEND=unix el servidor de inferencia es otro proceso: sus spans no se
+#   enlazan con los de la API (el protocolo por socket no transporta traceparent).
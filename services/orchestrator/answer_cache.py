@@ -0,0 +1,179 @@
+"""Cache de respuestas generadas por el LLM (fallback con o sin contexto).
+
+Las mismas preguntas ("¿cómo saco la licencia de conducir?") llegan una y otra
+vez al fallback y cada generación cuesta segundos de CPU. `AnswerCache`
+guarda la respuesta final (ya sanitizada) bajo la clave:
+
+    (bot, pregunta normalizada, uids de contexto RAG, parámetros de generación
+     + prefijo del prompt, id del modelo)
+
+- TTL por entrada y tamaño máximo con desalojo LRU.
+- Invalidación completa cuando cambia la generación del índice RAG
+  (`set_generation`, llamado tras reindexar).
+- Búsqueda por casi-duplicados (opcional): si no hay coincidencia exacta, se
+  reutiliza la respuesta de una pregunta del mismo grupo (resto de la clave
+  idéntico) cuya similitud de Jaccard entre tokens supera `near_threshold`.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Iterable
+
+from services.orchestrator.text_utils import normalize_text
+
+_NON_WORD = re.compile(r"[^\w\s]+")
+
+
+def normalize_question(text: str) -> str:
+    """Minúsculas, sin tildes ni signos de puntuación, espacios colapsados."""
+    return " ".join(_NON_WORD.sub(" ", normalize_text(text)).split())
+
+
+def _jaccard(a: frozenset[str], b: frozenset[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+@dataclass
+class _Entry:
+    reply: str
+    expires_at: float | None
+    group: str
+    tokens: frozenset[str]
+
+
+class AnswerCache:
+    """Cache LRU con TTL de respuestas del LLM."""
+
+    def __init__(
+        self,
+        *,
+        max_entries: int | None = None,
+        ttl_s: float | None = None,
+        near_threshold: float | None = None,
+    ) -> None:
+        self.max_entries = max(1, max_entries or int(os.getenv("WEBCHATBOT_ANSWER_CACHE_MAX", "1024") or 1024))
+        ttl = ttl_s if ttl_s is not None else float(os.getenv("WEBCHATBOT_ANSWER_CACHE_TTL_S", "3600") or 0)
+        self.ttl_s = ttl if ttl > 0 else None
+        near = near_threshold if near_threshold is not None else float(os.getenv("WEBCHATBOT_ANSWER_CACHE_NEAR", "0") or 0)
+        self.near_threshold = near if 0 < near <= 1 else None
+        self.generation = 0
+        self._entries: OrderedDict[tuple[str, str], _Entry] = OrderedDict()
+        self._groups: dict[str, set[tuple[str, str]]] = {}
+        self._counters = {"hits": 0, "near_hits": 0, "misses": 0, "stores": 0, "evictions": 0, "invalidations": 0}
+
+    @staticmethod
+    def group_key(
+        bot_id: str,
+        context_uids: Iterable[str],
+        generation: dict[str, Any],
+        model_id: str,
+        prompt_prefix: str = "",
+    ) -> str:
+        """Todo lo que condiciona la respuesta salvo la pregunta."""
+        params = ",".join(f"{k}={generation[k]!r}" for k in sorted(generation))
+        raw = "\0".join([bot_id, "|".join(context_uids), params, model_id, prompt_prefix])
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def get(self, group: str, question: str) -> str | None:
+        norm = normalize_question(question)
+        key = (group, norm)
+        entry = self._entries.get(key)
+        if entry is not None and self._alive(key, entry):
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            return entry.reply
+        if self.near_threshold is not None:
+            tokens = frozenset(norm.split())
+            best: tuple[float, tuple[str, str]] | None = None
+            for other in list(self._groups.get(group, ())):
+                candidate = self._entries.get(other)
+                if candidate is None or not self._alive(other, candidate):
+                    continue
+                score = _jaccard(tokens, candidate.tokens)
+                if score >= self.near_threshold and (best is None or score > best[0]):
+                    best = (score, other)
+            if best is not None:
+                self._entries.move_to_end(best[1])
+                self._counters["near_hits"] += 1
+                return self._entries[best[1]].reply
+        self._counters["misses"] += 1
+        return None
+
+    def put(self, group: str, question: str, reply: str) -> None:
+        norm = normalize_question(question)
+        if not norm or not reply:
+            return
+        key = (group, norm)
+        expires = (time.monotonic() + self.ttl_s) if self.ttl_s else None
+        self._entries[key] = _Entry(reply=reply, expires_at=expires, group=group, tokens=frozenset(norm.split()))
+        self._entries.move_to_end(key)
+        self._groups.setdefault(group, set()).add(key)
+        self._counters["stores"] += 1
+        while len(self._entries) > self.max_entries:
+            old_key, _ = self._entries.popitem(last=False)
+            self._forget_group(old_key)
+            self._counters["evictions"] += 1
+
+    def set_generation(self, generation: int) -> None:
+        """Invalida todo si cambió la generación del índice RAG."""
+        if generation != self.generation:
+            self.generation = generation
+            self.clear()
+
+    def clear(self) -> None:
+        if self._entries:
+            self._counters["invalidations"] += 1
+        self._entries.clear()
+        self._groups.clear()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_s": self.ttl_s,
+            "near_threshold": self.near_threshold,
+            "generation": self.generation,
+            **self._counters,
+        }
+
+    def _alive(self, key: tuple[str, str], entry: _Entry) -> bool:
+        if entry.expires_at is not None and entry.expires_at <= time.monotonic():
+            del self._entries[key]
+            self._forget_group(key)
+            return False
+        return True
+
+    def _forget_group(self, key: tuple[str, str]) -> None:
+        members = self._groups.get(key[0])
+        if members is not None:
+            members.discard(key)
+            if not members:
+                del self._groups[key[0]]
+
+# ================================================================
+# Guía de uso (Cache de respuestas del LLM)
+# ================================================================
+#
+# Parametrización (variables de entorno)
+# --------------------------------------
+# - WEBCHATBOT_ANSWER_CACHE (1): 0 deshabilita el cache.
+# - WEBCHATBOT_ANSWER_CACHE_MAX (1024): respuestas guardadas (LRU).
+# - WEBCHATBOT_ANSWER_CACHE_TTL_S (3600): vida de cada respuesta; 0 = sin vencimiento.
+# - WEBCHATBOT_ANSWER_CACHE_NEAR (0): umbral de Jaccard [0–1] para reutilizar
+#   respuestas de preguntas casi idénticas (p. ej. 0.85); 0 = sólo exactas.
+#
+# Consideraciones
+# ---------------
+# - Sólo se cachea el fallback del LLM (no el chat libre mar2) y nunca el
+#   placeholder de "modelo no disponible".
+# - Cambios de pre_prompts, parámetros de generación, contexto recuperado o
+#   modelo cambian la clave; reindexar la KB invalida todo.
+# - Estadísticas en GET /chat/admin/llm/cache.
@@ -0,0 +1,165 @@
+"""Propagación de cambios de configuración y KB entre workers del mismo host.
+
+Con varios procesos uvicorn, un PUT de intents o un reindexado sólo cambia el
+estado en memoria del worker que atendió la solicitud. `ChangeBus` anuncia
+esos cambios a los demás con archivos de versión en un directorio compartido:
+
+- un archivo por tópico ("rag", "intents", "settings.<bot_id>"); publicar es
+  escribir un token nuevo (origen + uuid) de forma atómica (temporal + rename), sin
+  leer-modificar-escribir, así que dos workers pueden publicar a la vez;
+- cada worker consulta el directorio cada `interval_s` (un `stat` por tópico)
+  y, cuando un token cambió y no es el propio, llama al handler del tópico,
+  que recarga sólo el componente afectado;
+- los tópicos publicados por el propio proceso no se reaplican (ya se aplicaron
+  localmente al atender la solicitud).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import inspect
+import logging
+import os
+import uuid
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+LOGGER = logging.getLogger(__name__)
+
+_DEFAULT_DIR = Path(__file__).resolve().parents[2] / ".run" / "changes"
+
+
+class ChangeBus:
+    """Archivos de versión por tópico con sondeo; deshabilitado con WEBCHATBOT_CHANGE_BUS=0."""
+
+    def __init__(self, directory: str | Path | None = None, interval_s: float | None = None) -> None:
+        raw = str(directory) if directory is not None else os.getenv("WEBCHATBOT_CHANGE_BUS", "").strip()
+        self.enabled = raw.lower() not in {"0", "false", "no"}
+        self.directory = Path(raw) if raw and self.enabled else _DEFAULT_DIR
+        interval = interval_s if interval_s is not None else float(os.getenv("WEBCHATBOT_CHANGE_POLL_S", "1") or 1)
+        self.interval_s = max(0.05, interval)
+        # tópico → (mtime_ns, tamaño) y último token visto (propio o ajeno)
+        self._stamps: dict[str, tuple[int, int]] = {}
+        self._tokens: dict[str, str] = {}
+        self._primed = False
+        # Origen de los tokens de esta instancia (uno por proceso: get_bus())
+        self._origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._counters = {"published": 0, "received": 0, "failed": 0}
+        if self.enabled:
+            # Línea base: lo publicado antes del arranque ya está en disco y se carga al iniciar
+            self.poll()
+
+    def publish(self, topic: str) -> str | None:
+        """Anuncia un cambio en `topic` a los demás workers; devuelve el token escrito."""
+        if not self.enabled:
+            return None
+        token = f"{self._origin}:{uuid.uuid4().hex}"
+        path = self.directory / topic
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f".{topic}.{self._origin}.tmp")
+            tmp.write_text(token, encoding="utf-8")
+            tmp.replace(path)
+            st = path.stat()
+        except OSError:
+            LOGGER.exception("No se pudo publicar el cambio %r en %s", topic, self.directory)
+            return None
+        self._tokens[topic] = token
+        self._stamps[topic] = (st.st_mtime_ns, st.st_size)
+        self._counters["published"] += 1
+        return token
+
+    def poll(self) -> list[str]:
+        """Tópicos cambiados por otros procesos desde el último sondeo."""
+        first, self._primed = not self._primed, True
+        try:
+            entries = [p for p in self.directory.iterdir() if not p.name.startswith(".")]
+        except OSError:
+            return []
+        changed: list[str] = []
+        for path in entries:
+            try:
+                st = path.stat()
+                stamp = (st.st_mtime_ns, st.st_size)
+                if self._stamps.get(path.name) == stamp:
+                    continue
+                token = path.read_text(encoding="utf-8").strip()
+            except OSError:
+                continue
+            self._stamps[path.name] = stamp
+            if self._tokens.get(path.name) != token:
+                self._tokens[path.name] = token
+                # Los tokens propios ya se aplicaron al publicarlos
+                if not first and not token.startswith(f"{self._origin}:"):
+                    changed.append(path.name)
+        return changed
+
+    async def watch(self, apply: Callable[[str], Awaitable[Any] | Any]) -> None:
+        """Sondea hasta ser cancelado y llama `apply(tópico)` por cada cambio ajeno."""
+        if not self.enabled:
+            return
+        while True:
+            await asyncio.sleep(self.interval_s)
+            for topic in await asyncio.to_thread(self.poll):
+                self._counters["received"] += 1
+                try:
+                    result = apply(topic)
+                    if inspect.isawaitable(result):
+                        await result
+                except Exception:
+                    self._counters["failed"] += 1
+                    LOGGER.exception("Falló la recarga por el cambio %r", topic)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "directory": str(self.directory),
+            "interval_s": self.interval_s,
+            "topics": dict(self._tokens),
+            **self._counters,
+        }
+
+
+_bus: ChangeBus | None = None
+
+
+def get_bus() -> ChangeBus:
+    """Bus del proceso (endpoints de admin publican, el lifespan de la API escucha).
+
+    Se crea en el primer uso y no al importar: importar el router (p. ej. en pruebas)
+    no toca el directorio compartido ni lee WEBCHATBOT_CHANGE_BUS antes de tiempo.
+    """
+    global _bus
+    if _bus is None:
+        _bus = ChangeBus()
+    return _bus
+
+# ================================================================
+# Guía de uso (Propagación de cambios entre workers)
+# ================================================================
+#
+# from services.orchestrator.change_bus import get_bus
+# get_bus().publish("intents")                     # tras guardar config/intents.json
+# await get_bus().watch(orchestrator.apply_change)  # tarea de fondo por worker (lifespan)
+#
+# Tópicos y recarga
+# -----------------
+# - "rag": otro worker reindexó la KB → `reindex()` (índice armado en un hilo, instalado en el loop).
+# - "intents": se guardaron patrones → se recarga el clasificador desde config/intents.json.
+# - "settings.<bot_id>": se guardaron settings → se recalientan los chips de ese bot
+#   (los settings se leen de disco en cada consulta; sólo las tablas en memoria se refrescan).
+#
+# Parametrización
+# ---------------
+# - WEBCHATBOT_CHANGE_BUS: directorio compartido (default .run/changes en la raíz del
+#   proyecto); 0 desactiva la propagación.
+# - WEBCHATBOT_CHANGE_POLL_S (1): intervalo de sondeo; la demora máxima entre workers.
+# - Estado en GET /chat/admin/changes.
+#
+# Consideraciones
+# ---------------
+# - Todos los workers deben ver el mismo directorio (mismo host o volumen compartido).
+# - Sondeo con stat en lugar de inotify: sin dependencias, portable, y el costo es un
+#   stat por tópico por segundo.
+# - Un cambio se aplica también si el worker se perdió publicaciones intermedias:
+#   sólo importa que el token actual difiera del último visto.
@@ -0,0 +1,98 @@
+"""Deadline por consulta derivado del SLO de latencia del bot.
+
+`BotSettings.latency_slo_ms` se convierte en un `Deadline` al entrar la
+consulta y se propaga a clasificación, recuperación RAG y generación. Cada
+etapa consulta `remaining()`; la generación se itera en streaming para poder
+cortarla apenas vence (el hilo de llama.cpp se detiene en el próximo token).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Awaitable, TypeVar
+
+T = TypeVar("T")
+
+# Tiempo mínimo que debe quedar para que valga la pena invocar al LLM
+MIN_GENERATION_S = 0.25
+
+
+class DeadlineExceeded(TimeoutError):
+    """El deadline de la consulta venció durante una etapa."""
+
+
+@dataclass(frozen=True)
+class Deadline:
+    """Instante límite (reloj monotónico) para responder una consulta."""
+
+    budget_s: float
+    started_at: float = field(default_factory=time.monotonic)
+
+    @classmethod
+    def from_slo_ms(cls, slo_ms: int | float | None, started_at: float | None = None) -> Deadline | None:
+        """Deadline para un SLO en milisegundos (None si el SLO es 0 o no está definido)."""
+        if not slo_ms or slo_ms <= 0:
+            return None
+        return cls(float(slo_ms) / 1000.0, started_at if started_at is not None else time.monotonic())
+
+    def remaining(self) -> float:
+        """Segundos restantes (0 si ya venció)."""
+        return max(0.0, self.started_at + self.budget_s - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+    def allows_generation(self) -> bool:
+        """True si queda tiempo suficiente para invocar al LLM."""
+        return self.remaining() >= MIN_GENERATION_S
+
+
+async def within(deadline: Deadline | None, awaitable: Awaitable[T], default: T) -> T:
+    """Espera `awaitable` hasta el deadline; si vence devuelve `default`."""
+    if deadline is None:
+        return await awaitable
+    try:
+        return await asyncio.wait_for(awaitable, timeout=deadline.remaining())
+    except asyncio.TimeoutError:
+        return default
+
+
+async def iterate_until(deadline: Deadline, source: AsyncIterator[T]) -> AsyncIterator[T]:
+    """Itera `source` hasta agotarlo; si vence el deadline la cierra y lanza `DeadlineExceeded`."""
+    try:
+        while True:
+            try:
+                item = await asyncio.wait_for(source.__anext__(), timeout=deadline.remaining())
+            except StopAsyncIteration:
+                return
+            except asyncio.TimeoutError as exc:
+                raise DeadlineExceeded(f"Deadline de {deadline.budget_s:.2f}s vencido") from exc
+            yield item
+    finally:
+        aclose = getattr(source, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+# ================================================================
+# Guía de uso (Deadline por consulta)
+# ================================================================
+#
+# deadline = Deadline.from_slo_ms(settings.latency_slo_ms)   # None = sin límite
+# prediction = await within(deadline, classifier.classify(msg), default_prediction)
+# async for chunk in iterate_until(deadline, llm.generate_stream(prompt)):
+#     ...                                                  # DeadlineExceeded al vencer
+#
+# Parametrización
+# ---------------
+# - BotSettings.latency_slo_ms (por bot, 0 = sin límite), editable vía API/portal.
+# - MIN_GENERATION_S: si al llegar al LLM queda menos que esto, no se lo invoca.
+#
+# Consideraciones
+# ---------------
+# - `within` no interrumpe código síncrono dentro de la corrutina: sólo evita esperar
+#   de más en etapas que ceden el control (I/O, hilos).
+# - Cerrar el stream del LLM libera el modelo: llama.cpp corta en el próximo token,
+#   el servidor de inferencia recibe "cancel" y httpx cierra la respuesta.
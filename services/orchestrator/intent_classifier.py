@@ -3,8 +3,10 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from pathlib import Path
 from typing import Sequence
 
+from services.orchestrator import jsonc
 from services.orchestrator.text_utils import normalize_text
 from services.orchestrator.types import IntentName, IntentPrediction
 
@@ -35,6 +37,23 @@ class IntentClassifier:
         return IntentPrediction(intent="unknown", confidence=0.0)
 
 
+def intents_path() -> Path:
+    """config/intents.json en la raíz del proyecto (lo escribe PUT /chat/admin/intents)."""
+    return Path(__file__).resolve().parents[2] / "config" / "intents.json"
+
+
+def load_patterns(path: Path | None = None) -> tuple[IntentPattern, ...] | None:
+    """Patrones guardados en config/intents.json (None si el archivo no existe)."""
+    p = path or intents_path()
+    if not p.exists():
+        return None
+    data = jsonc.load(p)
+    return tuple(
+        IntentPattern(intent=x["intent"], keywords=tuple(x["keywords"]), confidence=float(x.get("confidence") or 0.6))
+        for x in data.get("patterns", [])
+    )
+
+
 DEFAULT_PATTERNS: Sequence[IntentPattern] = (
     IntentPattern(intent="faq", keywords=("horario", "atencion"), confidence=0.9),
     IntentPattern(intent="faq", keywords=("pag", "impuest"), confidence=0.8),
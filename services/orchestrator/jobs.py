@@ -0,0 +1,189 @@
+"""Cola de trabajos de administración en segundo plano (reindexado e importaciones).
+
+Guardar las FAQs o los intents y reindexar la KB son operaciones de E/S y CPU
+que, dentro del request, ocupan un hilo del threadpool y hacen que el portal
+corte por timeout con KBs grandes. `JobQueue` las ejecuta fuera del request:
+
+- `submit` devuelve enseguida un `Job` con id; el trabajo corre en un único
+  hilo worker, de a uno por vez (un reindexado nunca se pisa con una escritura);
+- cada trabajo informa progreso (0..1 + detalle) con `job.report`;
+- deduplicación por clave: si ya hay un trabajo en cola (no iniciado) con la
+  misma clave, la nueva solicitud se une a él (mismo id). Con `replace=True`
+  su función pasa a ser la más reciente (p. ej. el último PUT de FAQs gana);
+  con `replace=False` se reutiliza tal cual (un reindexado pedido mientras
+  hay una importación en cola queda cubierto por ésta);
+- se conservan los últimos trabajos terminados para consultarlos por id.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Literal
+
+LOGGER = logging.getLogger(__name__)
+
+JobStatus = Literal["queued", "running", "done", "failed"]
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    key: str
+    run: Callable[[Job], Any] = field(repr=False)
+    status: JobStatus = "queued"
+    progress: float = 0.0
+    detail: str = ""
+    result: Any = None
+    error: str | None = None
+    merged: int = 0
+    submitted: float = field(default_factory=time.time)
+    started: float | None = None
+    finished: float | None = None
+    done: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    def report(self, progress: float, detail: str = "") -> None:
+        """Actualiza el progreso (lo llama la función del trabajo desde el worker)."""
+        self.progress = min(1.0, max(self.progress, progress))
+        if detail:
+            self.detail = detail
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": round(self.progress, 3),
+            "detail": self.detail,
+            "result": self.result,
+            "error": self.error,
+            "merged": self.merged,
+            "submitted": self.submitted,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+
+class JobQueue:
+    """Trabajos en un hilo worker con deduplicación por clave e historial acotado."""
+
+    def __init__(self, keep: int | None = None) -> None:
+        self.keep = max(1, keep or int(os.getenv("WEBCHATBOT_JOBS_KEEP", "200") or 200))
+        self._lock = threading.Lock()
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        self._pending: dict[str, Job] = {}
+        self._queue: queue.SimpleQueue[Job] = queue.SimpleQueue()
+        self._worker: threading.Thread | None = None
+        self._counters = {"submitted": 0, "merged": 0, "done": 0, "failed": 0}
+
+    def submit(self, kind: str, run: Callable[[Job], Any], *, key: str | None = None, replace: bool = True) -> Job:
+        """Encola `run(job)`; si hay un trabajo en cola con la misma clave, se une a él."""
+        key = key or kind
+        with self._lock:
+            self._counters["submitted"] += 1
+            pending = self._pending.get(key)
+            if pending is not None:
+                if replace:
+                    pending.kind, pending.run = kind, run
+                pending.merged += 1
+                self._counters["merged"] += 1
+                return pending
+            job = Job(id=uuid.uuid4().hex[:16], kind=kind, key=key, run=run)
+            self._jobs[job.id] = job
+            self._pending[key] = job
+            self._queue.put(job)
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._work, name="admin-jobs", daemon=True)
+                self._worker.start()
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        return self._jobs.get(job_id)
+
+    def list(self, limit: int = 50) -> list[Job]:
+        """Trabajos más recientes primero."""
+        with self._lock:
+            return list(reversed(self._jobs.values()))[:limit]
+
+    def wait(self, job_id: str, timeout: float | None = None) -> Job | None:
+        """Bloquea hasta que el trabajo termine (para scripts y pruebas)."""
+        job = self.get(job_id)
+        if job is not None:
+            job.done.wait(timeout)
+        return job
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            statuses = [j.status for j in self._jobs.values()]
+            return {"queued": statuses.count("queued"), "running": statuses.count("running"), **self._counters}
+
+    def _work(self) -> None:
+        while True:
+            job = self._queue.get()
+            with self._lock:
+                if self._pending.get(job.key) is job:
+                    del self._pending[job.key]
+                job.status = "running"
+                job.started = time.time()
+            try:
+                result = job.run(job)
+            except Exception as exc:
+                LOGGER.exception("Falló el trabajo de administración %s (%s)", job.id, job.kind)
+                job.error = str(exc) or type(exc).__name__
+                job.status = "failed"
+            else:
+                job.result = result
+                job.progress = 1.0
+                job.status = "done"
+            job.finished = time.time()
+            job.done.set()
+            with self._lock:
+                self._counters[job.status] += 1
+                self._trim()
+
+    def _trim(self) -> None:
+        finished = [j.id for j in self._jobs.values() if j.done.is_set()]
+        for job_id in finished[: max(0, len(finished) - self.keep)]:
+            del self._jobs[job_id]
+
+# ================================================================
+# Guía de uso (Trabajos de administración)
+# ================================================================
+#
+# jobs = JobQueue()
+# loop = asyncio.get_running_loop()     # en el endpoint (async)
+# job = jobs.submit("rag_reindex",
+#                   lambda job: asyncio.run_coroutine_threadsafe(orchestrator.reindex(job.report), loop).result(),
+#                   key="rag", replace=False)
+# jobs.get(job.id).to_dict()    # {"status": "running", "progress": 0.4, "detail": "cargando textos", ...}
+#
+# Endpoints (router del orquestador)
+# ----------------------------------
+# - PUT /chat/admin/rag/faqs, POST /chat/admin/rag/reindex, PUT /chat/admin/intents
+#   → 202 {"status": "queued", "job_id": ...}.
+# - GET /chat/admin/jobs (recientes + contadores) y GET /chat/admin/jobs/{id}.
+#
+# Claves de deduplicación
+# -----------------------
+# - "rag": importación de FAQs (replace: la última gana) y reindexado (se une a lo encolado).
+# - "intents": guardado de patrones (replace).
+#
+# Parametrización
+# ---------------
+# - WEBCHATBOT_JOBS_KEEP (200): trabajos terminados que se conservan para consulta.
+#
+# Consideraciones
+# ---------------
+# - Estado por proceso: el id sólo existe en el worker que recibió la solicitud; el
+#   efecto (reindexado, intents) llega a los demás workers por change_bus.py.
+# - Los trabajos corren en un hilo: el estado que leen las consultas (índice RAG,
+#   clasificador, cache de respuestas) se reemplaza en el event loop, nunca desde el hilo.
+# - Los trabajos no sobreviven a un reinicio; los archivos se escriben de forma atómica
+#   (archivo temporal + rename), así que un corte no deja JSON a medias.
@@ -0,0 +1,75 @@
+"""Carga de JSON con comentarios (JSONC) en tiempo lineal.
+
+Los archivos editables a mano (FAQs, intents, settings de bots) admiten
+comentarios `// ...` y `/* ... */` para documentación inline. Este módulo es el
+único cargador compartido:
+
+- un solo regex precompilado recorre el texto una vez: cada match es un tramo
+  de JSON sin comentarios (texto y strings completos, con comillas escapadas:
+  se conserva) o un comentario (se elimina); el reemplazo es una plantilla,
+  sin callbacks en Python. Sin cuantificadores posesivos (Python 3.10): las
+  alternativas de cada repetición son disjuntas y nada sigue al tramo, así que
+  el motor nunca retrocede sobre él (strings o bloques sin cerrar llegan hasta
+  el final del texto);
+- si el archivo no contiene "/" no se escanea;
+- el parseo lo hace `orjson` directamente sobre bytes (sin decodificar a str).
+
+Los errores de formato se propagan como `orjson.JSONDecodeError`, subclase de
+`json.JSONDecodeError` (y de ValueError).
+"""
+
+from __future__ import annotations
+
+import re
+from pathlib import Path
+from typing import Any
+
+import orjson
+
+# (tramo de texto sin "/" ni strings | string JSON con escapes)+ | // línea | /* bloque */ | "/" suelta
+_JSONC_TOKENS = r'((?:[^"/]+|"[^"\\]*(?:\\.[^"\\]*)*(?:"|\Z))+)|//[^\n]*|/\*.*?(?:\*/|\Z)|(/)'
+_SCANNER = re.compile(_JSONC_TOKENS, re.S)
+_SCANNER_BYTES = re.compile(_JSONC_TOKENS.encode(), re.S)
+_BOM = b"\xef\xbb\xbf"
+
+
+def strip_comments(data: str | bytes) -> str | bytes:
+    """Elimina comentarios JSONC fuera de strings; devuelve el mismo tipo recibido."""
+    if isinstance(data, str):
+        return _SCANNER.sub(r"\1\2", data) if "/" in data else data
+    return _SCANNER_BYTES.sub(rb"\1\2", data) if b"/" in data else data
+
+
+def loads(data: str | bytes) -> Any:
+    """Parsea JSONC (str o bytes UTF-8) con orjson."""
+    if isinstance(data, bytes) and data.startswith(_BOM):
+        data = data[len(_BOM) :]
+    elif isinstance(data, str) and data.startswith("\ufeff"):
+        data = data[1:]
+    return orjson.loads(strip_comments(data))
+
+
+def load(path: str | Path) -> Any:
+    """Lee y parsea un archivo JSONC (errores de E/S y de formato se propagan)."""
+    return loads(Path(path).read_bytes())
+
+# ================================================================
+# Guía de uso (JSONC)
+# ================================================================
+#
+# from services.orchestrator import jsonc
+# entries = jsonc.load(Path("knowledge/faqs/municipal_faqs.json"))
+# data = jsonc.loads('{"a": 1 /* nota */}')
+#
+# Dónde se usa
+# ------------
+# - rag.load_default_entries (FAQs), models.load_settings / known_bots (chatbots/<id>/),
+#   y los GET de /chat/admin/rag/faqs e /chat/admin/intents.
+# - Las escrituras (PUT de admin, save_settings) siguen generando JSON plano.
+#
+# Consideraciones
+# ---------------
+# - Un comentario sin cerrar ("/*" sin "*/") descarta el resto del archivo, como el
+#   cargador previo; orjson reporta entonces el JSON incompleto.
+# - No admite comas finales ni otras extensiones de JSON5.
+# - Benchmark contra el cargador previo: python scripts/bench_jsonc.py --size-mb 8
@@ -0,0 +1,81 @@
+"""Respuestas precalculadas de los chips del menú (`menu_suggestions`).
+
+Los chips de la UI envían siempre el mismo texto ("¿Qué trámites puedo hacer
+online?", "ayuda", ...) y son las consultas más frecuentes. El orquestador los
+pasa por el pipeline al iniciar y cada vez que cambia la versión del bot, y
+guarda el resultado en esta tabla: un clic en un chip se responde con una
+búsqueda exacta por texto normalizado, sin clasificar, recuperar ni generar.
+
+La versión de una tabla es la tupla (versión del archivo de settings,
+generación del índice RAG, generación de los intents, estado del LLM):
+cualquier cambio la invalida y el orquestador la vuelve a calentar en segundo
+plano.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Hashable
+
+from services.orchestrator.schema import ChatResponse
+
+
+class MenuAnswerTable:
+    """Tabla (bot, canal) → {mensaje normalizado → ChatResponse} con su versión."""
+
+    def __init__(self) -> None:
+        self._tables: dict[tuple[str, str], tuple[Hashable, dict[str, ChatResponse]]] = {}
+        self._counters = {"hits": 0, "misses": 0, "refreshes": 0}
+
+    def known(self, bot_id: str, channel: str) -> bool:
+        """True si el par fue calentado alguna vez (sólo esos se refrescan)."""
+        return (bot_id, channel) in self._tables
+
+    def pairs(self, bot_id: str | None = None) -> list[tuple[str, str]]:
+        """Pares (bot, canal) calentados, opcionalmente sólo los de `bot_id`."""
+        return [pair for pair in self._tables if bot_id is None or pair[0] == bot_id]
+
+    def is_current(self, bot_id: str, channel: str, version: Hashable) -> bool:
+        table = self._tables.get((bot_id, channel))
+        return table is not None and table[0] == version
+
+    def lookup(self, bot_id: str, channel: str, version: Hashable, message: str) -> ChatResponse | None:
+        """Respuesta precalculada vigente para el mensaje normalizado (None si no hay o es vieja)."""
+        table = self._tables.get((bot_id, channel))
+        if table is None or table[0] != version:
+            return None
+        hit = table[1].get(message)
+        self._counters["hits" if hit is not None else "misses"] += 1
+        return hit
+
+    def store(self, bot_id: str, channel: str, version: Hashable, answers: dict[str, ChatResponse]) -> None:
+        self._tables[(bot_id, channel)] = (version, answers)
+        self._counters["refreshes"] += 1
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "bots": {f"{bot}/{channel}": len(answers) for (bot, channel), (_, answers) in self._tables.items()},
+            **self._counters,
+        }
+
+# ================================================================
+# Guía de uso (Respuestas de chips precalculadas)
+# ================================================================
+#
+# Flujo en el orquestador
+# -----------------------
+# - Arranque (lifespan de la API): `ChatOrchestrator.prewarm_menu()` calienta cada bot
+#   de chatbots/<id>/ (canal de config.json) en segundo plano.
+# - Cada consulta: `_menu_answer` busca el mensaje normalizado; si la versión cambió
+#   (settings guardados, reindexado, intents recargados, LLM que terminó de cargar) responde por el
+#   pipeline normal y agenda el recalentado.
+#
+# Qué se guarda
+# -------------
+# - Respuestas de reglas, RAG y textos fijos del pipeline.
+# - Respuestas del LLM sólo si el modelo está listo (nunca el placeholder, el aviso de
+#   "iniciando" ni respuestas degradadas por deadline).
+#
+# Parametrización
+# ---------------
+# - WEBCHATBOT_PREWARM (1): 0 desactiva la tabla y el calentamiento.
+# - Estadísticas en GET /chat/admin/menu.
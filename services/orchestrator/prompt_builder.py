@@ -0,0 +1,144 @@
+"""Armado de prompts dentro de la ventana de contexto del modelo.
+
+El fallback concatena preludio, pre_prompts, hasta tres contextos RAG y la
+pregunta. Sin contar tokens, un prompt que excede `LLM_CONTEXT_WINDOW` falla
+dentro de llama.cpp o desperdicia tiempo de evaluación. `PromptBudget`:
+
+- cuenta tokens con el tokenizador del modelo cuando está cargado
+  (`LLMClient.token_counter`) o con un estimador barato si no lo está;
+- reserva `max_tokens` para la salida (más un margen);
+- incluye los contextos en orden de prioridad (mejor score primero) mientras
+  entren, recorta el primero que no entra (si queda espacio útil) y descarta
+  el resto;
+- como último recurso recorta la pregunta del usuario, nunca por encima del
+  espacio libre: si la parte fija (preludio, pre_prompts) no deja lugar útil,
+  el llamador la reduce antes (`pick_fixed`) en vez de exceder la ventana;
+- la conversación previa (memoria de sesión) usa sólo el espacio que sobra,
+  conservando los turnos más recientes.
+"""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Callable, Sequence
+
+# Costo aproximado del separador "[i] " + "\n\n" entre contextos
+_CONTEXT_OVERHEAD_TOKENS = 4
+_ELLIPSIS = "…"
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimación conservadora (sobreestima) para español: ~3.5 caracteres por token."""
+    if not text:
+        return 0
+    return math.ceil(len(text) / 3.5) + 1
+
+
+@dataclass(frozen=True)
+class PromptBudget:
+    """Presupuesto de tokens de entrada para un prompt."""
+
+    context_window: int = 2048
+    max_tokens: int = 256
+    count: Callable[[str], int] = estimate_tokens
+    margin: int = 8
+
+    @property
+    def available(self) -> int:
+        """Tokens disponibles para el prompt (ventana − salida − margen)."""
+        return max(0, self.context_window - self.max_tokens - self.margin)
+
+    def truncate(self, text: str, limit: int) -> str:
+        """Recorta `text` a `limit` tokens, en borde de palabra, con "…" al final."""
+        if limit <= 0:
+            return ""
+        if self.count(text) <= limit:
+            return text
+        # Aproximación proporcional y ajuste hasta que entre
+        cut = max(1, int(len(text) * limit / max(1, self.count(text))))
+        while cut > 0:
+            candidate = text[:cut]
+            space = candidate.rfind(" ")
+            if space > cut // 2:
+                candidate = candidate[:space]
+            candidate = candidate.rstrip() + _ELLIPSIS
+            if self.count(candidate) <= limit:
+                return candidate
+            cut = int(cut * 0.9)
+        return ""
+
+    def fit_question(self, fixed: str, question: str) -> str:
+        """Devuelve la pregunta (recortada si hace falta) para que `fixed` + pregunta entren."""
+        room = self.available - self.count(fixed)
+        if self.count(question) <= room:
+            return question
+        return self.truncate(question, room)
+
+    def pick_fixed(self, candidates: Sequence[str], min_question: int = 16) -> int:
+        """Índice del primer `fixed` (del más completo al más reducido) que deja `min_question` tokens a la pregunta.
+
+        Si ninguno alcanza devuelve el último (el más reducido).
+        """
+        for i, fixed in enumerate(candidates):
+            if self.available - self.count(fixed) >= min_question:
+                return i
+        return len(candidates) - 1
+
+    def fit_contexts(self, fixed: str, contexts: Sequence[str], min_tokens: int = 24) -> list[str]:
+        """Contextos (ya ordenados por prioridad) que entran junto a `fixed`."""
+        remaining = self.available - self.count(fixed)
+        kept: list[str] = []
+        for ctx in contexts:
+            cost = self.count(ctx) + _CONTEXT_OVERHEAD_TOKENS
+            if cost <= remaining:
+                kept.append(ctx)
+                remaining -= cost
+                continue
+            room = remaining - _CONTEXT_OVERHEAD_TOKENS
+            if room >= min_tokens:
+                clipped = self.truncate(ctx, room)
+                if clipped:
+                    kept.append(clipped)
+            break
+        return kept
+
+    def fit_history(self, fixed: str, lines: Sequence[str], overhead: str = "") -> list[str]:
+        """Turnos más recientes (en orden cronológico) que entran junto a `fixed` + `overhead`."""
+        remaining = self.available - self.count(fixed) - self.count(overhead)
+        kept: list[str] = []
+        for line in reversed(lines):
+            cost = self.count(line) + 1
+            if cost > remaining:
+                break
+            kept.append(line)
+            remaining -= cost
+        kept.reverse()
+        return kept
+
+# ================================================================
+# Guía de uso (Presupuesto de prompt)
+# ================================================================
+#
+# budget = PromptBudget(context_window=2048, max_tokens=256, count=llm.token_counter or estimate_tokens)
+# level = budget.pick_fixed([prelude + pre_prompts + plantilla, prelude + plantilla, plantilla])
+# question = budget.fit_question(fixed_elegido, pregunta)
+# contexts = budget.fit_contexts(prelude + plantilla + question, contextos_por_score)
+# history = budget.fit_history(prompt_sin_historia, render_history(store.recent(sid)), "CONVERSACIÓN PREVIA:\n")
+#
+# Parametrización
+# ---------------
+# - context_window: LLM_CONTEXT_WINDOW (el mismo n_ctx con que se carga el modelo).
+# - max_tokens: generation.max_tokens del bot (o LLM_MAX_TOKENS).
+# - count: LLMClient.token_counter (tokenizador real si el modelo está cargado en
+#   este proceso; estimador conservador en carga, pool o backends remotos).
+#
+# Consideraciones
+# ---------------
+# - El estimador sobreestima a propósito: es preferible recortar de más que
+#   exceder la ventana.
+# - Los contextos se priorizan por score RAG; el primero nunca se descarta si
+#   entra al menos `min_tokens` de él.
+# - fit_question nunca excede la ventana: si la parte fija la llena, la pregunta
+#   queda vacía. Por eso el orquestador descarta primero pre_prompts y luego el
+#   preludio (pick_fixed) cuando no quedan `min_question` tokens para la pregunta.
@@ -44,14 +44,15 @@ Consideraciones y límites
 
 from __future__ import annotations
 
-import json
 from dataclasses import dataclass
 from math import sqrt
 from pathlib import Path
 import re
 from typing import Iterable, Sequence
 
+from services.orchestrator import jsonc
 from services.orchestrator.text_utils import normalize_text
+from services.observability import tracing
 
 
 @dataclass(frozen=True)
@@ -124,7 +125,9 @@ class SimpleRagResponder:
                 best_answer = entry.answer
 
         # Aplicación de umbral: rango esperado del score ∈ [0,1].
-        if best_answer is None or best_score < self._threshold:
+        hit = best_answer is not None and best_score >= self._threshold
+        tracing.set_attributes({"rag.hits": int(hit), "rag.best_score": best_score})
+        if not hit:
             return None
         return best_answer
 
@@ -146,6 +149,7 @@ class SimpleRagResponder:
         out: list[tuple[KnowledgeEntry, float]] = []
         for idx, score in scored[:k]:
             out.append((self._entries[idx], score))
+        tracing.set_attributes({"rag.hits": len(out), "rag.best_score": out[0][1] if out else 0.0})
         return out
 
     def _embed(self, entry: KnowledgeEntry) -> dict[str, float]:
@@ -196,10 +200,7 @@ def load_default_entries(path: Path | None = None) -> Sequence[KnowledgeEntry]:
     base_path = path or Path(__file__).resolve().parents[2] / "knowledge" / "faqs" / "municipal_faqs.json"
     # Soporte de JSON con comentarios (JSONC):
     # Permitimos comentarios // ... y /* ... */ en el archivo para documentación inline.
-    # Se eliminan antes de parsear con json.loads.
-    raw_text = base_path.read_text(encoding="utf-8")
-    cleaned = _strip_json_comments(raw_text)
-    payload: Iterable[dict[str, object]] = json.loads(cleaned)
+    payload: Iterable[dict[str, object]] = jsonc.load(base_path)
     entries: list[KnowledgeEntry] = []
     for item in payload:
         entries.append(
@@ -301,78 +302,6 @@ def _cosine_similarity(vec_a: dict[str, float], vec_b: dict[str, float]) -> floa
     return numerator / (norm_a * norm_b)
 
 
-def _strip_json_comments(text: str) -> str:
-    """Elimina comentarios tipo JSONC de una cadena JSON.
-
-    Soporta:
-    - Comentarios de línea: // ... (hasta fin de línea)
-    - Comentarios de bloque: /* ... */ (multilínea)
-
-    Conserva el contenido dentro de strings JSON ("...") incluyendo secuencias
-    escapadas. No depende de librerías externas.
-    """
-    result: list[str] = []
-    i = 0
-    n = len(text)
-    in_string = False
-    escaped = False
-    in_sl_comment = False
-    in_ml_comment = False
-
-    while i < n:
-        ch = text[i]
-        nxt = text[i + 1] if i + 1 < n else ""
-
-        if in_sl_comment:
-            if ch == "\n":
-                in_sl_comment = False
-                result.append(ch)
-            i += 1
-            continue
-
-        if in_ml_comment:
-            if ch == "*" and nxt == "/":
-                in_ml_comment = False
-                i += 2
-            else:
-                i += 1
-            continue
-
-        if in_string:
-            result.append(ch)
-            if escaped:
-                # caracter escapado dentro de string
-                escaped = False
-            elif ch == "\\":
-                escaped = True
-            elif ch == '"':
-                in_string = False
-            i += 1
-            continue
-
-        # Fuera de string y comentarios
-        if ch == '"':
-            in_string = True
-            escaped = False
-            result.append(ch)
-            i += 1
-            continue
-
-        if ch == "/" and nxt == "/":
-            in_sl_comment = True
-            i += 2
-            continue
-
-        if ch == "/" and nxt == "*":
-            in_ml_comment = True
-            i += 2
-            continue
-
-        result.append(ch)
-        i += 1
-
-    return "".join(result)
-
 # ================================================================
 # Guía de uso, parametrización e impacto (RAG ligero)
 # ================================================================
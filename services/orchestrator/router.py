@@ -1,22 +1,83 @@
 """Routers para endpoints de chat."""
 
-from fastapi import APIRouter, HTTPException, Body
+from fastapi import APIRouter, HTTPException, Body, Response, WebSocket
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Any
+from typing import Any, AsyncIterator
 from pathlib import Path
+import asyncio
 import json
 import re
 
-from services.orchestrator import schema
+from services.orchestrator import jsonc, schema
+from services.orchestrator.change_bus import get_bus
+from services.orchestrator.intent_classifier import intents_path
+from services.orchestrator.jobs import Job, JobQueue
 from services.orchestrator.service import ChatOrchestrator
+from services.orchestrator.ws import ChatSocketSession
+from services.observability.metrics import current_timer
 
 router = APIRouter()
 _orchestrator = ChatOrchestrator()
+# Reindexados e importaciones fuera del request (GET /chat/admin/jobs/{id})
+_jobs = JobQueue()
 
 
 @router.post("/message", response_model=schema.ChatResponse)
-async def handle_message(payload: schema.ChatRequest) -> schema.ChatResponse:
-    return await _orchestrator.respond(payload)
+async def handle_message(payload: schema.ChatRequest, response: Response) -> schema.ChatResponse:
+    reply = await _orchestrator.respond(payload)
+    if (timer := current_timer()) is not None:
+        response.headers["Server-Timing"] = timer.server_timing()
+    return reply
+
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/stream")
+async def handle_message_stream(payload: schema.ChatRequest) -> StreamingResponse:
+    """Igual que /message pero con Server-Sent Events.
+
+    Eventos: `delta` ({"text"}) por cada fragmento generado por el LLM y un
+    `done` final con el ChatResponse completo. Reglas/RAG emiten sólo `done`.
+    """
+
+    items = _orchestrator.respond_stream(payload)
+    # El primer elemento se obtiene antes de responder: si el LLM está saturado
+    # (SchedulerRejected) el cliente recibe 503 en lugar de un stream vacío.
+    first = await items.__anext__()
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    if (timer := current_timer()) is not None:
+        # Etapas hasta el primer evento (ruteo, RAG, cola y primer token del LLM)
+        headers["Server-Timing"] = timer.server_timing()
+
+    def _frame(item: str | schema.ChatResponse) -> str:
+        if isinstance(item, schema.ChatResponse):
+            return _sse("done", item.model_dump())
+        return _sse("delta", {"text": item})
+
+    async def _events() -> AsyncIterator[str]:
+        try:
+            yield _frame(first)
+            async for item in items:
+                yield _frame(item)
+        except Exception as exc:  # pragma: no cover - errores inesperados del pipeline
+            yield _sse("error", {"detail": str(exc)})
+        finally:
+            await items.aclose()
+
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        headers=headers,
+    )
+
+@router.websocket("/ws")
+async def handle_websocket(websocket: WebSocket) -> None:
+    """Chat multiplexado sobre WebSocket (ver services/orchestrator/ws.py)."""
+    limiter = getattr(websocket.app.state, "rate_limiter", None)
+    await ChatSocketSession(websocket, _orchestrator, limiter=limiter).run()
 
 # ================================================================
 # Guía de uso (API de chat)
@@ -26,7 +87,8 @@ async def handle_message(payload: schema.ChatRequest) -> schema.ChatResponse:
 # --------
 # POST /chat/message
 # Body (JSON): {"session_id": str, "message": str, "channel": str = "web", "bot_id": str | null}
-# Response: {"session_id": str, "reply": str, "source": "faq|rag|llm|fallback", "escalated": bool}
+# Response: {"session_id": str, "reply": str, "source": "faq|rag|llm|fallback", "escalated": bool,
+#            "degraded": null|"deadline"}   ← "deadline" si venció el SLO de latencia del bot
 #
 # Ejemplo
 # -------
@@ -36,9 +98,29 @@ async def handle_message(payload: schema.ChatRequest) -> schema.ChatResponse:
 #
 # Consideraciones
 # ---------------
-# - Stateless: no almacena historial; cada request es independiente.
+# - Memoria por session_id: el orquestador guarda los últimos turnos de cada sesión
+#   (SessionStore, acotado por turnos, tokens, TTL y LRU) y los suma al prompt en mar2/free
+#   y en repreguntas. Sesiones nuevas (otro session_id) empiezan sin historia.
 # - El orquestador usa settings del bot/canal para decidir reglas/RAG/LLM y pre_prompts.
-# - Para streaming, se requeriría un endpoint alternativo (SSE/WebSocket) no implementado aquí.
+# - Header Server-Timing con la duración de cada etapa en ms, p. ej.
+#   `settings;dur=0.21, classify;dur=0.05, rules;dur=0.40, total;dur=0.93`
+#   (en /chat/stream: etapas hasta el primer evento). Histogramas en GET /metrics.
+#
+# Streaming (SSE)
+# ---------------
+# POST /chat/stream  (mismo body que /chat/message)
+# Respuesta text/event-stream:
+#   event: delta  data: {"text": "..."}      ← fragmentos del LLM ya sanitizados
+#   event: done   data: {ChatResponse}       ← siempre al final (único evento para Reglas/RAG)
+#   event: error  data: {"detail": "..."}
+# curl -N -X POST http://127.0.0.1:8000/chat/stream -H 'Content-Type: application/json' \
+#   -d '{"session_id":"s","message":"hola","channel":"mar2"}'
+# Si el cliente corta la conexión (AbortController), la generación se detiene.
+#
+# WebSocket
+# ---------
+# WS /chat/ws: varias sesiones (session_id) por conexión, respuestas parciales,
+# cancelación y latido. Protocolo en services/orchestrator/ws.py.
 
 
 # ========================
@@ -73,14 +155,8 @@ def admin_get_rag_faqs() -> list[dict[str, Any]]:
     p = _faqs_path()
     if not p.exists():
         return []
-    # Soporta JSON con comentarios: eliminar // y /* */
-    txt = p.read_text(encoding="utf-8")
-    # Limpieza simple (igual a rag._strip_json_comments)
-    def _strip(text: str) -> str:
-        text = re.sub(r"/\*.*?\*/", "", text, flags=re.S)
-        text = re.sub(r"//.*?$", "", text, flags=re.M)
-        return text
-    data = json.loads(_strip(txt))
+    # Soporta JSON con comentarios (// y /* */), mismo cargador que el RAG
+    data = jsonc.load(p)
     out = []
     for it in data:
         out.append({
@@ -92,18 +168,78 @@ def admin_get_rag_faqs() -> list[dict[str, Any]]:
     return out
 
 
-@router.put("/admin/rag/faqs")
-def admin_put_rag_faqs(payload: list[RagEntry]) -> dict:
-    p = _faqs_path()
-    p.parent.mkdir(parents=True, exist_ok=True)
+def _write_json(path: Path, data: Any) -> None:
+    """Escritura atómica: quien lee el archivo nunca ve un JSON a medias."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    tmp.replace(path)
+
+
+def _reindex(job: Job, loop: asyncio.AbstractEventLoop) -> dict:
+    # El índice se arma fuera del loop y se instala en el loop (las consultas nunca ven un estado a medias)
+    count = asyncio.run_coroutine_threadsafe(_orchestrator.reindex(progress=job.report), loop).result()
+    # Los demás workers reindexan al ver el cambio (change_bus)
+    get_bus().publish("rag")
+    return {"json_count": count}
+
+
+def _queued(job: Job, **extra: Any) -> dict:
+    return {"status": "queued", "job_id": job.id, **extra}
+
+
+@router.put("/admin/rag/faqs", status_code=202)
+async def admin_put_rag_faqs(payload: list[RagEntry]) -> dict:
+    """Guarda las FAQs y reindexa en segundo plano (la última importación en cola gana)."""
     data = [e.model_dump() for e in payload]
-    p.write_text(json.dumps(data, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
-    # Reindexar
-    try:
-        _orchestrator._bootstrap_rag()  # type: ignore[attr-defined]
-    except Exception as exc:
-        raise HTTPException(status_code=500, detail=f"Error reindexando RAG: {exc}")
-    return {"status": "ok", "count": len(data)}
+    loop = asyncio.get_running_loop()
+
+    def _import(job: Job) -> dict:
+        job.report(0.1, "escribiendo FAQs")
+        _write_json(_faqs_path(), data)
+        return {"count": len(data), **_reindex(job, loop)}
+
+    return _queued(_jobs.submit("rag_faqs", _import, key="rag"), count=len(data))
+
+
+@router.get("/admin/llm/scheduler")
+def admin_llm_scheduler() -> dict:
+    """Estado de la cola de inferencia (profundidad, espera y servicio)."""
+    return _orchestrator._llm.scheduler_metrics()  # type: ignore[attr-defined]
+
+
+@router.get("/admin/llm/cache")
+def admin_llm_cache() -> dict:
+    """Estado del cache de respuestas del LLM (hits, tamaño, generación del índice)."""
+    answers = _orchestrator._answers  # type: ignore[attr-defined]
+    return answers.stats() if answers is not None else {"enabled": False}
+
+
+@router.get("/admin/coalescing")
+def admin_coalescing() -> dict:
+    """Consultas idénticas en curso compartidas (líderes, coalescidas, abortadas)."""
+    flights = _orchestrator._flights  # type: ignore[attr-defined]
+    return flights.stats() if flights is not None else {"enabled": False}
+
+
+@router.get("/admin/menu")
+def admin_menu() -> dict:
+    """Respuestas precalculadas de los chips del menú por bot (tamaño, hits, refrescos)."""
+    menu = _orchestrator._menu  # type: ignore[attr-defined]
+    return menu.stats() if menu is not None else {"enabled": False}
+
+
+@router.post("/admin/menu/prewarm")
+async def admin_menu_prewarm() -> dict:
+    """Recalienta ya las respuestas de los chips de todos los bots."""
+    return await _orchestrator.prewarm_menu()
+
+
+@router.get("/admin/sessions")
+def admin_sessions() -> dict:
+    """Estado de la memoria de conversación (sesiones, bytes, desalojos y spill)."""
+    sessions = _orchestrator._sessions  # type: ignore[attr-defined]
+    return sessions.stats() if sessions is not None else {"enabled": False}
 
 
 @router.get("/admin/rag/status")
@@ -121,13 +257,31 @@ def admin_rag_status() -> dict:
     return {"json_count": count_json, "txt_dir": str(txt_dir), "txt_files": txt_files}
 
 
-@router.post("/admin/rag/reindex")
-def admin_rag_reindex() -> dict:
-    try:
-        _orchestrator._bootstrap_rag()  # type: ignore[attr-defined]
-        return {"status": "ok"}
-    except Exception as exc:
-        raise HTTPException(status_code=500, detail=str(exc))
+@router.post("/admin/rag/reindex", status_code=202)
+async def admin_rag_reindex() -> dict:
+    """Reindexa en segundo plano; si ya hay una importación o reindexado en cola, se une a él."""
+    loop = asyncio.get_running_loop()
+    return _queued(_jobs.submit("rag_reindex", lambda job: _reindex(job, loop), key="rag", replace=False))
+
+
+@router.get("/admin/jobs")
+def admin_jobs(limit: int = 50) -> dict:
+    """Trabajos de administración recientes y contadores de la cola."""
+    return {"jobs": [job.to_dict() for job in _jobs.list(limit)], **_jobs.stats()}
+
+
+@router.get("/admin/changes")
+def admin_changes() -> dict:
+    """Propagación de cambios entre workers (directorio, tópicos vistos, recargas)."""
+    return get_bus().stats()
+
+
+@router.get("/admin/jobs/{job_id}")
+def admin_job(job_id: str) -> dict:
+    job = _jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Trabajo inexistente o ya descartado")
+    return job.to_dict()
 
 
 @router.get("/admin/rag/texts")
@@ -168,7 +322,7 @@ class IntentPatternDTO(BaseModel):
 
 
 def _intents_path() -> Path:
-    return _project_root() / "config" / "intents.json"
+    return intents_path()
 
 
 @router.get("/admin/intents")
@@ -181,22 +335,30 @@ def admin_get_intents() -> dict:
             for it in _orchestrator._classifier.patterns  # type: ignore[attr-defined]
         ]
         return {"patterns": pats, "source": "memory"}
-    data = json.loads(p.read_text(encoding="utf-8"))
+    data = jsonc.load(p)
     return {"patterns": data.get("patterns", []), "source": str(p)}
 
 
-@router.put("/admin/intents")
-def admin_put_intents(payload: dict) -> dict:
+async def _reload_intents() -> None:
+    _orchestrator.reload_intents()
+
+
+@router.put("/admin/intents", status_code=202)
+async def admin_put_intents(payload: dict) -> dict:
     pats_in = payload.get("patterns", [])
     try:
         pats = [IntentPatternDTO.model_validate(p).model_dump() for p in pats_in]
     except Exception as exc:
         raise HTTPException(status_code=400, detail=f"Patrones inválidos: {exc}")
-    p = _intents_path()
-    p.parent.mkdir(parents=True, exist_ok=True)
-    p.write_text(json.dumps({"patterns": pats}, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
-    # Reconfigurar clasificador
-    from services.orchestrator.intent_classifier import IntentPattern, IntentClassifier
-    seq = [IntentPattern(intent=x["intent"], keywords=tuple(x["keywords"]), confidence=float(x.get("confidence") or 0.6)) for x in pats]
-    _orchestrator._classifier = IntentClassifier(patterns=tuple(seq))  # type: ignore[attr-defined]
-    return {"status": "ok", "count": len(pats)}
+
+    loop = asyncio.get_running_loop()
+
+    def _save(job: Job) -> dict:
+        job.report(0.2, "escribiendo intents")
+        _write_json(_intents_path(), {"patterns": pats})
+        # Reconfigurar clasificador (en el loop) y anunciar el cambio a los demás workers
+        asyncio.run_coroutine_threadsafe(_reload_intents(), loop).result()
+        get_bus().publish("intents")
+        return {"count": len(pats)}
+
+    return _queued(_jobs.submit("intents", _save, key="intents"), count=len(pats))
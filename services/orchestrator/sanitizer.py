@@ -0,0 +1,360 @@
+"""Sanitización de salidas (LLM, reglas y RAG) antes de devolverlas al usuario.
+
+Índice
+------
+1) Patrones precompilados (`_DROP_LINE_RE`, `_CODE_LINE_RE`, `_URL_RE`, ...)
+2) `DomainAllowlist`: trie de sufijos para la lista blanca de dominios
+3) `sanitize_profile`: normaliza (allowed_domains, pre_prompts) a una clave hasheable
+4) `_sanitize_llm_output`: sanitizador batch (texto completo)
+5) `StreamingSanitizer`: sanitizador incremental (chunk a chunk), misma salida
+6) Guía de uso (al final del archivo)
+"""
+
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import Iterable
+from urllib.parse import urlparse
+
+# Quitar bloques de código ``` ... ``` (incluye etiquetas como ```python)
+_FENCE_BLOCK_RE = re.compile(r"```[\s\S]*?```")
+
+# Líneas de encabezado/meta. Se evalúan sobre la línea ya recortada y en
+# minúsculas, por eso basta con anclar al inicio (una línea no contiene "\n").
+_DROP_LINE_PATTERNS: tuple[str, ...] = (
+    r"respuesta\s*:",
+    r"respuesta\s+final\s*:",
+    r"resposta\s*:",
+    r"resposta\s+final\s*:",
+    r"answer\s*:",
+    r"response\s*:",
+    r"la\s+respuesta\s+es",
+    r"explicaci[oó]n",
+    r"evaluaci[oó]n",
+    r"comentari[oa]s?\s*:",
+    r"language\s*:",
+    r"idioma\s*:",
+    r"tags?\s*:",
+    r"c[oó]digo\s*:",
+    r"segu[ií]\s+estas\s+instrucciones\s+al\s+responder",
+    r"us[aá]\s+exclusivamente\s+el\s+contexto\s+provisto\s+para\s+responder",
+    # Docstrings/comentarios de prueba que el modelo a veces inyecta
+    r"\"\"\"",
+    r"'''",
+    r"tests?\s+the\s+response",
+)
+_DROP_LINE_RE = re.compile(r"\s*(?:" + "|".join(_DROP_LINE_PATTERNS) + r")")
+
+# Heurística para líneas claramente de código no cercadas
+_CODE_LINE_RE = re.compile(r"(def\s+|class\s+|from\s+\S+\s+import\s+|import\s+\S+)")
+
+_URL_RE = re.compile(r"https?://[^\s)]+")
+
+_TERMINAL = ""  # clave de nodo terminal en el trie (los caracteres nunca son "")
+
+
+class DomainAllowlist:
+    """Lista blanca de dominios como trie de sufijos (caracteres invertidos).
+
+    Conserva la semántica histórica `netloc.endswith(dominio)`: el host se
+    recorre desde el final y se acepta en cuanto se alcanza un nodo terminal.
+    El costo por URL es O(len(netloc)) e independiente de la cantidad de
+    dominios configurados.
+    """
+
+    __slots__ = ("_root", "_allow_all")
+
+    def __init__(self, domains: Iterable[str]) -> None:
+        self._root: dict[str, dict] = {}
+        self._allow_all = False
+        for domain in domains:
+            d = domain.lower()
+            if not d:
+                # endswith("") siempre es True
+                self._allow_all = True
+                continue
+            node = self._root
+            for ch in reversed(d):
+                node = node.setdefault(ch, {})
+            node[_TERMINAL] = {}
+
+    def allows(self, netloc: str) -> bool:
+        if self._allow_all:
+            return True
+        node = self._root
+        for ch in reversed(netloc):
+            node = node.get(ch)
+            if node is None:
+                return False
+            if _TERMINAL in node:
+                return True
+        return False
+
+    def filter_urls(self, line: str) -> str:
+        """Reemplaza por texto vacío las URLs cuyo host no está permitido."""
+        return _URL_RE.sub(self._repl, line)
+
+    def _repl(self, m: re.Match[str]) -> str:
+        url = m.group(0)
+        try:
+            if self.allows(urlparse(url).netloc.lower()):
+                return url
+        except Exception:
+            pass
+        return ""
+
+
+@lru_cache(maxsize=64)
+def _allowlist_for(domains: tuple[str, ...]) -> DomainAllowlist:
+    return DomainAllowlist(domains)
+
+
+@lru_cache(maxsize=64)
+def _normalized_pre_prompts(pre_prompts: tuple[str, ...]) -> frozenset[str]:
+    return frozenset(p.strip().lower() for p in pre_prompts if p.strip())
+
+
+def sanitize_profile(
+    allowed_domains: Iterable[str] | None = None,
+    pre_prompts: Iterable[str] | None = None,
+) -> tuple[tuple[str, ...], tuple[str, ...]]:
+    """Clave hasheable que determina el resultado del sanitizador para un bot.
+
+    Dos bots (o dos versiones de settings) con el mismo perfil producen la
+    misma salida para el mismo texto; se usa como clave de caché.
+    """
+    allowed = tuple(d for d in (allowed_domains or ()) if isinstance(d, str))
+    pre = tuple(p for p in (pre_prompts or ()) if isinstance(p, str) and p.strip())
+    return allowed, pre
+
+
+def _sanitize_llm_output(
+    text: str,
+    allowed_domains: list[str] | None = None,
+    pre_prompts: list[str] | None = None,
+) -> str:
+    """Limpia metadatos no deseados de la salida del LLM.
+
+    - Elimina bloques de código (``` ... ```), cabeceras tipo "Respuesta:" y
+      comentarios evaluativos ("La respuesta es ...").
+    - Colapsa líneas en blanco y quita duplicados adyacentes.
+    """
+    if not isinstance(text, str):
+        return ""
+    allowed, pre = sanitize_profile(allowed_domains, pre_prompts)
+    # Normalizar pre_prompts para poder filtrar líneas que el modelo pueda "repetir"
+    normalized_pre = _normalized_pre_prompts(pre) if pre else frozenset()
+    allowlist = _allowlist_for(allowed) if allowed else None
+
+    s = _FENCE_BLOCK_RE.sub("", text) if "```" in text else text
+    lines: list[str] = []
+    for raw in s.splitlines():
+        l = _clean_line(raw, normalized_pre, allowlist)
+        if l is not None:
+            lines.append(l)
+    return _collapse(lines)
+
+
+def _clean_line(
+    raw: str,
+    normalized_pre: frozenset[str],
+    allowlist: DomainAllowlist | None,
+) -> str | None:
+    """Procesa una línea; devuelve None si debe descartarse."""
+    l = raw.strip()
+    low = l.lower()
+    if _DROP_LINE_RE.match(low):
+        return None
+    if l.startswith("```"):
+        return None
+    if _CODE_LINE_RE.match(l):
+        return None
+    # Filtrar líneas que son exactamente una instrucción de pre_prompt (con o sin viñeta)
+    if normalized_pre:
+        candidate = low[2:].strip() if low.startswith("- ") else low
+        if candidate in normalized_pre:
+            return None
+    # Filtrar URLs fuera de dominios permitidos (si se configuró)
+    if allowlist is not None and "://" in l:
+        l = allowlist.filter_urls(l)
+    return l
+
+
+def _collapse(lines: list[str]) -> str:
+    """Quita duplicados adyacentes y líneas vacías múltiples."""
+    cleaned: list[str] = []
+    prev = None
+    for l in lines:
+        if not l:
+            if cleaned and cleaned[-1] == "":
+                continue
+            cleaned.append("")
+            prev = ""
+            continue
+        if l == prev:
+            continue
+        cleaned.append(l)
+        prev = l
+    return "\n".join(cleaned).strip()
+
+
+_FENCE = "```"
+
+
+class StreamingSanitizer:
+    """Sanitizador incremental para salidas que llegan token a token.
+
+    Garantía: concatenar lo devuelto por `feed()` y `finish()` produce
+    exactamente `_sanitize_llm_output(texto_completo, ...)` para cualquier
+    partición del texto en chunks.
+
+    Qué se retiene (y por qué)
+    - Una línea incompleta: el filtro de meta/URLs/pre_prompts decide por línea.
+    - Un bloque ``` abierto: se descarta entero al cerrarse; si el stream
+      termina sin cierre, el batch lo conserva como texto literal.
+    - Hasta dos backticks finales: podrían formar una apertura con el próximo chunk.
+    - Un "\r" final: podría ser parte de "\r\n".
+    - Espacios/saltos finales ya aceptados: el batch aplica `.strip()` al final.
+    """
+
+    def __init__(
+        self,
+        allowed_domains: list[str] | None = None,
+        pre_prompts: list[str] | None = None,
+    ) -> None:
+        allowed, pre = sanitize_profile(allowed_domains, pre_prompts)
+        self._normalized_pre = _normalized_pre_prompts(pre) if pre else frozenset()
+        self._allowlist = _allowlist_for(allowed) if allowed else None
+        self._raw = ""  # texto sin resolver respecto de bloques ```
+        self._in_fence = False
+        self._pending = ""  # texto libre de bloques ```, aún sin fin de línea
+        self._last: str | None = None  # última línea aceptada (colapso/duplicados)
+        self._started = False
+        self._held = ""  # espacios finales pendientes de confirmar
+        self._finished = False
+
+    def feed(self, chunk: str) -> str:
+        """Consume un chunk y devuelve el texto seguro que ya es definitivo."""
+        if self._finished:
+            raise RuntimeError("StreamingSanitizer ya fue finalizado")
+        if not chunk:
+            return ""
+        self._raw += chunk
+        self._resolve_fences(final=False)
+        return self._drain_lines(final=False)
+
+    def finish(self) -> str:
+        """Cierra el stream y devuelve el resto del texto sanitizado."""
+        if self._finished:
+            return ""
+        self._finished = True
+        self._resolve_fences(final=True)
+        return self._drain_lines(final=True)
+
+    def _resolve_fences(self, final: bool) -> None:
+        while True:
+            if self._in_fence:
+                # self._raw empieza con la apertura ``` (se conserva por si no cierra)
+                end = self._raw.find(_FENCE, len(_FENCE))
+                if end < 0:
+                    if final:
+                        # Sin cierre: el batch no elimina nada → texto literal
+                        self._pending += self._raw
+                        self._raw = ""
+                        self._in_fence = False
+                    return
+                self._raw = self._raw[end + len(_FENCE):]
+                self._in_fence = False
+                continue
+            start = self._raw.find(_FENCE)
+            if start >= 0:
+                self._pending += self._raw[:start]
+                self._raw = self._raw[start:]
+                self._in_fence = True
+                continue
+            keep = 0 if final else len(self._raw) - len(self._raw.rstrip("`"))
+            keep = min(keep, len(_FENCE) - 1)
+            cut = len(self._raw) - keep
+            self._pending += self._raw[:cut]
+            self._raw = self._raw[cut:]
+            return
+
+    def _drain_lines(self, final: bool) -> str:
+        if not self._pending:
+            return ""
+        parts = self._pending.splitlines(keepends=True)
+        if final:
+            self._pending = ""
+        else:
+            tail = parts[-1]
+            complete = tail.splitlines()[0] != tail if tail else False
+            if not complete or tail.endswith("\r"):
+                self._pending = parts.pop()
+            else:
+                self._pending = ""
+        out: list[str] = []
+        for part in parts:
+            lines = part.splitlines()
+            line = _clean_line(lines[0] if lines else "", self._normalized_pre, self._allowlist)
+            if line is not None:
+                out.append(self._accept(line))
+        if final:
+            self._held = ""
+        return "".join(out)
+
+    def _accept(self, l: str) -> str:
+        """Aplica el colapso de `_collapse` a una línea y devuelve el texto a emitir."""
+        if not l:
+            if self._last == "":
+                return ""
+            segment = "" if self._last is None else "\n"
+            self._last = ""
+        else:
+            if l == self._last:
+                return ""
+            segment = l if self._last is None else "\n" + l
+            self._last = l
+        # Emular el `.strip()` final: omitir espacios iniciales y retener los finales
+        if not self._started:
+            segment = segment.lstrip()
+            if not segment:
+                return ""
+            self._started = True
+        else:
+            segment = self._held + segment
+        core = segment.rstrip()
+        self._held = segment[len(core):]
+        return core
+
+
+# ================================================================
+# Guía de uso (Sanitizador)
+# ================================================================
+#
+# Uso básico
+# -----------
+# from services.orchestrator.sanitizer import _sanitize_llm_output
+# clean = _sanitize_llm_output(texto, allowed_domains=["municipio.gob"], pre_prompts=[...])
+#
+# Streaming
+# ---------
+# from services.orchestrator.sanitizer import StreamingSanitizer
+# san = StreamingSanitizer(allowed_domains=[...], pre_prompts=[...])
+# for chunk in tokens:
+#     safe = san.feed(chunk)   # texto definitivo (puede ser "")
+# safe = san.finish()          # resto al cerrar el stream
+# La concatenación es idéntica a `_sanitize_llm_output(texto_completo)`.
+#
+# Agregar patrones
+# ----------------
+# - Nuevos encabezados/meta a descartar: sumar la regex (sin `^` ni `.*$`) a
+#   `_DROP_LINE_PATTERNS`. Se compilan una única vez en `_DROP_LINE_RE`.
+#
+# Performance
+# -----------
+# - Todas las regex se compilan al importar el módulo.
+# - La lista blanca de dominios se compila a un trie por perfil (lru_cache).
+# - Las respuestas estáticas (reglas/RAG) se sanitizan una sola vez por perfil
+#   en el orquestador (ver ChatOrchestrator._sanitize_static).
+# - Benchmark: python scripts/bench_sanitizer.py
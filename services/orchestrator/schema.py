@@ -15,3 +15,7 @@ class ChatResponse(BaseModel):
     reply: str = Field(..., description="Respuesta generada")
     source: str = Field(..., description="Origen de la respuesta (faq, rag, llm, fallback)")
     escalated: bool = Field(False, description="Si se derivó a un agente humano")
+    degraded: str | None = Field(
+        None,
+        description="Motivo de respuesta degradada (p. ej. 'deadline' si venció el SLO de latencia del bot)",
+    )
@@ -2,10 +2,19 @@
 
 from __future__ import annotations
 
+import asyncio
+import contextvars
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from typing import Any, AsyncIterator, Callable, Iterable
+
 from services.orchestrator import schema
 import random
-from services.llm_adapter.client import LLMClient
-from services.orchestrator.intent_classifier import IntentClassifier
+from services.llm_adapter.client import PLACEHOLDER_REPLY, LLMClient
+from services.llm_adapter.scheduler import ModelLoading, SchedulerTimeout
+from services.orchestrator.intent_classifier import IntentClassifier, load_patterns
 from services.orchestrator.rule_engine import RuleBasedResponder, Rule
 from services.orchestrator.types import (
     IntentPrediction,
@@ -15,8 +24,78 @@ from services.orchestrator.types import (
 import os
 from services.orchestrator.rag import SimpleRagResponder, load_default_entries, load_text_dir_entries, KnowledgeEntry
 from pathlib import Path
-import re
-from services.chatbots.models import load_settings
+from services.chatbots.models import known_bots, load_settings, settings_version
+from services.orchestrator.answer_cache import AnswerCache, normalize_question
+from services.orchestrator.menu_answers import MenuAnswerTable
+from services.orchestrator.deadline import Deadline, DeadlineExceeded, iterate_until, within
+from services.orchestrator.prompt_builder import PromptBudget, estimate_tokens
+from services.orchestrator.sanitizer import StreamingSanitizer, _sanitize_llm_output, sanitize_profile
+from services.orchestrator.session_store import SessionStore, is_follow_up, render_history
+from services.orchestrator.single_flight import LeaderAborted, SingleFlight
+from services.observability import tracing
+from services.observability.metrics import current_timer, stage, start_timer
+
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class LLMPlan:
+    """Invocación pendiente al LLM decidida por el ruteo.
+
+    - prompt: texto final a enviar al modelo.
+    - generation: kwargs de generación (temperature/top_p/max_tokens).
+    - settings: settings del bot para sanitizar la salida (None = sin perfil).
+    - bot_id/channel: origen de la consulta (prioridad en la cola de inferencia).
+    - prefix_len: largo del prefijo estable del prompt (preludio + pre_prompts);
+      el cliente reutiliza su estado KV por bot.
+    - context_uids/cacheable: entradas RAG usadas como contexto y si la
+      respuesta puede guardarse en el cache de respuestas (sólo fallback).
+    - contexts: textos RAG recuperados (mejor primero) para respuestas sin LLM.
+    - deadline: vencimiento de la consulta según el SLO del bot (None = sin límite).
+    """
+
+    prompt: str
+    generation: dict[str, Any] = field(default_factory=dict)
+    settings: Any = None
+    bot_id: str = ""
+    channel: str = ""
+    prefix_len: int = 0
+    context_uids: tuple[str, ...] = ()
+    cacheable: bool = False
+    contexts: tuple[str, ...] = ()
+    deadline: Deadline | None = None
+
+    def llm_kwargs(self) -> dict[str, Any]:
+        """kwargs para LLMClient.generate*/: generación + bot/canal (prioridad de cola) + prefijo + deadline."""
+        kwargs = {**self.generation, "bot_id": self.bot_id, "channel": self.channel, "prefix_len": self.prefix_len}
+        if self.deadline is not None:
+            kwargs["deadline_s"] = self.deadline.remaining()
+        return kwargs
+
+
+_HISTORY_HEADER = "CONVERSACIÓN PREVIA:\n"
+_DEFAULT_RAG_THRESHOLD = 0.28
+
+
+def _history_block(lines: list[str]) -> str:
+    """Bloque de turnos previos para el prompt ("" si no hay memoria)."""
+    if not lines:
+        return ""
+    return _HISTORY_HEADER + "\n".join(lines) + "\n\n"
+
+
+def _bot_and_channel(request: schema.ChatRequest) -> tuple[str, str]:
+    """Bot efectivo (inferido del canal si no viene) y canal normalizado."""
+    channel = (request.channel or "").lower()
+    return request.bot_id or ("mar2" if channel in {"mar2", "free"} else "municipal"), channel
+
+
+def _generation_kwargs(settings) -> dict[str, Any]:
+    return {
+        "temperature": settings.generation.temperature,
+        "top_p": settings.generation.top_p,
+        "max_tokens": settings.generation.max_tokens,
+    }
 
 
 class ChatOrchestrator:
@@ -29,13 +108,408 @@ class ChatOrchestrator:
         self._rag: RagResponderProtocol | None = None
         self._rag_entries: list[KnowledgeEntry] | None = None
         self._rag_cache: dict[float, RagResponderProtocol] = {}
+        # (perfil de sanitización, texto estático) → texto sanitizado; LRU acotado, se llena en el primer uso
+        self._static_replies: OrderedDict[tuple[tuple[tuple[str, ...], tuple[str, ...]], str], str] = OrderedDict()
+        self._static_replies_max = max(1, int(os.getenv("WEBCHATBOT_STATIC_REPLY_CACHE", "4096") or 4096))
+        # Respuestas del LLM cacheadas; se invalidan al cambiar la generación del índice
+        cache_env = os.getenv("WEBCHATBOT_ANSWER_CACHE", "1").lower()
+        self._answers: AnswerCache | None = AnswerCache() if cache_env not in {"0", "false", "no"} else None
+        self._index_generation = 0
+        # Últimos turnos por sesión (acotados); alimentan los prompts del fallback y mar2
+        memory_env = os.getenv("WEBCHATBOT_SESSION_MEMORY", "1").lower()
+        self._sessions: SessionStore | None = SessionStore() if memory_env not in {"0", "false", "no"} else None
+        # Consultas idénticas concurrentes comparten un único cálculo
+        coalesce_env = os.getenv("WEBCHATBOT_COALESCE", "1").lower()
+        self._flights: SingleFlight | None = SingleFlight() if coalesce_env not in {"0", "false", "no"} else None
+        # Respuestas precalculadas de los chips del menú (menu_suggestions)
+        prewarm_env = os.getenv("WEBCHATBOT_PREWARM", "1").lower()
+        self._menu: MenuAnswerTable | None = MenuAnswerTable() if prewarm_env not in {"0", "false", "no"} else None
+        self._menu_tasks: dict[tuple[str, str], asyncio.Task[int]] = {}
+        # Sube con cada recarga de patrones: los chips se clasificaron con los anteriores
+        self._intents_generation = 0
+        self.reload_intents()
         self._bootstrap_rag()
 
     async def respond(self, request: schema.ChatRequest) -> schema.ChatResponse:
-        # Determinar bot y cargar configuración persistente
-        channel = (request.channel or "").lower()
-        bot_id = request.bot_id or ("mar2" if channel in {"mar2", "free"} else "municipal")
+        # Temporizador por etapas de la consulta (Server-Timing y GET /metrics)
+        timer = start_timer()
+        source = "error"
+        try:
+            response = await self._respond_coalesced(request)
+            source = response.source
+            self._remember(request, response)
+            return response
+        finally:
+            timer.finish(source)
+
+    async def _respond(self, request: schema.ChatRequest) -> schema.ChatResponse:
+        routed = await self._resolve(request)
+        if isinstance(routed, schema.ChatResponse):
+            return routed
+        group = self._answer_group(routed)
+        if group is not None and (cached := self._cached_answer(group, request.message)) is not None:
+            return schema.ChatResponse(session_id=request.session_id, reply=cached, source="llm")
+        try:
+            generated, expired = await self._generate(routed)
+        except ModelLoading:
+            # El servidor de inferencia todavía carga el modelo (backend remoto)
+            return self._warming_response(request, routed)
+        if expired:
+            return self._deadline_response(request, routed, generated)
+        response = self._build_response(request, generated, "llm", settings=routed.settings)
+        if group is not None and generated != PLACEHOLDER_REPLY:
+            self._answers.put(group, request.message, response.reply)  # type: ignore[union-attr]
+        return response
+
+    async def respond_stream(
+        self, request: schema.ChatRequest
+    ) -> AsyncIterator[str | schema.ChatResponse]:
+        """Variante streaming de `respond`.
+
+        Produce fragmentos de texto (ya sanitizados) a medida que el LLM genera
+        y, al final, el `ChatResponse` completo. Reglas, RAG y textos fijos no
+        generan fragmentos: sólo se emite el `ChatResponse`.
+        """
+        timer = start_timer()
+        source = "error"
+        try:
+            async for item in self._respond_stream_coalesced(request):
+                if isinstance(item, schema.ChatResponse):
+                    source = item.source
+                    self._remember(request, item)
+                yield item
+        finally:
+            timer.finish(source)
+
+    async def _respond_stream(
+        self, request: schema.ChatRequest
+    ) -> AsyncIterator[str | schema.ChatResponse]:
+        routed = await self._resolve(request)
+        if isinstance(routed, schema.ChatResponse):
+            yield routed
+            return
+        group = self._answer_group(routed)
+        if group is not None and (cached := self._cached_answer(group, request.message)) is not None:
+            if cached:
+                yield cached
+            yield schema.ChatResponse(session_id=request.session_id, reply=cached, source="llm")
+            return
+        deadline = routed.deadline
+        if deadline is not None and not deadline.allows_generation():
+            degraded = self._deadline_response(request, routed, "")
+            yield degraded.reply
+            yield degraded
+            return
+        chunks = self._llm.generate_stream(routed.prompt, **routed.llm_kwargs())
+        if deadline is not None:
+            chunks = iterate_until(deadline, chunks)
+        sanitizer = StreamingSanitizer(*self._sanitize_profile_for(routed.settings))
+        parts: list[str] = []
+        raw: list[str] = []
+        expired = False
+        try:
+            async for chunk in chunks:
+                raw.append(chunk)
+                if safe := sanitizer.feed(chunk):
+                    parts.append(safe)
+                    yield safe
+        except DeadlineExceeded:
+            expired = True
+        except SchedulerTimeout:
+            if deadline is None:
+                raise
+            expired = True
+        except ModelLoading:
+            if raw:
+                raise
+            yield self._warming_response(request, routed)
+            return
+        tail = sanitizer.finish()
+        if expired and not parts and (routed.contexts or not tail):
+            # Nada entregado todavía: se responde con el fragmento RAG (o un aviso)
+            degraded = self._deadline_response(request, routed, "")
+            yield degraded.reply
+            yield degraded
+            return
+        if expired:
+            tail += "…"
+        if tail:
+            parts.append(tail)
+            yield tail
+        reply = "".join(parts)
+        if expired:
+            yield schema.ChatResponse(session_id=request.session_id, reply=reply, source="llm", degraded="deadline")
+            return
+        if group is not None and "".join(raw) != PLACEHOLDER_REPLY:
+            self._answers.put(group, request.message, reply)  # type: ignore[union-attr]
+        yield schema.ChatResponse(session_id=request.session_id, reply=reply, source="llm")
+
+    def _flight_key(self, request: schema.ChatRequest) -> tuple[str, ...] | None:
+        """(bot, canal, mensaje normalizado, versión de settings, índice, historia) o None si no se coalesce."""
+        if self._flights is None:
+            return None
+        message = normalize_question(request.message)
+        if not message:
+            return None
+        bot_id, channel = _bot_and_channel(request)
+        # Repreguntas y mar2: la respuesta del LLM depende de la conversación previa
+        history = "\n".join(self._history(request))
+        return (bot_id, channel, message, settings_version(bot_id), str(self._index_generation), history)
+
+    async def _shared(self, key: tuple[str, ...] | None, request: schema.ChatRequest) -> schema.ChatResponse | None:
+        """Respuesta de una consulta idéntica en curso (con el session_id propio) o None."""
+        flight = self._flights.join(key) if self._flights is not None and key is not None else None
+        if flight is None:
+            return None
+        try:
+            with stage("coalesced"):
+                shared = await asyncio.shield(flight)
+        except LeaderAborted:
+            return None
+        return shared.model_copy(update={"session_id": request.session_id})
+
+    async def _respond_coalesced(self, request: schema.ChatRequest) -> schema.ChatResponse:
+        if (chip := self._menu_answer(request)) is not None:
+            return chip
+        key = self._flight_key(request)
+        if (shared := await self._shared(key, request)) is not None:
+            return shared
+        if key is None:
+            return await self._respond(request)
+        future = self._flights.lead(key)  # type: ignore[union-attr]
+        try:
+            response = await self._respond(request)
+        except BaseException as exc:
+            self._flights.finish(key, future, error=exc)  # type: ignore[union-attr]
+            raise
+        self._flights.finish(key, future, response)  # type: ignore[union-attr]
+        return response
+
+    async def _respond_stream_coalesced(
+        self, request: schema.ChatRequest
+    ) -> AsyncIterator[str | schema.ChatResponse]:
+        shared = self._menu_answer(request)
+        key = self._flight_key(request) if shared is None else None
+        if shared is not None or (shared := await self._shared(key, request)) is not None:
+            # El texto ya está completo: un único fragmento (sólo si lo generó el LLM)
+            if shared.source == "llm" and shared.reply:
+                yield shared.reply
+            yield shared
+            return
+        if key is None:
+            async for item in self._respond_stream(request):
+                yield item
+            return
+        future = self._flights.lead(key)  # type: ignore[union-attr]
+        final: schema.ChatResponse | None = None
+        error: BaseException | None = None
+        try:
+            async for item in self._respond_stream(request):
+                if isinstance(item, schema.ChatResponse):
+                    final = item
+                yield item
+        except BaseException as exc:
+            error = exc
+            raise
+        finally:
+            # Stream cortado antes del ChatResponse final: quienes esperan calculan por su cuenta
+            if final is None and error is None:
+                error = asyncio.CancelledError()
+            self._flights.finish(key, future, final, error=error if final is None else None)  # type: ignore[union-attr]
+
+    def _menu_version(self, bot_id: str) -> tuple[str, str, str, str]:
+        return (
+            settings_version(bot_id),
+            str(self._index_generation),
+            str(self._intents_generation),
+            str(getattr(self._llm, "state", "ready")),
+        )
+
+    def _menu_answer(self, request: schema.ChatRequest) -> schema.ChatResponse | None:
+        """Respuesta precalculada de un chip del menú (O(1)); agenda el recalentado si cambió la versión."""
+        if self._menu is None:
+            return None
+        bot_id, channel = _bot_and_channel(request)
+        if not self._menu.known(bot_id, channel):
+            return None
+        with stage("menu"):
+            version = self._menu_version(bot_id)
+            hit = self._menu.lookup(bot_id, channel, version, normalize_question(request.message))
+            if hit is None and not self._menu.is_current(bot_id, channel, version):
+                self._schedule_prewarm(bot_id, channel)
+        if hit is None:
+            return None
+        timer = current_timer()
+        if timer is not None:
+            timer.bot, timer.channel = bot_id, channel
+        return hit.model_copy(update={"session_id": request.session_id})
+
+    def _schedule_prewarm(self, bot_id: str, channel: str) -> None:
+        pair = (bot_id, channel)
+        running = self._menu_tasks.get(pair)
+        if running is not None and not running.done():
+            return
+        # Contexto vacío: las etapas del recalentado no deben sumarse a la consulta que lo disparó
+        # (create_task copia el contexto actual; `context=` recién existe en Python 3.11)
+        self._menu_tasks[pair] = contextvars.Context().run(asyncio.create_task, self._prewarm_bot(bot_id, channel))
+
+    async def prewarm_menu(self, bots: Iterable[tuple[str, str]] | None = None) -> dict[str, int]:
+        """Pasa los menu_suggestions de cada bot por el pipeline y guarda las respuestas.
+
+        Devuelve {"bot/canal": respuestas guardadas}. Por defecto recorre los bots de
+        chatbots/<id>/ con el canal de su config.json.
+        """
+        if self._menu is None:
+            return {}
+        return {f"{bot_id}/{channel}": await self._prewarm_bot(bot_id, channel.lower()) for bot_id, channel in (bots or known_bots())}
+
+    async def _prewarm_bot(self, bot_id: str, channel: str) -> int:
+        version = self._menu_version(bot_id)
         settings = load_settings(bot_id, channel=channel)
+        answers: dict[str, schema.ChatResponse] = {}
+        for item in settings.menu_suggestions:
+            key = normalize_question(item.message)
+            if not key or key in answers:
+                continue
+            request = schema.ChatRequest(session_id="prewarm", message=item.message, channel=channel, bot_id=bot_id)
+            try:
+                response = await self._prewarm_answer(request)
+            except Exception:
+                LOGGER.exception("No se pudo precalcular el chip %r de %s", item.message, bot_id)
+                continue
+            if response is not None:
+                answers[key] = response
+        self._menu.store(bot_id, channel, version, answers)  # type: ignore[union-attr]
+        return len(answers)
+
+    async def _prewarm_answer(self, request: schema.ChatRequest) -> schema.ChatResponse | None:
+        """Respuesta cacheable del chip: reglas/RAG/textos fijos, o LLM sólo con el modelo listo."""
+        routed = await self._route(request)
+        if isinstance(routed, schema.ChatResponse):
+            return routed if routed.degraded is None else None
+        if getattr(self._llm, "state", "ready") != "ready":
+            return None
+        generated, expired = await self._generate(replace(routed, deadline=None))
+        if expired or not generated or generated == PLACEHOLDER_REPLY:
+            return None
+        return self._build_response(request, generated, "llm", settings=routed.settings)
+
+    def _remember(self, request: schema.ChatRequest, response: schema.ChatResponse) -> None:
+        if self._sessions is not None:
+            self._sessions.record(request.session_id, request.message, response.reply)
+
+    def _history(self, request: schema.ChatRequest) -> list[str]:
+        """Turnos previos de la sesión como líneas de prompt (antes de registrar el actual).
+
+        Sólo cuando la pregunta depende de ellos: conversación libre (mar2/free) o
+        repregunta. El resto no lleva historia y sigue siendo cacheable y coalescible.
+        """
+        if self._sessions is None:
+            return []
+        if _bot_and_channel(request)[1] not in {"mar2", "free"} and not is_follow_up(request.message):
+            return []
+        return render_history(self._sessions.recent(request.session_id))
+
+    def readiness(self) -> dict[str, Any]:
+        """Estado por componente para GET /readyz (reglas y RAG cargan al iniciar; el LLM en segundo plano)."""
+        llm = self._llm.readiness() if hasattr(self._llm, "readiness") else {"ready": True, "state": "ready"}
+        components = {
+            "rules": {"ready": True, "count": len(self._rules.rules)},
+            "rag": {"ready": True, "loaded": self._rag is not None, "entries": len(self._rag_entries or [])},
+            "llm": llm,
+        }
+        return {"ready": all(c["ready"] for c in components.values()), "components": components}
+
+    async def _resolve(self, request: schema.ChatRequest) -> schema.ChatResponse | LLMPlan:
+        """`_route` + respuesta de "modelo iniciando" si el LLM todavía se está cargando."""
+        routed = await self._route(request)
+        if isinstance(routed, LLMPlan) and getattr(self._llm, "warming_up", False):
+            return self._warming_response(request, routed)
+        return routed
+
+    def _warming_response(self, request: schema.ChatRequest, plan: LLMPlan) -> schema.ChatResponse:
+        # Respuesta fundamentada: si hubo contexto RAG, se ofrece el mejor fragmento
+        if plan.contexts:
+            text = (
+                "El asistente se está iniciando y todavía no puede elaborar respuestas. "
+                "Mientras tanto, esto es lo que encontré:\n\n" + plan.contexts[0]
+            )
+        else:
+            text = (
+                "El asistente se está iniciando y todavía no puede elaborar respuestas. "
+                "Probá de nuevo en unos instantes o escribí 'ayuda' para ver opciones."
+            )
+        return self._build_response(request, text, "fallback", settings=plan.settings)
+
+    async def _generate(self, plan: LLMPlan) -> tuple[str, bool]:
+        """Genera la respuesta del plan; con deadline la corta al vencer.
+
+        Devuelve (texto, vencido). Con deadline se itera en streaming para
+        detener la generación apenas se agota el SLO; el texto es lo producido
+        hasta ese momento.
+        """
+        deadline = plan.deadline
+        if deadline is None:
+            return await self._llm.generate(plan.prompt, **plan.llm_kwargs()), False
+        if not deadline.allows_generation():
+            return "", True
+        parts: list[str] = []
+        try:
+            async for chunk in iterate_until(deadline, self._llm.generate_stream(plan.prompt, **plan.llm_kwargs())):
+                parts.append(chunk)
+        except (DeadlineExceeded, SchedulerTimeout):
+            return "".join(parts), True
+        return "".join(parts).strip(), False
+
+    def _deadline_response(self, request: schema.ChatRequest, plan: LLMPlan, partial: str) -> schema.ChatResponse:
+        """Respuesta degradada al vencer el SLO: mejor fragmento RAG, texto parcial o aviso."""
+        if plan.contexts:
+            response = self._build_response(request, plan.contexts[0], "rag", settings=plan.settings)
+        elif partial.strip() and partial != PLACEHOLDER_REPLY:
+            response = self._build_response(request, partial.rstrip() + "…", "llm", settings=plan.settings)
+        else:
+            text = (
+                "No llegué a elaborar una respuesta a tiempo. "
+                "Probá de nuevo en unos instantes o escribí 'ayuda' para ver opciones."
+            )
+            response = self._build_response(request, text, "fallback", settings=plan.settings)
+        return response.model_copy(update={"degraded": "deadline"})
+
+    def _prompt_budget(self, settings) -> PromptBudget:
+        """Presupuesto de tokens del prompt según la ventana del modelo y max_tokens del bot."""
+        generation = _generation_kwargs(settings) if settings is not None else {}
+        default_max = getattr(getattr(self._llm, "settings", None), "max_tokens", 256)
+        return PromptBudget(
+            context_window=int(getattr(self._llm, "context_window", 2048)),
+            max_tokens=int(generation.get("max_tokens") or default_max),
+            count=getattr(self._llm, "token_counter", None) or estimate_tokens,
+        )
+
+    def _cached_answer(self, group: str, message: str) -> str | None:
+        with stage("cache"):
+            return self._answers.get(group, message)  # type: ignore[union-attr]
+
+    def _answer_group(self, plan: LLMPlan) -> str | None:
+        """Grupo del cache de respuestas para el plan (None = no cacheable)."""
+        if self._answers is None or not plan.cacheable:
+            return None
+        model_id = getattr(self._llm, "model_id", "") or type(self._llm).__name__
+        return AnswerCache.group_key(
+            plan.bot_id, plan.context_uids, plan.generation, model_id, plan.prompt[: plan.prefix_len]
+        )
+
+    async def _route(self, request: schema.ChatRequest) -> schema.ChatResponse | LLMPlan:
+        """Decide la fuente de respuesta; devuelve la respuesta final o el plan de generación."""
+        started = time.monotonic()
+        # Determinar bot y cargar configuración persistente
+        bot_id, channel = _bot_and_channel(request)
+        timer = current_timer()
+        if timer is not None:
+            timer.bot, timer.channel = bot_id, channel
+        with stage("settings"):
+            settings = load_settings(bot_id, channel=channel)
+        # SLO de latencia del bot → deadline propagado a clasificación, RAG y generación
+        deadline = Deadline.from_slo_ms(getattr(settings, "latency_slo_ms", 0), started_at=started)
 
         # Helper para inyectar pre-prompts de configuración
         def compose_with_preprompts(text: str) -> str:
@@ -51,15 +525,25 @@ class ChatOrchestrator:
 
         # Modo conversación libre (sin menú ni reglas): canal mar2/free
         if channel in {"mar2", "free"}:
-            generated = await self._llm.generate(
-                compose_with_preprompts(request.message),
-                temperature=settings.generation.temperature,
-                top_p=settings.generation.top_p,
-                max_tokens=settings.generation.max_tokens,
+            with stage("prompt"):
+                budget = self._prompt_budget(settings)
+                # Sin lugar para la pregunta se descartan los pre_prompts antes que exceder la ventana
+                free = (compose_with_preprompts, lambda text: text)[budget.pick_fixed([compose_with_preprompts(""), ""])]
+                message = budget.fit_question(free(""), request.message)
+                history = budget.fit_history(free(message), self._history(request), _HISTORY_HEADER)
+            return LLMPlan(
+                prompt=free(_history_block(history) + message),
+                generation=_generation_kwargs(settings),
+                prefix_len=len(free("")),
+                bot_id=bot_id,
+                channel=channel,
+                deadline=deadline,
             )
-            return self._build_response(request, generated, "llm")
 
-        prediction = await self._classifier.classify(request.message)
+        with stage("classify"):
+            prediction = await within(
+                deadline, self._classifier.classify(request.message), IntentPrediction(intent="unknown", confidence=0.0)
+            )
 
         if prediction.intent == "handoff":
             return self._build_response(
@@ -72,11 +556,17 @@ class ChatOrchestrator:
         # Reglas: si hay match responde; si no hay match y está activado
         # features.use_generic_no_match, devuelve un mensaje genérico orientando
         # a reformular (sin pasar por RAG/LLM para intents faq/smalltalk).
-        if settings.features.use_rules and (reply := await self._try_rules(request, prediction, settings)):
-            return reply
+        if settings.features.use_rules:
+            with stage("rules"):
+                reply = await self._try_rules(request, prediction, settings)
+            if reply:
+                return reply
 
-        if settings.features.use_rag and (reply := await self._try_rag(request, prediction, settings)):
-            return reply
+        if settings.features.use_rag:
+            with stage("rag"):
+                reply = await self._try_rag(request, prediction, settings, deadline)
+            if reply:
+                return reply
 
         # Si no hubo match y el intent es "unknown", y está habilitada la
         # respuesta genérica, devolverla (evita ir al LLM para entradas vagas).
@@ -95,10 +585,13 @@ class ChatOrchestrator:
                 )
             return self._build_response(request, text, "fallback")
 
-        return await self._fallback(request, settings, compose_with_preprompts)
+        routed = await self._fallback(request, settings, compose_with_preprompts, deadline)
+        if isinstance(routed, LLMPlan):
+            routed = replace(routed, bot_id=bot_id, channel=channel, deadline=deadline)
+        return routed
 
-    @staticmethod
     def _build_response(
+        self,
         request: schema.ChatRequest,
         reply: str,
         source: ResponseSource,
@@ -106,80 +599,55 @@ class ChatOrchestrator:
         settings=None,
     ) -> schema.ChatResponse:
         # Sanitizar salida en todos los casos (Reglas/RAG/LLM)
-        allowed = []
+        profile = self._sanitize_profile_for(settings)
+        if source == "llm":
+            clean = _sanitize_llm_output(reply, *profile)
+        else:
+            # Reglas, RAG y textos fijos: salida estática → sanitizada una vez por perfil
+            clean = self._sanitize_static(reply, profile)
+        return schema.ChatResponse(
+            session_id=request.session_id,
+            reply=clean,
+            source=source,
+            escalated=escalated,
+        )
+
+    @staticmethod
+    def _sanitize_profile_for(settings) -> tuple[tuple[str, ...], tuple[str, ...]]:
+        allowed: list[str] = []
         pre_prompts: list[str] | None = None
         try:
             if settings is not None:
                 allowed = list(getattr(settings, "allowed_domains", []) or [])
-                pre_prompts = [
-                    p
-                    for p in (getattr(settings, "pre_prompts", []) or [])
-                    if isinstance(p, str) and p.strip()
-                ]
+                pre_prompts = list(getattr(settings, "pre_prompts", []) or [])
         except Exception:
             allowed = []
             pre_prompts = None
-        clean = _sanitize_llm_output(reply, allowed, pre_prompts)
-        return schema.ChatResponse(
-            session_id=request.session_id,
-            reply=clean,
-            source=source,
-            escalated=escalated,
-        )
+        return sanitize_profile(allowed, pre_prompts)
+
+    def _sanitize_static(self, text: str, profile: tuple[tuple[str, ...], tuple[str, ...]]) -> str:
+        """Versión sanitizada de una respuesta estática (regla, entrada RAG, texto fijo).
+
+        Se memoiza por (perfil, texto) en un LRU acotado: sólo se sanitiza lo que se
+        responde, sin recorrer toda la KB por perfil. La clave es el propio texto, así
+        que un reindexado no invalida nada (un texto nuevo es una clave nueva).
+        """
+        key = (profile, text)
+        clean = self._static_replies.get(key)
+        if clean is not None:
+            self._static_replies.move_to_end(key)
+            return clean
+        clean = self._static_replies[key] = _sanitize_llm_output(text, *profile)
+        if len(self._static_replies) > self._static_replies_max:
+            self._static_replies.popitem(last=False)
+        return clean
 
     async def _try_rules(
         self, request: schema.ChatRequest, prediction: IntentPrediction, settings=None
     ) -> schema.ChatResponse | None:
         if prediction.intent not in {"faq", "smalltalk"}:
             return None
-        # Si hay settings, combinar reglas por defecto con personalizadas según enable_default_rules.
-        responder = self._rules
-        if settings is not None:
-            try:
-                custom_rules_data = getattr(settings, "rules", []) or []
-                custom_rules: list[Rule] = []
-                # Plantilla de ayuda/menu configurable
-                try:
-                    help_tpl = str(getattr(settings, "help_template", "") or "").strip()
-                    if help_tpl:
-                        custom_rules.append(Rule(keywords=("ayuda",), response=help_tpl, source="fallback"))
-                        custom_rules.append(Rule(keywords=("menu",), response=help_tpl, source="fallback"))
-                except Exception:
-                    pass
-                for rc in custom_rules_data:
-                    # rc puede ser dict o RuleConfig; acceder de forma segura
-                    keywords = list(getattr(rc, "keywords", []) or (rc.get("keywords", []) if isinstance(rc, dict) else []))
-                    response = getattr(rc, "response", None) if not isinstance(rc, dict) else rc.get("response")
-                    source = getattr(rc, "source", "faq") if not isinstance(rc, dict) else rc.get("source", "faq")
-                    enabled = getattr(rc, "enabled", True) if not isinstance(rc, dict) else rc.get("enabled", True)
-                    min_matches = getattr(rc, "min_matches", None) if not isinstance(rc, dict) else rc.get("min_matches")
-                    if enabled and keywords and isinstance(response, str) and response.strip():
-                        # Normalizar min_matches (entero positivo) si se provee
-                        mm = None
-                        try:
-                            if min_matches is not None:
-                                mm_val = int(min_matches)
-                                mm = mm_val if mm_val > 0 else None
-                        except Exception:
-                            mm = None
-                        custom_rules.append(
-                            Rule(
-                                keywords=tuple(keywords),
-                                response=response.strip(),
-                                source=("fallback" if source == "fallback" else "faq"),
-                                min_matches=mm,
-                            )
-                        )
-                rules: list[Rule] = []
-                # Priorizar reglas personalizadas (más específicas) por delante de las default
-                rules.extend(custom_rules)
-                if getattr(settings.features, "enable_default_rules", True):
-                    rules.extend(self._rules.rules)
-                if rules:
-                    responder = RuleBasedResponder(rules)
-            except Exception:
-                # En caso de estructura inesperada, continuar con defaults
-                responder = self._rules
+        responder = self._responder_for(settings) if settings is not None else self._rules
         match = await responder.get_response(request.message)
         if not match:
             # Si no hay coincidencia de reglas y el bot lo permite, responder
@@ -202,8 +670,58 @@ class ChatOrchestrator:
         reply, source = match
         return self._build_response(request, reply, source, settings=settings)
 
+    def _responder_for(self, settings) -> RuleBasedResponder:
+        """Combina reglas por defecto con personalizadas según enable_default_rules."""
+        responder = self._rules
+        try:
+            custom_rules_data = getattr(settings, "rules", []) or []
+            custom_rules: list[Rule] = []
+            # Plantilla de ayuda/menu configurable
+            try:
+                help_tpl = str(getattr(settings, "help_template", "") or "").strip()
+                if help_tpl:
+                    custom_rules.append(Rule(keywords=("ayuda",), response=help_tpl, source="fallback"))
+                    custom_rules.append(Rule(keywords=("menu",), response=help_tpl, source="fallback"))
+            except Exception:
+                pass
+            for rc in custom_rules_data:
+                # rc puede ser dict o RuleConfig; acceder de forma segura
+                keywords = list(getattr(rc, "keywords", []) or (rc.get("keywords", []) if isinstance(rc, dict) else []))
+                response = getattr(rc, "response", None) if not isinstance(rc, dict) else rc.get("response")
+                source = getattr(rc, "source", "faq") if not isinstance(rc, dict) else rc.get("source", "faq")
+                enabled = getattr(rc, "enabled", True) if not isinstance(rc, dict) else rc.get("enabled", True)
+                min_matches = getattr(rc, "min_matches", None) if not isinstance(rc, dict) else rc.get("min_matches")
+                if enabled and keywords and isinstance(response, str) and response.strip():
+                    # Normalizar min_matches (entero positivo) si se provee
+                    mm = None
+                    try:
+                        if min_matches is not None:
+                            mm_val = int(min_matches)
+                            mm = mm_val if mm_val > 0 else None
+                    except Exception:
+                        mm = None
+                    custom_rules.append(
+                        Rule(
+                            keywords=tuple(keywords),
+                            response=response.strip(),
+                            source=("fallback" if source == "fallback" else "faq"),
+                            min_matches=mm,
+                        )
+                    )
+            rules: list[Rule] = []
+            # Priorizar reglas personalizadas (más específicas) por delante de las default
+            rules.extend(custom_rules)
+            if getattr(settings.features, "enable_default_rules", True):
+                rules.extend(self._rules.rules)
+            if rules:
+                responder = RuleBasedResponder(rules)
+        except Exception:
+            # En caso de estructura inesperada, continuar con defaults
+            responder = self._rules
+        return responder
+
     async def _try_rag(
-        self, request: schema.ChatRequest, prediction: IntentPrediction, settings=None
+        self, request: schema.ChatRequest, prediction: IntentPrediction, settings=None, deadline: Deadline | None = None
     ) -> schema.ChatResponse | None:
         if prediction.intent != "rag" or self._rag is None:
             return None
@@ -220,14 +738,17 @@ class ChatOrchestrator:
                 self._rag_cache[thr] = SimpleRagResponder(self._rag_entries, threshold=thr)
                 cached = self._rag_cache[thr]
             responder = cached
-        reply = await responder.search(request.message)
+        reply = await within(deadline, responder.search(request.message), None)
         if reply is None:
             return None
         return self._build_response(request, reply, "rag", settings=settings)
 
-    async def _fallback(self, request: schema.ChatRequest, settings=None, compose=None) -> schema.ChatResponse:
+    async def _fallback(
+        self, request: schema.ChatRequest, settings=None, compose=None, deadline: Deadline | None = None
+    ) -> schema.ChatResponse | LLMPlan:
         # 1) Preparar contexto vía RAG top‑k para generar con conocimiento (si existe)
         contexts: list[str] = []
+        context_uids: list[str] = []
         try:
             thr = float(getattr(settings, "rag_threshold", 0.28)) if settings is not None else 0.28
         except Exception:
@@ -238,11 +759,13 @@ class ChatOrchestrator:
             responder = self._rag_cache.get(default_thr) or SimpleRagResponder(self._rag_entries, threshold=default_thr)
         if responder is not None:
             try:
-                top = await responder.topk(request.message, k=3)  # type: ignore[attr-defined]
+                with stage("retrieval"):
+                    top = await within(deadline, responder.topk(request.message, k=3), [])  # type: ignore[attr-defined]
                 min_score = max(0.0, min(1.0, thr * 0.9))
                 for entry, score in top:
                     if score >= min_score:
                         contexts.append(entry.answer)
+                        context_uids.append(entry.uid)
             except Exception:
                 pass
 
@@ -251,56 +774,134 @@ class ChatOrchestrator:
         grounded_only = bool(getattr(settings, "grounded_only", False)) or grounded_only_env
 
         # 3) Construir prompt
-        if contexts:
-            prelude = (
-                "Usá exclusivamente el CONTEXTO provisto para responder. "
-                "Si la respuesta no está en el contexto, indicá que no hay información municipal disponible. "
-                "Respondé de forma breve y clara; usá viñetas si corresponde. "
-                "Devolvé solo la respuesta final, sin prefijos (como 'Respuesta:') ni comentarios de evaluación."
-            )
-            extra = [p.strip() for p in (getattr(settings, "pre_prompts", []) or []) if isinstance(p, str) and p.strip()] if settings is not None else []
-            ctx_blocks = [f"[{i}] {txt}" for i, txt in enumerate(contexts, start=1)]
-            context_text = "\n\n".join(ctx_blocks)
-            user_q = request.message.strip()
-            prompt = (
-                f"{prelude}\n" +
-                ("\n".join(f"- {p}" for p in extra) + "\n\n" if extra else "") +
-                f"CONTEXTO:\n{context_text}\n\n" +
-                f"PREGUNTA:\n{user_q}\n\n"
-            )
-        else:
-            if grounded_only:
-                text = (
-                    "Por ahora no tengo información precisa sobre esto en nuestros datos. "
-                    "Probá con otra frase o escribí 'ayuda' para ver opciones."
+        with stage("prompt"):
+            if contexts:
+                prelude = (
+                    "Usá exclusivamente el CONTEXTO provisto para responder. "
+                    "Si la respuesta no está en el contexto, indicá que no hay información municipal disponible. "
+                    "Respondé de forma breve y clara; usá viñetas si corresponde. "
+                    "Devolvé solo la respuesta final, sin prefijos (como 'Respuesta:') ni comentarios de evaluación."
                 )
-                return self._build_response(request, text, "fallback")
-            base = (compose(request.message) if callable(compose) else request.message)
-            prompt = (
-                "Devolvé solo la respuesta final, sin prefijos (como 'Respuesta:') ni comentarios de evaluación. "
-                "Respondé de forma breve y clara; usá viñetas si corresponde.\n\n"
-                f"PREGUNTA:\n{base}\n\n"
-            )
+                extra = [p.strip() for p in (getattr(settings, "pre_prompts", []) or []) if isinstance(p, str) and p.strip()] if settings is not None else []
+                # Prefijo estable por bot (preludio + pre_prompts): reutilizable en el KV cache
+                prefix = f"{prelude}\n" + ("\n".join(f"- {p}" for p in extra) + "\n\n" if extra else "")
+                # Ajuste a la ventana de contexto: reservar la salida y recortar contextos por score.
+                # Si el prefijo no deja lugar a la pregunta se degrada: sin pre_prompts y luego sin preludio.
+                budget = self._prompt_budget(settings)
+                prefixes = [prefix, f"{prelude}\n", ""]
+                prefix = prefixes[budget.pick_fixed([f"{p}CONTEXTO:\n\n\nPREGUNTA:\n\n\n" for p in prefixes])]
+                prefix_len = len(prefix)
+                user_q = budget.fit_question(f"{prefix}CONTEXTO:\n\n\nPREGUNTA:\n\n\n", request.message.strip())
+                fitted = budget.fit_contexts(f"{prefix}CONTEXTO:\n\n\nPREGUNTA:\n{user_q}\n\n", contexts)
+                context_uids = context_uids[: len(fitted)]
+                ctx_blocks = [f"[{i}] {txt}" for i, txt in enumerate(fitted, start=1)]
+                context_text = "\n\n".join(ctx_blocks)
+                # Conversación previa con el espacio sobrante (los contextos tienen prioridad)
+                history = budget.fit_history(
+                    f"{prefix}CONTEXTO:\n{context_text}\n\nPREGUNTA:\n{user_q}\n\n", self._history(request), _HISTORY_HEADER
+                )
+                prompt = (
+                    prefix +
+                    _history_block(history) +
+                    f"CONTEXTO:\n{context_text}\n\n" +
+                    f"PREGUNTA:\n{user_q}\n\n"
+                )
+            else:
+                if grounded_only:
+                    text = (
+                        "Por ahora no tengo información precisa sobre esto en nuestros datos. "
+                        "Probá con otra frase o escribí 'ayuda' para ver opciones."
+                    )
+                    return self._build_response(request, text, "fallback")
+                head = (
+                    "Devolvé solo la respuesta final, sin prefijos (como 'Respuesta:') ni comentarios de evaluación. "
+                    "Respondé de forma breve y clara; usá viñetas si corresponde.\n\n"
+                    "PREGUNTA:\n"
+                )
+                wrap = compose if callable(compose) else (lambda text: text)
+                budget = self._prompt_budget(settings)
+                # Sin lugar para la pregunta: primero sin instrucciones del bot, después sin encabezado
+                level = budget.pick_fixed([f"{head}{wrap('')}\n\n", f"{head}\n\n", "PREGUNTA:\n\n\n"])
+                if level:
+                    wrap = lambda text: text  # noqa: E731
+                if level == 2:
+                    head = "PREGUNTA:\n"
+                message = budget.fit_question(f"{head}{wrap('')}\n\n", request.message)
+                history = budget.fit_history(f"{head}{wrap(message)}\n\n", self._history(request), _HISTORY_HEADER)
+                text = _history_block(history) + message
+                base = wrap(text)
+                prompt = f"{head}{base}\n\n"
+                # compose antepone las instrucciones del bot: todo lo previo a la historia es estable
+                prefix_len = len(head) + max(0, len(base) - len(text))
+            tracing.set_attributes({"prompt.chars": len(prompt), "prompt.prefix_chars": prefix_len})
 
-        # 4) Invocar LLM con prompt elegido (con o sin contexto)
-        if settings is not None:
-            generated = await self._llm.generate(
-                prompt,
-                temperature=settings.generation.temperature,
-                top_p=settings.generation.top_p,
-                max_tokens=settings.generation.max_tokens,
-            )
+        # 4) Plan de invocación al LLM con el prompt elegido (con o sin contexto).
+        # Sanitización completa (metadatos + posibles fugas de pre_prompts) al construir la respuesta.
+        return LLMPlan(
+            prompt=prompt,
+            generation=_generation_kwargs(settings) if settings is not None else {},
+            settings=settings,
+            prefix_len=prefix_len,
+            context_uids=tuple(context_uids),
+            # Repregunta con conversación previa: la respuesta depende de la sesión, no se cachea
+            cacheable=not history,
+            contexts=tuple(contexts),
+        )
+
+    def reload_intents(self) -> None:
+        """Reconstruye el clasificador desde config/intents.json (patrones por defecto si no existe)."""
+        try:
+            patterns = load_patterns()
+        except (OSError, ValueError, KeyError, TypeError):
+            LOGGER.exception("config/intents.json inválido; se conserva el clasificador actual")
+            return
+        self._classifier = IntentClassifier(patterns=patterns)
+        self._intents_generation += 1
+
+    async def apply_change(self, topic: str) -> None:
+        """Recarga sólo el componente afectado por un cambio publicado por otro worker (change_bus)."""
+        if topic == "rag":
+            await self.reindex()
+            self._refresh_menus()
+        elif topic == "intents":
+            self.reload_intents()
+        elif topic.startswith("settings."):
+            # Los settings se leen de disco en cada consulta: sólo quedan viejos los chips precalculados
+            self._refresh_menus(topic.partition(".")[2])
         else:
-            generated = await self._llm.generate(prompt)
-        # Sanitización completa (metadatos + posibles fugas de pre_prompts) en _build_response
-        return self._build_response(request, generated, "llm", settings=settings)
+            LOGGER.debug("Cambio sin handler: %s", topic)
+
+    def _refresh_menus(self, bot_id: str | None = None) -> None:
+        if self._menu is None:
+            return
+        for pair in self._menu.pairs(bot_id):
+            self._schedule_prewarm(*pair)
 
     def attach_rag(self, rag_responder: RagResponderProtocol) -> None:
         """Permite inyectar un componente RAG conforme al protocolo."""
 
         self._rag = rag_responder
 
-    def _bootstrap_rag(self) -> None:
+    def _bootstrap_rag(self, progress: Callable[[float, str], None] | None = None) -> None:
+        """(Re)construye e instala el índice RAG en el hilo actual (arranque y pruebas)."""
+        self._install_rag(self._build_rag_index(progress))
+
+    async def reindex(self, progress: Callable[[float, str], None] | None = None) -> int:
+        """Construye el índice en un hilo y lo instala en el event loop; devuelve las entradas.
+
+        Sólo `_install_rag` toca el estado que leen las consultas (entradas, responders
+        por threshold, cache de respuestas), y lo hace en el loop en un solo paso.
+        """
+        entries, responder = await asyncio.to_thread(self._build_rag_index, progress)
+        self._install_rag((entries, responder))
+        return len(entries)
+
+    def _build_rag_index(
+        self, progress: Callable[[float, str], None] | None = None
+    ) -> tuple[list[KnowledgeEntry], RagResponderProtocol | None]:
+        """Carga la KB y arma el responder por defecto sin modificar el orquestador."""
+        report = progress or (lambda fraction, detail: None)
+        report(0.3, "cargando FAQs")
         try:
             entries = list(load_default_entries())
         except FileNotFoundError:
@@ -310,120 +911,29 @@ class ChatOrchestrator:
             root = Path(__file__).resolve().parents[2]
             extra_dir_env = os.getenv("WEBCHATBOT_TEXT_KB_DIR", "").strip()
             extra_dir = Path(extra_dir_env) if extra_dir_env else (root / "00relevamientos_j2" / "munivilladata")
+            report(0.5, "cargando textos")
             extra_entries = load_text_dir_entries(extra_dir)
             if extra_entries:
                 entries.extend(extra_entries)
         except Exception:
             pass
-        if entries:
-            # Guardar entradas para construir variantes por threshold
-            self._rag_entries = list(entries)
-            default_thr = 0.28
-            responder = SimpleRagResponder(self._rag_entries, threshold=default_thr)
-            self._rag_cache[default_thr] = responder
-            self.attach_rag(responder)
-
-
-from urllib.parse import urlparse
-
-def _sanitize_llm_output(
-    text: str,
-    allowed_domains: list[str] | None = None,
-    pre_prompts: list[str] | None = None,
-) -> str:
-    """Limpia metadatos no deseados de la salida del LLM.
-
-    - Elimina bloques de código (``` ... ```), cabeceras tipo "Respuesta:" y
-      comentarios evaluativos ("La respuesta es ...").
-    - Colapsa líneas en blanco y quita duplicados adyacentes.
-    """
-    if not isinstance(text, str):
-        return ""
-    s = text
+        if not entries:
+            return entries, None
+        report(0.7, "construyendo índice")
+        return entries, SimpleRagResponder(entries, threshold=_DEFAULT_RAG_THRESHOLD)
 
-    # Normalizar pre_prompts para poder filtrar líneas que el modelo pueda "repetir"
-    normalized_pre: set[str] = set()
-    if pre_prompts:
-        for p in pre_prompts:
-            if not isinstance(p, str):
-                continue
-            val = p.strip()
-            if val:
-                normalized_pre.add(val.lower())
-    # Quitar bloques de código ``` ... ``` (incluye etiquetas como ```python)
-    s = re.sub(r"```[\s\S]*?```", "", s)
-    # Quitar líneas de encabezado/meta
-    drop_patterns = (
-        r"^\s*respuesta\s*:.*$",
-        r"^\s*respuesta\s+final\s*:.*$",
-        r"^\s*resposta\s*:.*$",
-        r"^\s*resposta\s+final\s*:.*$",
-        r"^\s*answer\s*:.*$",
-        r"^\s*response\s*:.*$",
-        r"^\s*la\s+respuesta\s+es.*$",
-        r"^\s*explicaci[oó]n.*$",
-        r"^\s*evaluaci[oó]n.*$",
-        r"^\s*comentari[oa]s?\s*:.*$",
-        r"^\s*language\s*:.*$",
-        r"^\s*idioma\s*:.*$",
-        r"^\s*tags?\s*:.*$",
-        r"^\s*c[oó]digo\s*:.*$",
-        r"^\s*segu[ií]\s+estas\s+instrucciones\s+al\s+responder\s*:?.*$",
-        r"^\s*us[aá]\s+exclusivamente\s+el\s+contexto\s+provisto\s+para\s+responder.*$",
-        # Docstrings/comentarios de prueba que el modelo a veces inyecta
-        r"^\s*\"\"\".*$",
-        r"^\s*'''.*$",
-        r"^\s*tests?\s+the\s+response.*$",
-    )
-    lines: list[str] = []
-    for raw in s.splitlines():
-        l = raw.strip()
-        low = l.lower()
-        if any(re.match(p, low) for p in drop_patterns):
-            continue
-        if l.startswith("```"):
-            continue
-        # Heurística para líneas claramente de código no cercadas
-        if re.match(r"^(def\s+|class\s+|from\s+\S+\s+import\s+|import\s+\S+)", l):
-            continue
-        # Filtrar líneas que son exactamente una instrucción de pre_prompt (con o sin viñeta)
-        if normalized_pre:
-            candidate = low[2:].strip() if low.startswith("- ") else low
-            if candidate in normalized_pre:
-                continue
+    def _install_rag(self, index: tuple[list[KnowledgeEntry], RagResponderProtocol | None]) -> None:
+        entries, responder = index
+        if responder is not None:
+            # Entradas y responders por threshold se reemplazan juntos (dict nuevo, no se muta el vigente)
+            self._rag_entries = entries
+            self._rag_cache = {_DEFAULT_RAG_THRESHOLD: responder}
+            self.attach_rag(responder)
+        # Nueva generación del índice: las respuestas cacheadas del LLM quedan obsoletas
+        self._index_generation += 1
+        if self._answers is not None:
+            self._answers.set_generation(self._index_generation)
 
-        # Filtrar URLs fuera de dominios permitidos (si se configuró)
-        if allowed_domains:
-            def _filter_urls(segment: str) -> str:
-                # Reemplaza URLs no permitidas por texto vacío
-                def _repl(m):
-                    url = m.group(0)
-                    try:
-                        netloc = urlparse(url).netloc.lower()
-                        if any(netloc.endswith(d.lower()) for d in allowed_domains):
-                            return url
-                    except Exception:
-                        pass
-                    return ""
-                return re.sub(r"https?://[^\s)]+", _repl, segment)
-            l = _filter_urls(l)
-        lines.append(l)
-    # Quitar duplicados adyacentes y líneas vacías múltiples
-    cleaned: list[str] = []
-    prev = None
-    for l in lines:
-        if not l:
-            if cleaned and cleaned[-1] == "":
-                continue
-            cleaned.append("")
-            prev = ""
-            continue
-        if l == prev:
-            continue
-        cleaned.append(l)
-        prev = l
-    out = "\n".join(cleaned).strip()
-    return out
 
 # ================================================================
 # Guía de uso, parametrización e impacto (Orquestador)
@@ -442,6 +952,8 @@ def _sanitize_llm_output(
 # orch = ChatOrchestrator()
 # resp = await orch.respond(ChatRequest(session_id="s1", message="Horario de atención", channel="web", bot_id="municipal"))
 # # resp.reply, resp.source ("faq"|"rag"|"llm"|"fallback"), resp.escalated
+# async for item in orch.respond_stream(req):   # streaming: str (fragmentos) y ChatResponse al final
+#     ...
 #
 # Parametrización (ajustes que afectan el flujo)
 # ---------------------------------------------
@@ -460,12 +972,44 @@ def _sanitize_llm_output(
 # -------------------------
 # - Activar reglas y RAG reduce llamadas al LLM y mejora precisión en dominios cubiertos.
 # - pre_prompts condiciona estilo/rol/políticas del LLM cuando se invoca.
-# - Antes de devolver cualquier texto del LLM, se aplica `_sanitize_llm_output` para:
+# - Antes de devolver cualquier texto se aplica `_sanitize_llm_output`
+#   (services/orchestrator/sanitizer.py) para:
 #   * quitar encabezados/meta tipo "Respuesta:", "RESPOSTA:", "Answer:", etc.;
 #   * evitar que el modelo "rebote" las instrucciones cargadas en `pre_prompts`;
 #   * filtrar URLs que no pertenezcan a dominios permitidos (`allowed_domains`).
-# - No guarda estado de conversación (stateless). Si necesitás memoria, extender para
-#   recuperar últimos turnos y pasarlos al LLM.
+#   Las respuestas estáticas (reglas/RAG/textos fijos) se sanitizan en el primer uso y se
+#   memoizan por (perfil, texto) en un LRU acotado (`_static_replies`,
+#   WEBCHATBOT_STATIC_REPLY_CACHE=4096); sólo la salida del LLM se procesa por request.
+# - Las respuestas del fallback LLM se guardan en `AnswerCache`
+#   (services/orchestrator/answer_cache.py) por bot + pregunta normalizada + contexto
+#   recuperado + parámetros + modelo; reindexar la KB (`_bootstrap_rag`) las invalida.
+# - Mientras el modelo carga en segundo plano (LLMClient.warming_up), las consultas que
+#   irían al LLM reciben un aviso de "iniciando" con el mejor fragmento RAG si lo hay;
+#   reglas y RAG responden normalmente. Con servidor de inferencia (LLM_BACKEND=unix)
+#   la consulta se reenvía y el aviso se arma cuando el servidor responde ModelLoading.
+#   `readiness()` alimenta GET /readyz.
+# - Los prompts respetan LLM_CONTEXT_WINDOW (services/orchestrator/prompt_builder.py):
+#   se reserva max_tokens para la salida y los contextos RAG se recortan por score.
+# - SLO por bot (BotSettings.latency_slo_ms): se convierte en un deadline que acota
+#   clasificación, búsqueda RAG, espera en cola y generación. Al vencer se corta el
+#   LLM y se responde con el mejor fragmento RAG (o el texto parcial / un aviso);
+#   la respuesta lleva `degraded="deadline"` y no se guarda en el cache.
+# - Cada consulta mide sus etapas (settings, classify, rules, rag, retrieval, cache y
+#   las fases del LLM) con services/observability/metrics.py: se publican en
+#   GET /metrics y en el header Server-Timing de /chat/message y /chat/stream.
+# - Memoria de conversación: cada intercambio se registra en `SessionStore`
+#   (services/orchestrator/session_store.py; buffer circular, TTL, LRU global y spill
+#   SQLite opcional). Los últimos turnos entran en los prompts del fallback y de mar2
+#   con el espacio que sobra de la ventana; con historia el fallback no se cachea.
+#   WEBCHATBOT_SESSION_MEMORY=0 vuelve al comportamiento sin estado.
+# - Single-flight (services/orchestrator/single_flight.py): consultas idénticas en curso
+#   (bot, canal, mensaje normalizado, versión de settings, índice y sin historia distinta)
+#   esperan la respuesta del primero y la reciben con su propio session_id (etapa
+#   "coalesced" en Server-Timing). WEBCHATBOT_COALESCE=0 lo desactiva.
+# - Chips del menú: `prewarm_menu()` (al iniciar la API) pasa cada menu_suggestions por
+#   el pipeline y guarda las respuestas en MenuAnswerTable (menu_answers.py); un clic en
+#   un chip se responde por búsqueda exacta. Cambios de settings, reindexado o fin de la
+#   carga del LLM recalientan la tabla en segundo plano. WEBCHATBOT_PREWARM=0 lo desactiva.
 # - Concurrencia: una única instancia del orquestador se reutiliza; componentes son
 #   inmutables salvo el cliente LLM.
 #
@@ -0,0 +1,336 @@
+"""Memoria de conversación acotada por sesión (últimos turnos).
+
+Un dict `session_id → turnos` crece sin límite con tráfico público. El
+`SessionStore` acota la memoria en cuatro niveles:
+
+- por sesión, un buffer circular de los últimos `max_turns` turnos;
+- por sesión, un presupuesto de tokens: se descartan los turnos más viejos
+  (y se recorta un turno aislado demasiado largo) hasta entrar;
+- TTL de inactividad por sesión;
+- global, LRU por cantidad de sesiones y por bytes aproximados de texto.
+
+Opcionalmente las sesiones desalojadas por LRU se vuelcan a SQLite (tier de
+spill) y se recuperan si la conversación continúa; las vencidas por TTL se
+descartan también del archivo, y el spill tiene su propio tope LRU de
+sesiones (también sin TTL, el archivo y su índice no crecen sin límite).
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+import sys
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Iterable, Literal
+
+from services.orchestrator.answer_cache import normalize_question
+from services.orchestrator.prompt_builder import PromptBudget, estimate_tokens
+
+LOGGER = logging.getLogger(__name__)
+
+Role = Literal["user", "assistant"]
+# Sobrecosto aproximado por turno (objeto, deque, str) además del texto
+_TURN_OVERHEAD_BYTES = 120
+
+
+@dataclass(frozen=True)
+class Turn:
+    role: Role
+    text: str
+    tokens: int
+
+
+@dataclass
+class _Session:
+    turns: deque[Turn]
+    touched: float
+    tokens: int = 0
+    size: int = 0
+
+
+@dataclass
+class _Spill:
+    """Tier de desborde en SQLite: una fila por sesión con sus turnos en JSON."""
+
+    path: Path
+    conn: sqlite3.Connection = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions (session_id TEXT PRIMARY KEY, turns TEXT NOT NULL, touched REAL NOT NULL)"
+        )
+
+    def save(self, session_id: str, turns: Iterable[Turn], touched: float) -> None:
+        payload = json.dumps([[t.role, t.text, t.tokens] for t in turns], ensure_ascii=False)
+        self.conn.execute("INSERT OR REPLACE INTO sessions VALUES (?, ?, ?)", (session_id, payload, touched))
+
+    def pop(self, session_id: str) -> tuple[list[Turn], float] | None:
+        row = self.conn.execute("SELECT turns, touched FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        if row is None:
+            return None
+        self.conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+        return [Turn(role, text, int(tokens)) for role, text, tokens in json.loads(row[0])], float(row[1])
+
+    def delete(self, session_ids: Iterable[str]) -> None:
+        self.conn.executemany("DELETE FROM sessions WHERE session_id = ?", ((sid,) for sid in session_ids))
+
+    def purge(self, older_than: float) -> int:
+        return self.conn.execute("DELETE FROM sessions WHERE touched < ?", (older_than,)).rowcount
+
+    def count(self) -> int:
+        return int(self.conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0])
+
+    def index(self) -> OrderedDict[str, float]:
+        """session_id → touched de todo lo volcado, más viejas primero (se lee una vez al abrir)."""
+        rows = self.conn.execute("SELECT session_id, touched FROM sessions ORDER BY touched")
+        return OrderedDict((str(sid), float(touched)) for sid, touched in rows)
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+class SessionStore:
+    """Últimos turnos por sesión con TTL, LRU global y spill opcional a SQLite."""
+
+    def __init__(
+        self,
+        *,
+        max_turns: int | None = None,
+        max_tokens: int | None = None,
+        ttl_s: float | None = None,
+        max_sessions: int | None = None,
+        max_bytes: int | None = None,
+        spill_path: str | Path | None = None,
+        max_spilled: int | None = None,
+        count: Callable[[str], int] = estimate_tokens,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.max_turns = max(2, max_turns or int(os.getenv("WEBCHATBOT_SESSION_TURNS", "6") or 6))
+        self.max_tokens = max(16, max_tokens or int(os.getenv("WEBCHATBOT_SESSION_TOKENS", "384") or 384))
+        ttl = ttl_s if ttl_s is not None else float(os.getenv("WEBCHATBOT_SESSION_TTL_S", "1800") or 0)
+        self.ttl_s = ttl if ttl > 0 else None
+        self.max_sessions = max(1, max_sessions or int(os.getenv("WEBCHATBOT_SESSION_MAX", "10000") or 10000))
+        cap_mb = float(os.getenv("WEBCHATBOT_SESSION_MAX_MB", "32") or 32)
+        self.max_bytes = max(1024, max_bytes or int(cap_mb * 1024 * 1024))
+        self._count = count
+        self._clock = clock
+        self._sessions: OrderedDict[str, _Session] = OrderedDict()
+        self._bytes = 0
+        spill = spill_path if spill_path is not None else os.getenv("WEBCHATBOT_SESSION_SPILL", "").strip()
+        self._spill = _Spill(Path(spill)) if spill else None
+        # Índice en memoria de las sesiones volcadas: una sesión desconocida no consulta SQLite
+        self._spilled: OrderedDict[str, float] = self._spill.index() if self._spill is not None else OrderedDict()
+        spill_max = max_spilled or int(os.getenv("WEBCHATBOT_SESSION_SPILL_MAX", "") or 10 * self.max_sessions)
+        self.max_spilled = max(1, spill_max)
+        self._purge_every_s = max(60.0, (self.ttl_s or 0) / 4)
+        self._next_purge = self._clock() + self._purge_every_s
+        self._counters = {
+            "appended": 0,
+            "expired": 0,
+            "evicted": 0,
+            "spilled": 0,
+            "restored": 0,
+            "trimmed": 0,
+            "spill_dropped": 0,
+        }
+        self._trim_spill()
+
+    def append(self, session_id: str, role: Role, text: str) -> None:
+        """Agrega un turno a la sesión y aplica los límites por sesión y globales."""
+        text = (text or "").strip()
+        if not session_id or not text:
+            return
+        session = self._get(session_id, create=True)
+        assert session is not None
+        tokens = self._count(text)
+        if tokens > self.max_tokens:
+            # Un turno aislado más largo que todo el presupuesto: se conserva su comienzo
+            text = PromptBudget(count=self._count).truncate(text, self.max_tokens)
+            tokens = self._count(text)
+            self._counters["trimmed"] += 1
+        if len(session.turns) == self.max_turns:
+            self._drop_oldest(session)
+        turn = Turn(role, text, tokens)
+        session.turns.append(turn)
+        session.tokens += tokens
+        self._resize(session, _size(turn))
+        while session.tokens > self.max_tokens and len(session.turns) > 1:
+            self._drop_oldest(session)
+            self._counters["trimmed"] += 1
+        session.touched = self._clock()
+        self._counters["appended"] += 1
+        self._enforce_caps()
+
+    def record(self, session_id: str, message: str, reply: str) -> None:
+        """Registra un intercambio completo (mensaje del usuario + respuesta)."""
+        self.append(session_id, "user", message)
+        self.append(session_id, "assistant", reply)
+
+    def recent(self, session_id: str) -> list[Turn]:
+        """Turnos de la sesión en orden cronológico (vacío si no existe o venció)."""
+        session = self._get(session_id, create=False)
+        return list(session.turns) if session is not None else []
+
+    def forget(self, session_id: str) -> None:
+        session = self._sessions.pop(session_id, None)
+        if session is not None:
+            self._bytes -= session.size
+        if self._spilled.pop(session_id, None) is not None:
+            self._spill.pop(session_id)  # type: ignore[union-attr]
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "sessions": len(self._sessions),
+            "bytes": self._bytes,
+            "max_sessions": self.max_sessions,
+            "max_bytes": self.max_bytes,
+            "max_turns": self.max_turns,
+            "max_tokens": self.max_tokens,
+            "ttl_s": self.ttl_s,
+            "spilled_sessions": len(self._spilled) if self._spill is not None else None,
+            **self._counters,
+        }
+
+    def close(self) -> None:
+        if self._spill is not None:
+            self._spill.close()
+
+    def _get(self, session_id: str, *, create: bool) -> _Session | None:
+        now = self._clock()
+        session = self._sessions.get(session_id)
+        if session is not None and self._expired(session.touched, now):
+            self._sessions.pop(session_id)
+            self._bytes -= session.size
+            self._counters["expired"] += 1
+            session = None
+        if session is None and self._spilled.pop(session_id, None) is not None:
+            restored = self._spill.pop(session_id)  # type: ignore[union-attr]
+            if restored is not None and not self._expired(restored[1], now):
+                turns, touched = restored
+                session = _Session(deque(turns[-self.max_turns :], maxlen=self.max_turns), touched)
+                session.tokens = sum(t.tokens for t in session.turns)
+                session.size = sum(_size(t) for t in session.turns)
+                self._sessions[session_id] = session
+                self._bytes += session.size
+                self._counters["restored"] += 1
+        if session is None:
+            if not create:
+                return None
+            session = self._sessions[session_id] = _Session(deque(maxlen=self.max_turns), now)
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def _expired(self, touched: float, now: float) -> bool:
+        return self.ttl_s is not None and now - touched > self.ttl_s
+
+    def _drop_oldest(self, session: _Session) -> None:
+        old = session.turns.popleft()
+        session.tokens -= old.tokens
+        self._resize(session, -_size(old))
+
+    def _resize(self, session: _Session, delta: int) -> None:
+        session.size += delta
+        self._bytes += delta
+
+    def _enforce_caps(self) -> None:
+        now = self._clock()
+        # Las sesiones más viejas están al frente: se cortan las vencidas primero
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if not self._expired(session.touched, now):
+                break
+            self._sessions.popitem(last=False)
+            self._bytes -= session.size
+            self._counters["expired"] += 1
+        while len(self._sessions) > 1 and (len(self._sessions) > self.max_sessions or self._bytes > self.max_bytes):
+            session_id, session = self._sessions.popitem(last=False)
+            self._bytes -= session.size
+            self._counters["evicted"] += 1
+            if self._spill is not None:
+                self._spill.save(session_id, session.turns, session.touched)
+                self._spilled[session_id] = session.touched
+                self._spilled.move_to_end(session_id)
+                self._counters["spilled"] += 1
+        self._trim_spill()
+        # Purga periódica de vencidas en el spill (a lo sumo una vez por intervalo)
+        if self._spilled and self.ttl_s is not None and now >= self._next_purge:
+            self._next_purge = now + self._purge_every_s
+            cutoff = now - self.ttl_s
+            self._spill.purge(cutoff)  # type: ignore[union-attr]
+            self._spilled = OrderedDict((sid, touched) for sid, touched in self._spilled.items() if touched >= cutoff)
+
+    def _trim_spill(self) -> None:
+        """Tope LRU del spill: se borran del archivo las sesiones volcadas hace más tiempo."""
+        overflow = len(self._spilled) - self.max_spilled
+        if overflow <= 0:
+            return
+        dropped = [self._spilled.popitem(last=False)[0] for _ in range(overflow)]
+        self._spill.delete(dropped)  # type: ignore[union-attr]
+        self._counters["spill_dropped"] += overflow
+
+
+def _size(turn: Turn) -> int:
+    return sys.getsizeof(turn.text) + _TURN_OVERHEAD_BYTES
+
+
+# Repreguntas que sólo se entienden con la conversación previa ("¿y el costo?", "¿dónde queda eso?")
+_FOLLOW_UP_LEADS = frozenset({"y", "e", "pero", "entonces", "tambien", "ademas"})
+_FOLLOW_UP_WORDS = frozenset(
+    {"eso", "esos", "esa", "esas", "ese", "aquello", "ahi", "alli", "anterior", "mencionaste", "dijiste", "nombraste"}
+)
+
+
+def is_follow_up(message: str) -> bool:
+    """True si la pregunta parece depender de turnos previos (conector inicial o anáfora).
+
+    Las preguntas autocontenidas (chips, "ayuda", consultas completas) no llevan
+    historia: así siguen siendo cacheables y coalescibles entre sesiones.
+    """
+    words = normalize_question(message).split()
+    return bool(words) and (words[0] in _FOLLOW_UP_LEADS or not _FOLLOW_UP_WORDS.isdisjoint(words))
+
+
+def render_history(turns: Iterable[Turn]) -> list[str]:
+    """Líneas "Usuario: …" / "Asistente: …" para incluir en un prompt."""
+    labels = {"user": "Usuario", "assistant": "Asistente"}
+    return [f"{labels[t.role]}: {' '.join(t.text.split())}" for t in turns]
+
+# ================================================================
+# Guía de uso (Memoria de conversación)
+# ================================================================
+#
+# store = SessionStore()
+# store.record("s1", "¿Cómo saco la licencia?", "Con turno previo en ...")
+# lines = render_history(store.recent("s1"))   # → PromptBudget.fit_history(...)
+# is_follow_up("¿y cuánto cuesta eso?")         # True: la historia entra al prompt
+#
+# Parametrización (variables de entorno)
+# --------------------------------------
+# - WEBCHATBOT_SESSION_MEMORY (1): 0 deshabilita la memoria en el orquestador.
+# - WEBCHATBOT_SESSION_TURNS (6): turnos por sesión (3 intercambios).
+# - WEBCHATBOT_SESSION_TOKENS (384): tokens máximos guardados por sesión.
+# - WEBCHATBOT_SESSION_TTL_S (1800): inactividad antes de olvidar la sesión; 0 = sin vencimiento.
+# - WEBCHATBOT_SESSION_MAX (10000) / WEBCHATBOT_SESSION_MAX_MB (32): topes globales (LRU).
+# - WEBCHATBOT_SESSION_SPILL: archivo SQLite para sesiones desalojadas (default: sin spill).
+# - WEBCHATBOT_SESSION_SPILL_MAX (10 × SESSION_MAX): sesiones en el spill (LRU); acota el
+#   archivo y su índice en memoria también con WEBCHATBOT_SESSION_TTL_S=0.
+#
+# Consideraciones
+# ---------------
+# - La historia sólo entra al prompt en mar2/free y en repreguntas (`is_follow_up`): el
+#   resto de las consultas comparte cache de respuestas y coalescencia entre sesiones.
+# - Memoria por proceso: con varios workers una sesión puede caer en otro worker. El spill
+#   es por worker (usar un archivo por proceso): cada uno indexa en memoria sólo lo que volcó
+#   él (más lo que había al abrir el archivo).
+# - Una sesión desconocida se resuelve con el índice en memoria, sin tocar SQLite; el
+#   spill sólo se lee al retomar una sesión volcada y se escribe al desalojar por LRU.
+# - Las vencidas se purgan del archivo a lo sumo cada max(60 s, TTL/4).
+# - Estadísticas en GET /chat/admin/sessions.
@@ -0,0 +1,87 @@
+"""Coalescencia de consultas idénticas concurrentes (single-flight).
+
+Cuando muchas personas tocan el mismo chip del menú a la vez (campañas de
+dengue, renovación de licencias), cada consulta repetiría la recuperación y
+una generación completa del LLM. `SingleFlight` registra la primera consulta
+de cada clave como "líder"; las duplicadas que llegan mientras está en curso
+esperan el mismo futuro en lugar de recalcular.
+
+- Errores del líder (p. ej. `SchedulerRejected`) se propagan a quienes esperan.
+- Si el líder se cancela o su stream se corta, quienes esperan reciben
+  `LeaderAborted` y calculan su propia respuesta.
+- Sólo se coalescen consultas en curso: no es un cache (ver answer_cache.py).
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Hashable
+
+
+class LeaderAborted(Exception):
+    """El cálculo compartido no terminó (cancelación o stream cortado)."""
+
+
+class SingleFlight:
+    """Tabla de cálculos en curso por clave."""
+
+    def __init__(self) -> None:
+        self._inflight: dict[Hashable, asyncio.Future[Any]] = {}
+        self._counters = {"leaders": 0, "coalesced": 0, "aborted": 0}
+
+    def join(self, key: Hashable) -> asyncio.Future[Any] | None:
+        """Futuro del cálculo en curso para `key` (None si no hay)."""
+        future = self._inflight.get(key)
+        if future is not None:
+            self._counters["coalesced"] += 1
+        return future
+
+    def lead(self, key: Hashable) -> asyncio.Future[Any]:
+        """Registra un cálculo nuevo para `key`; cerrar con `finish`."""
+        future: asyncio.Future[Any] = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        self._counters["leaders"] += 1
+        return future
+
+    def finish(self, key: Hashable, future: asyncio.Future[Any], result: Any = None, error: BaseException | None = None) -> None:
+        """Publica el resultado (o error) del líder y libera la clave."""
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        if future.done():
+            return
+        if error is None:
+            future.set_result(result)
+            return
+        if isinstance(error, Exception) and not isinstance(error, asyncio.CancelledError):
+            future.set_exception(error)
+        else:
+            self._counters["aborted"] += 1
+            future.set_exception(LeaderAborted())
+        # Marcar la excepción como leída: sin duplicados en espera no debe loguearse
+        future.exception()
+
+    def stats(self) -> dict[str, Any]:
+        return {"inflight": len(self._inflight), **self._counters}
+
+# ================================================================
+# Guía de uso (Single-flight)
+# ================================================================
+#
+# flight = flights.join(key)
+# if flight is not None:
+#     try:
+#         return copy_for_me(await asyncio.shield(flight))
+#     except LeaderAborted:
+#         pass                                  # calcular por cuenta propia
+# future = flights.lead(key)
+# try:
+#     result = await compute()
+# except BaseException as exc:
+#     flights.finish(key, future, error=exc); raise
+# flights.finish(key, future, result)
+#
+# Consideraciones
+# ---------------
+# - Por proceso y por event loop: con varios workers cada uno coalesce lo suyo.
+# - La clave debe incluir todo lo que cambia la respuesta (en el orquestador: bot,
+#   canal, mensaje normalizado, versión de settings, generación del índice e historia).
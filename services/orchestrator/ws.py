@@ -0,0 +1,219 @@
+"""Transporte WebSocket para chat: varias sesiones multiplexadas en una conexión.
+
+Protocolo (frames de texto JSON)
+--------------------------------
+Cliente → servidor
+- {"type": "message", "id": str, "session_id": str, "message": str,
+   "channel": str = "web", "bot_id": str | null, "stream": bool = true}
+- {"type": "cancel", "id": str}          cancela una respuesta en curso
+- {"type": "ping"} / {"type": "pong"}    latido (el servidor responde "pong")
+
+Servidor → cliente
+- {"type": "delta", "id", "session_id", "text"}   fragmento del LLM (si stream=true)
+- {"type": "done", "id", ...ChatResponse}         respuesta final (siempre)
+- {"type": "cancelled", "id"}                     confirmación de cancelación
+- {"type": "error", "id" | null, "detail"}        frame inválido, id duplicado o saturación
+                                                  (LLM o servidor saturado: "status": 503;
+                                                  rate limit: "status": 429 + "retry_after")
+- {"type": "ping"}                                latido del servidor
+
+`id` correlaciona request/respuestas; varias respuestas pueden estar en curso
+a la vez y sus frames se intercalan.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import math
+import os
+from typing import Any
+
+from fastapi import WebSocket, WebSocketDisconnect
+from pydantic import ValidationError
+
+from services.llm_adapter.scheduler import SchedulerRejected
+from services.orchestrator import schema
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, "") or default)
+    except ValueError:
+        return default
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, "") or default)
+    except ValueError:
+        return default
+
+
+class ChatSocketSession:
+    """Atiende una conexión WebSocket usando `ChatOrchestrator.respond_stream`.
+
+    - Multiplexado: cada frame "message" corre en su propia tarea, hasta
+      `max_inflight` en simultáneo por conexión (el resto recibe "error").
+    - Rate limiting: con `limiter` (el `RateLimiter` de la API) cada frame
+      "message" consume de los buckets por sesión/IP y cuenta contra el tope
+      global de solicitudes en curso, igual que POST /chat/message.
+    - Backpressure: los frames salientes pasan por una cola acotada
+      (`send_queue`); si el cliente lee lento, los productores esperan y la
+      generación se frena en lugar de acumular memoria.
+    - Latido: el servidor envía "ping" cada `heartbeat_s` y cierra la conexión
+      si no recibe ningún frame durante `idle_timeout_s`.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        orchestrator: Any,
+        *,
+        heartbeat_s: float | None = None,
+        idle_timeout_s: float | None = None,
+        max_inflight: int | None = None,
+        send_queue: int | None = None,
+        limiter: Any = None,
+    ) -> None:
+        self._ws = websocket
+        self._orchestrator = orchestrator
+        self._limiter = limiter
+        self._heartbeat_s = heartbeat_s or _env_float("WEBCHATBOT_WS_HEARTBEAT_S", 20.0)
+        self._idle_timeout_s = idle_timeout_s or _env_float("WEBCHATBOT_WS_IDLE_TIMEOUT_S", 3 * self._heartbeat_s)
+        self._max_inflight = max_inflight or _env_int("WEBCHATBOT_WS_MAX_INFLIGHT", 8)
+        self._outbox: asyncio.Queue[dict[str, Any]] = asyncio.Queue(maxsize=send_queue or _env_int("WEBCHATBOT_WS_SEND_QUEUE", 64))
+        self._tasks: dict[str, asyncio.Task[None]] = {}
+        self._closing = False
+
+    async def run(self) -> None:
+        await self._ws.accept()
+        sender = asyncio.create_task(self._sender())
+        heartbeat = asyncio.create_task(self._heartbeat())
+        try:
+            while True:
+                try:
+                    raw = await asyncio.wait_for(self._ws.receive_text(), timeout=self._idle_timeout_s)
+                except asyncio.TimeoutError:
+                    await self._ws.close(code=1001)
+                    break
+                await self._handle(raw)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            self._closing = True
+            for task in list(self._tasks.values()):
+                task.cancel()
+            for task in (sender, heartbeat):
+                task.cancel()
+            await asyncio.gather(sender, heartbeat, *self._tasks.values(), return_exceptions=True)
+
+    async def _handle(self, raw: str) -> None:
+        try:
+            frame = json.loads(raw)
+            if not isinstance(frame, dict):
+                raise ValueError("frame no es un objeto")
+        except ValueError:
+            await self._send({"type": "error", "id": None, "detail": "JSON inválido"})
+            return
+        kind = frame.get("type")
+        if kind == "ping":
+            await self._send({"type": "pong"})
+        elif kind == "pong":
+            return
+        elif kind == "cancel":
+            task = self._tasks.get(str(frame.get("id")))
+            if task is not None:
+                task.cancel()
+        elif kind == "message":
+            await self._start(frame)
+        else:
+            await self._send({"type": "error", "id": frame.get("id"), "detail": f"Tipo desconocido: {kind!r}"})
+
+    async def _start(self, frame: dict[str, Any]) -> None:
+        try:
+            request = schema.ChatRequest.model_validate(frame)
+        except ValidationError as exc:
+            await self._send({"type": "error", "id": frame.get("id"), "detail": exc.errors(include_url=False, include_context=False)})
+            return
+        req_id = str(frame.get("id") or request.session_id)
+        if req_id in self._tasks:
+            await self._send({"type": "error", "id": req_id, "detail": "id en curso"})
+            return
+        if len(self._tasks) >= self._max_inflight:
+            await self._send({"type": "error", "id": req_id, "detail": "Demasiadas solicitudes en curso"})
+            return
+        if self._limiter is not None:
+            rejected = self._limiter.acquire(
+                ip=self._limiter.client_ip(self._ws.scope),
+                session_id=request.session_id,
+                bot_id=request.bot_id or "",
+                channel=request.channel or "web",
+            )
+            if rejected is not None:
+                status, detail, wait = rejected
+                await self._send({"type": "error", "id": req_id, "detail": detail, "status": status, "retry_after": max(1, math.ceil(wait))})
+                return
+        stream = bool(frame.get("stream", True))
+        self._tasks[req_id] = asyncio.create_task(self._serve(req_id, request, stream))
+
+    async def _serve(self, req_id: str, request: schema.ChatRequest, stream: bool) -> None:
+        try:
+            async for item in self._orchestrator.respond_stream(request):
+                if isinstance(item, schema.ChatResponse):
+                    await self._send({"type": "done", "id": req_id, **item.model_dump()})
+                elif stream:
+                    await self._send({"type": "delta", "id": req_id, "session_id": request.session_id, "text": item})
+        except asyncio.CancelledError:
+            if not self._closing:
+                with contextlib.suppress(asyncio.QueueFull):
+                    self._outbox.put_nowait({"type": "cancelled", "id": req_id})
+            raise
+        except SchedulerRejected as exc:
+            await self._send({"type": "error", "id": req_id, "detail": str(exc), "status": 503})
+        except Exception as exc:  # pragma: no cover - errores inesperados del pipeline
+            await self._send({"type": "error", "id": req_id, "detail": str(exc)})
+        finally:
+            self._tasks.pop(req_id, None)
+            if self._limiter is not None:
+                self._limiter.release()
+
+    async def _send(self, frame: dict[str, Any]) -> None:
+        await self._outbox.put(frame)
+
+    async def _sender(self) -> None:
+        while True:
+            frame = await self._outbox.get()
+            await self._ws.send_text(json.dumps(frame, ensure_ascii=False))
+
+    async def _heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(self._heartbeat_s)
+            await self._send({"type": "ping"})
+
+# ================================================================
+# Guía de uso (WebSocket /chat/ws)
+# ================================================================
+#
+# Ejemplo (websocat)
+# ------------------
+# websocat ws://127.0.0.1:8000/chat/ws
+# {"type":"message","id":"a1","session_id":"kiosco-1","message":"Horario de atención"}
+# {"type":"message","id":"a2","session_id":"kiosco-2","message":"contame algo","channel":"mar2"}
+# {"type":"cancel","id":"a2"}
+#
+# Parametrización (variables de entorno)
+# --------------------------------------
+# - WEBCHATBOT_WS_HEARTBEAT_S (20): intervalo de "ping" del servidor.
+# - WEBCHATBOT_WS_IDLE_TIMEOUT_S (3×heartbeat): cierre si el cliente no envía frames.
+# - WEBCHATBOT_WS_MAX_INFLIGHT (8): respuestas simultáneas por conexión.
+# - WEBCHATBOT_WS_SEND_QUEUE (64): frames salientes en cola antes de aplicar backpressure.
+#
+# Consideraciones
+# ---------------
+# - Rate limiting: cada frame "message" pasa por los mismos buckets por sesión/IP y el
+#   mismo tope global que POST /chat/message (services/api/rate_limit.py).
+# - Usa el mismo pipeline que /chat/message y /chat/stream (ChatOrchestrator).
+# - Pensado para puentes (WhatsApp) y kioscos que envían muchos mensajes por
+#   una única conexión; evita handshake/CORS por mensaje.
@@ -0,0 +1,78 @@
+"""Pruebas del cache de respuestas del LLM."""
+
+import pytest
+
+from services.orchestrator import answer_cache
+from services.orchestrator.answer_cache import AnswerCache, normalize_question
+from services.orchestrator.schema import ChatRequest
+from services.orchestrator.service import ChatOrchestrator
+
+
+def test_exact_near_duplicate_ttl_and_lru() -> None:
+    cache = AnswerCache(max_entries=2, ttl_s=0, near_threshold=0.6)
+    group = AnswerCache.group_key("municipal", ["faq-1"], {"temperature": 0.2}, "m")
+
+    cache.put(group, "¿Cómo saco la licencia de conducir?", "Turno online.")
+    assert normalize_question("¿Cómo  saco la LICENCIA de conducir?") == "como saco la licencia de conducir"
+    assert cache.get(group, "como saco la licencia de conducir") == "Turno online."
+    assert cache.get(group, "cómo saco la licencia de conducir hoy") == "Turno online."
+    assert cache.get(AnswerCache.group_key("municipal", ["faq-2"], {"temperature": 0.2}, "m"), "como saco la licencia de conducir") is None
+
+    cache.put(group, "horario", "8 a 14")
+    cache.put(group, "tasas", "Online")
+    assert cache.stats()["evictions"] == 1
+
+    cache.set_generation(7)
+    assert cache.stats()["entries"] == 0
+
+
+def test_entries_expire_after_ttl(monkeypatch) -> None:
+    now = [1000.0]
+    monkeypatch.setattr(answer_cache.time, "monotonic", lambda: now[0])
+    cache = AnswerCache(max_entries=8, ttl_s=60, near_threshold=0.6)
+    group = AnswerCache.group_key("municipal", [], {}, "m")
+    cache.put(group, "¿Cómo saco la licencia de conducir?", "Turno online.")
+
+    now[0] += 59
+    assert cache.get(group, "como saco la licencia de conducir") == "Turno online."
+    now[0] += 2
+    assert cache.get(group, "como saco la licencia de conducir") is None
+    assert cache.get(group, "cómo saco la licencia de conducir hoy") is None
+    assert cache.stats()["entries"] == 0
+
+
+class _CountingLLM:
+    model_id = "fake"
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def generate(self, prompt: str, **kwargs) -> str:
+        self.calls += 1
+        return "Podés tramitarla en el municipio."
+
+    async def generate_stream(self, prompt: str, **kwargs):
+        self.calls += 1
+        yield "Podés tramitarla en el municipio."
+
+
+@pytest.mark.asyncio
+async def test_fallback_answer_is_reused_until_reindex(monkeypatch) -> None:
+    monkeypatch.setenv("WEBCHATBOT_ANSWER_CACHE_NEAR", "0")
+    orchestrator = ChatOrchestrator()
+    llm = _CountingLLM()
+    orchestrator._llm = llm  # type: ignore[assignment]
+    request = ChatRequest(session_id="a", message="¿Cuál es la capital de Marte?", channel="web")
+
+    first = await orchestrator.respond(request)
+    assert first.source == "llm"
+    second = await orchestrator.respond(request.model_copy(update={"session_id": "b"}))
+    streamed = [item async for item in orchestrator.respond_stream(request)]
+
+    assert llm.calls == 1
+    assert second.reply == first.reply and second.session_id == "b"
+    assert streamed[-1].reply == first.reply
+
+    orchestrator._bootstrap_rag()
+    await orchestrator.respond(request)
+    assert llm.calls == 2
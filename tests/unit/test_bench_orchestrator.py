@@ -0,0 +1,34 @@
+"""Pruebas del harness de benchmark del orquestador (scripts/bench_orchestrator.py)."""
+
+import importlib.util
+from pathlib import Path
+
+_SPEC = importlib.util.spec_from_file_location(
+    "bench_orchestrator", Path(__file__).resolve().parents[2] / "scripts" / "bench_orchestrator.py"
+)
+bench = importlib.util.module_from_spec(_SPEC)
+_SPEC.loader.exec_module(bench)  # type: ignore[union-attr]
+
+
+def test_small_run_reports_paths_and_passes_its_own_baseline(tmp_path) -> None:
+    baseline = tmp_path / "base.json"
+
+    assert bench.main(["--rounds", "1", "--warmup", "0", "--kb-size", "0", "300", "--save-baseline", str(baseline)]) == 0
+    assert bench.main(["--rounds", "1", "--warmup", "0", "--kb-size", "300", "--check", str(baseline), "--tolerance", "10"]) == 0
+
+
+def test_regression_check_flags_slower_paths_and_memory() -> None:
+    baseline = {"paths": {"rag": {"p95_ms": 2.0}}, "rss_mb": 100.0}
+    result = {"paths": {"rag": {"p95_ms": 5.0}, "llm": {"p95_ms": 9.0}}, "rss_mb": 200.0}
+
+    failures = bench.check_regression(result, baseline, tolerance=0.25, slack_ms=0.5)
+
+    assert len(failures) == 2
+    assert failures[0].startswith("rag:")
+
+
+def test_synthetic_entries_use_the_given_vocabulary() -> None:
+    entries = bench.synthetic_entries(50, ["tasa", "turno", "licencia"], seed=1)
+
+    assert len({e.uid for e in entries}) == 50
+    assert set(entries[0].question.split()) <= {"tasa", "turno", "licencia"}
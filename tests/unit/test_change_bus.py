@@ -0,0 +1,51 @@
+"""Pruebas de la propagación de cambios entre workers."""
+
+import asyncio
+
+import pytest
+
+from services.orchestrator import intent_classifier
+from services.orchestrator.change_bus import ChangeBus
+from services.orchestrator.service import ChatOrchestrator
+
+
+def test_workers_see_each_others_changes_but_not_their_own(tmp_path) -> None:
+    old = ChangeBus(tmp_path)
+    assert old.publish("rag")
+
+    # Un worker que arranca después toma lo publicado como línea base
+    worker_a, worker_b = ChangeBus(tmp_path), ChangeBus(tmp_path)
+    assert worker_a.poll() == [] and worker_b.poll() == []
+
+    worker_a.publish("intents")
+    worker_a.publish("settings.municipal")
+    assert worker_a.poll() == []
+    assert sorted(worker_b.poll()) == ["intents", "settings.municipal"]
+    assert worker_b.poll() == []
+
+    disabled = ChangeBus("0")
+    assert disabled.publish("rag") is None and not disabled.enabled
+
+
+@pytest.mark.asyncio
+async def test_watch_reloads_only_the_affected_component(tmp_path, monkeypatch) -> None:
+    intents = tmp_path / "intents.json"
+    monkeypatch.setattr(intent_classifier, "intents_path", lambda: intents)
+    orchestrator = ChatOrchestrator()
+    generation = orchestrator._index_generation
+    publisher, listener = ChangeBus(tmp_path / "bus"), ChangeBus(tmp_path / "bus", interval_s=0.05)
+
+    watcher = asyncio.create_task(listener.watch(orchestrator.apply_change))
+    intents.write_text('{"patterns": [{"intent": "handoff", "keywords": ["humano"]} /* nuevo */]}', encoding="utf-8")
+    publisher.publish("intents")
+    for _ in range(100):
+        if listener.stats()["received"]:
+            break
+        await asyncio.sleep(0.02)
+    watcher.cancel()
+
+    assert (await orchestrator._classifier.classify("quiero un humano")).intent == "handoff"
+    assert orchestrator._index_generation == generation
+
+    await orchestrator.apply_change("rag")
+    assert orchestrator._index_generation == generation + 1
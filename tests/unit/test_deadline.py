@@ -0,0 +1,90 @@
+"""Pruebas del deadline por consulta (SLO de latencia del bot)."""
+
+import asyncio
+
+import pytest
+
+from services.chatbots.models import defaults_for
+from services.orchestrator import service as service_module
+from services.orchestrator.schema import ChatRequest, ChatResponse
+from services.orchestrator.service import ChatOrchestrator, LLMPlan
+from services.orchestrator.deadline import Deadline
+
+
+class _SlowStreamingLLM:
+    """Genera un fragmento cada 50 ms sin terminar nunca; registra si se cortó el stream."""
+
+    def __init__(self) -> None:
+        self.closed = False
+        self.kwargs: dict = {}
+
+    async def generate(self, prompt: str, **kwargs) -> str:  # pragma: no cover - con deadline se usa el stream
+        raise AssertionError("con deadline se debe iterar en streaming")
+
+    async def generate_stream(self, prompt: str, **kwargs):
+        self.kwargs = kwargs
+        try:
+            while True:
+                await asyncio.sleep(0.05)
+                yield "hola "
+        finally:
+            self.closed = True
+
+
+def _orchestrator_with_slo(monkeypatch, slo_ms: int) -> tuple[ChatOrchestrator, _SlowStreamingLLM]:
+    settings = defaults_for("mar2", channel="mar2").model_copy(update={"latency_slo_ms": slo_ms})
+    monkeypatch.setattr(service_module, "load_settings", lambda bot_id, channel=None: settings)
+    orchestrator = ChatOrchestrator()
+    llm = _SlowStreamingLLM()
+    orchestrator._llm = llm  # type: ignore[assignment]
+    return orchestrator, llm
+
+
+@pytest.mark.asyncio
+async def test_generation_is_cut_at_the_bot_slo(monkeypatch) -> None:
+    orchestrator, llm = _orchestrator_with_slo(monkeypatch, 400)
+
+    response = await orchestrator.respond(ChatRequest(session_id="d", message="contame algo", channel="mar2"))
+
+    assert llm.closed
+    assert 0 < llm.kwargs["deadline_s"] <= 0.4
+    assert response.degraded == "deadline"
+    assert response.source == "llm"
+    assert response.reply.startswith("hola") and response.reply.endswith("…")
+
+
+@pytest.mark.asyncio
+async def test_stream_ends_with_degraded_response(monkeypatch) -> None:
+    orchestrator, llm = _orchestrator_with_slo(monkeypatch, 400)
+
+    items = [item async for item in orchestrator.respond_stream(ChatRequest(session_id="d", message="hola", channel="mar2"))]
+
+    final = items[-1]
+    assert isinstance(final, ChatResponse) and final.degraded == "deadline"
+    assert final.reply.endswith("…")
+    assert "".join(i for i in items[:-1] if isinstance(i, str)) == final.reply
+    assert llm.closed
+
+
+@pytest.mark.asyncio
+async def test_expired_deadline_answers_with_best_rag_snippet() -> None:
+    orchestrator = ChatOrchestrator()
+    orchestrator._llm = _SlowStreamingLLM()  # type: ignore[assignment]
+    plan = LLMPlan(
+        prompt="p",
+        contexts=("La oficina atiende de 8 a 14.", "Otro fragmento."),
+        deadline=Deadline(budget_s=0.0),
+    )
+
+    generated, expired = await orchestrator._generate(plan)
+    response = orchestrator._deadline_response(ChatRequest(session_id="d", message="horario"), plan, generated)
+
+    assert expired and generated == ""
+    assert response.source == "rag"
+    assert response.reply == "La oficina atiende de 8 a 14."
+    assert response.degraded == "deadline"
+
+
+def test_no_slo_means_no_deadline() -> None:
+    assert Deadline.from_slo_ms(0) is None
+    assert Deadline.from_slo_ms(500).remaining() <= 0.5
@@ -0,0 +1,101 @@
+"""Pruebas del despliegue dividido (servidor de inferencia por socket UNIX)."""
+
+import asyncio
+
+import pytest
+
+from services.llm_adapter.client import LLMClient
+from services.llm_adapter.inference_server import InferenceServer
+from services.llm_adapter.scheduler import SchedulerBusy, SchedulerRejected
+from services.llm_adapter.settings import LLMSettings
+from services.orchestrator.schema import ChatRequest
+from services.orchestrator.service import ChatOrchestrator
+
+
+class _FakeLocalLLM:
+    state = "ready"
+    model_id = "fake-gguf"
+    warming_up = False
+
+    async def generate(self, prompt: str, **kwargs) -> str:
+        if prompt == "busy":
+            raise SchedulerBusy("cola llena")
+        return f"{prompt}|{kwargs.get('bot_id')}"
+
+    async def generate_stream(self, prompt: str, **kwargs):
+        for word in prompt.split():
+            await asyncio.sleep(0)
+            yield word + " "
+
+
+@pytest.mark.asyncio
+async def test_api_client_talks_to_inference_server(tmp_path) -> None:
+    socket_path = tmp_path / "llm.sock"
+    server = InferenceServer(_FakeLocalLLM(), socket_path)
+    await server.start()
+    client = LLMClient(settings=LLMSettings(LLM_BACKEND="unix", LLM_SOCKET_PATH=str(socket_path)))
+    try:
+        texts = await asyncio.gather(*(client.generate(f"hola{i}", bot_id="municipal") for i in range(5)))
+        chunks = [c async for c in client.generate_stream("uno dos tres")]
+        with pytest.raises(SchedulerRejected):
+            await client.generate("busy")
+    finally:
+        await client._remote.aclose()
+        await server.aclose()
+
+    assert texts == [f"hola{i}|municipal" for i in range(5)]
+    assert "".join(chunks) == "uno dos tres "
+    assert client.model_id == "fake-gguf"
+    assert client.readiness()["ready"] is True
+
+
+@pytest.mark.asyncio
+async def test_unreachable_server_falls_back_to_placeholder(tmp_path) -> None:
+    client = LLMClient(settings=LLMSettings(LLM_BACKEND="unix", LLM_SOCKET_PATH=str(tmp_path / "nada.sock")))
+
+    text = await client.generate("hola")
+    await client._remote.aclose()
+
+    assert text.startswith("[LLM placeholder]")
+    assert client.readiness() == {"ready": False, "state": "unreachable", "backend": "unix", "socket": str(tmp_path / "nada.sock")}
+
+
+class _LoadingLocalLLM(_FakeLocalLLM):
+    state = "loading"
+
+    @property
+    def warming_up(self) -> bool:
+        return self.state == "loading"
+
+
+@pytest.mark.asyncio
+async def test_client_recovers_when_server_finishes_loading(tmp_path) -> None:
+    socket_path = tmp_path / "llm.sock"
+    local = _LoadingLocalLLM()
+    server = InferenceServer(local, socket_path)
+    await server.start()
+    client = LLMClient(
+        settings=LLMSettings(LLM_BACKEND="unix", LLM_SOCKET_PATH=str(socket_path), LLM_HEALTH_POLL_S=0.05)
+    )
+    orchestrator = ChatOrchestrator()
+    orchestrator._llm = client  # type: ignore[assignment]
+    request = ChatRequest(session_id="r", message="¿Cuál es la capital de Marte?")
+    try:
+        warming = await orchestrator.respond(request)
+        assert "iniciando" in warming.reply
+        assert client.readiness()["ready"] is False
+
+        # Sin tráfico: el sondeo de health devuelve /readyz a "listo"
+        local.state = "ready"
+        for _ in range(100):
+            if client.readiness()["ready"]:
+                break
+            await asyncio.sleep(0.02)
+        assert client.readiness()["state"] == "ready"
+
+        answered = await orchestrator.respond(request.model_copy(update={"session_id": "r2"}))
+    finally:
+        await client._remote.aclose()
+        await server.aclose()
+
+    assert answered.source == "llm" and "iniciando" not in answered.reply
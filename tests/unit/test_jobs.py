@@ -0,0 +1,60 @@
+"""Pruebas de la cola de trabajos de administración."""
+
+import asyncio
+import threading
+
+import httpx
+import pytest
+
+from services.orchestrator import change_bus
+from services.orchestrator.change_bus import ChangeBus
+from services.orchestrator.jobs import JobQueue
+
+
+def test_queued_jobs_with_same_key_are_merged() -> None:
+    jobs = JobQueue()
+    release = threading.Event()
+    blocker = jobs.submit("lento", lambda job: release.wait(5), key="otro")
+
+    first = jobs.submit("rag_faqs", lambda job: "v1", key="rag")
+    latest = jobs.submit("rag_faqs", lambda job: "v2", key="rag")
+    reindex = jobs.submit("rag_reindex", lambda job: "reindex", key="rag", replace=False)
+    failing = jobs.submit("intents", lambda job: 1 / 0, key="intents")
+    assert first is latest is reindex and first.merged == 2
+
+    release.set()
+    assert jobs.wait(blocker.id, 5).status == "done"
+    assert jobs.wait(first.id, 5).to_dict()["result"] == "v2"
+    assert jobs.wait(failing.id, 5).status == "failed" and failing.error
+
+    # Ya terminado: una nueva solicitud crea otro trabajo
+    assert jobs.submit("rag_reindex", lambda job: None, key="rag").id != first.id
+    assert jobs.stats()["merged"] == 2
+
+
+@pytest.mark.asyncio
+async def test_reindex_endpoint_returns_job_with_progress(tmp_path, monkeypatch) -> None:
+    from services.api.main import create_app
+
+    # El reindexado publica "rag": a un directorio propio, no al .run/changes del repo
+    bus = ChangeBus(tmp_path / "changes")
+    monkeypatch.setattr(change_bus, "_bus", bus)
+
+    transport = httpx.ASGITransport(app=create_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        queued = await client.post("/chat/admin/rag/reindex")
+        assert queued.status_code == 202
+        job_id = queued.json()["job_id"]
+
+        # El trabajo instala el índice en este loop: esperar sin bloquearlo
+        for _ in range(500):
+            status = (await client.get(f"/chat/admin/jobs/{job_id}")).json()
+            if status["status"] in ("done", "failed"):
+                break
+            await asyncio.sleep(0.02)
+        missing = await client.get("/chat/admin/jobs/nope")
+
+    assert status["status"] == "done" and status["progress"] == 1.0
+    assert status["result"]["json_count"] > 0
+    assert missing.status_code == 404
+    assert bus.stats()["published"] == 1
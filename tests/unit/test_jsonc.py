@@ -0,0 +1,33 @@
+"""Pruebas del cargador JSONC compartido."""
+
+import pytest
+
+from services.orchestrator import jsonc
+
+
+def test_comments_are_removed_outside_strings_only() -> None:
+    text = '/* cabecera */\n{"url": "https://a.gob/*x*/", "q": "dijo \\"//hola\\"", // nota\n "n": 1 / 1}'
+    assert jsonc.strip_comments(text) == '\n{"url": "https://a.gob/*x*/", "q": "dijo \\"//hola\\"", \n "n": 1 / 1}'
+    assert jsonc.strip_comments(text.encode()) == jsonc.strip_comments(text).encode()
+
+    assert jsonc.loads('\ufeff[1, /* dos */ 2] // fin') == [1, 2]
+    assert jsonc.loads(b'{"a": "\\\\"} // barra') == {"a": "\\"}
+
+
+def test_load_reads_the_repo_faqs_and_reports_bad_json(tmp_path) -> None:
+    from services.orchestrator.rag import load_default_entries
+
+    assert len(load_default_entries()) > 0
+
+    broken = tmp_path / "broken.json"
+    broken.write_text('{"a": 1, /* sin cerrar', encoding="utf-8")
+    with pytest.raises(ValueError):
+        jsonc.load(broken)
+
+
+def test_unterminated_strings_and_long_inputs_scan_linearly() -> None:
+    assert jsonc.strip_comments('{"a": "sin cerrar // no es comentario') == '{"a": "sin cerrar // no es comentario'
+    assert jsonc.strip_comments('["barra final \\') == '["barra final \\'
+
+    big = '{"k": "' + "x\\\"" * 200_000 + '"} // fin'
+    assert jsonc.strip_comments(big) == big[: -len("// fin")]
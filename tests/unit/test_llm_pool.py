@@ -0,0 +1,48 @@
+"""Pruebas del pool de procesos LLM (backend falso, sin llama_cpp)."""
+
+import os
+
+from services.llm_adapter.pool import LlamaProcessPool, WorkerCrashed, auto_pool_size
+
+
+class _FakeLlama:
+    def create_completion(self, prompt: str, stream: bool = False, **kwargs):
+        if prompt == "crash":
+            os._exit(1)
+        if stream:
+            return ({"choices": [{"text": ch}]} for ch in prompt)
+        return {"choices": [{"text": f"{os.getpid()}:{prompt}"}]}
+
+
+def test_pool_generates_streams_and_restarts_crashed_worker() -> None:
+    pool = LlamaProcessPool(_FakeLlama, 2, mp_context="fork")
+    try:
+        assert pool.wait_ready(timeout=10)
+        out = pool.create_completion(prompt="hola")
+        assert out["choices"][0]["text"].endswith(":hola")
+
+        chunks = list(pool.create_completion(prompt="abc", stream=True))
+        assert "".join(c["choices"][0]["text"] for c in chunks) == "abc"
+
+        try:
+            pool.create_completion(prompt="crash")
+        except WorkerCrashed:
+            pass
+        else:  # pragma: no cover
+            raise AssertionError("se esperaba WorkerCrashed")
+
+        # El worker caído se reinició y el pool sigue atendiendo
+        assert pool.create_completion(prompt="ok")["choices"][0]["text"].endswith(":ok")
+        stats = pool.stats()
+        assert sum(w["restarts"] for w in stats) == 1
+        assert all(w["alive"] for w in stats)
+    finally:
+        pool.close()
+
+
+def test_auto_pool_size_is_positive(tmp_path) -> None:
+    model = tmp_path / "m.gguf"
+    model.write_bytes(b"0" * 1024)
+
+    assert auto_pool_size(model, threads_per_worker=1, worker_mem_mb=1) >= 1
+    assert auto_pool_size(model, threads_per_worker=10**6) == 1
@@ -0,0 +1,38 @@
+"""Pruebas del generador de carga HTTP (scripts/load_chat.py)."""
+
+import argparse
+import asyncio
+import importlib.util
+import sys
+from pathlib import Path
+
+_SPEC = importlib.util.spec_from_file_location("load_chat", Path(__file__).resolve().parents[2] / "scripts" / "load_chat.py")
+load_chat = importlib.util.module_from_spec(_SPEC)
+sys.modules["load_chat"] = load_chat  # dataclasses resuelve anotaciones vía sys.modules
+_SPEC.loader.exec_module(load_chat)  # type: ignore[union-attr]
+
+
+def test_histogram_percentiles_have_bounded_relative_error() -> None:
+    hist = load_chat.LatencyHistogram()
+    for ms in range(1, 1001):
+        hist.record(ms / 1000)
+
+    assert abs(hist.value_at(0.5) - 500) / 500 < 0.01
+    assert abs(hist.value_at(0.99) - 990) / 990 < 0.01
+    assert hist.value_at(1.0) == 1000
+    assert hist.summary()["count"] == 1000
+
+
+def test_in_process_run_drives_settings_message_and_stream() -> None:
+    args = argparse.Namespace(
+        in_process=True, base_url="", endpoint="mixed", concurrency=2, rps=0.0, max_inflight=8,
+        duration=0.3, think_ms=0.0, bot="municipal", channel="web", timeout=10.0, seed=1, histogram=False,
+    )
+
+    report = asyncio.run(load_chat.run(args))
+
+    endpoints = report["endpoints"]
+    assert endpoints["settings"]["ok"] >= 2
+    assert {"message", "stream"} <= set(endpoints)
+    assert all(e["error_rate"] == 0 for e in endpoints.values())
+    assert endpoints["stream"]["first_chunk"]["count"] == endpoints["stream"]["ok"]
@@ -0,0 +1,71 @@
+"""Pruebas del precalculado de respuestas de los chips del menú."""
+
+import asyncio
+
+import pytest
+
+from services.orchestrator import service as service_module
+from services.orchestrator.schema import ChatRequest
+from services.orchestrator.service import ChatOrchestrator
+
+CHIP = "¿Qué trámites puedo hacer online?"
+
+
+class _FailingClassifier:
+    async def classify(self, message: str):  # pragma: no cover - no debe llamarse
+        raise AssertionError("un chip precalculado no debe clasificarse")
+
+
+@pytest.mark.asyncio
+async def test_chip_is_answered_from_the_table_with_own_session(monkeypatch) -> None:
+    monkeypatch.setattr(service_module, "settings_version", lambda bot_id: "v1")
+    orchestrator = ChatOrchestrator()
+    expected = await orchestrator.respond(ChatRequest(session_id="ref", message=CHIP, channel="web", bot_id="municipal"))
+
+    warmed = await orchestrator.prewarm_menu([("municipal", "web")])
+    assert warmed["municipal/web"] > 0
+
+    orchestrator._classifier = _FailingClassifier()  # type: ignore[assignment]
+    response = await orchestrator.respond(ChatRequest(session_id="chip", message="  ¿qué trámites puedo hacer ONLINE? ", bot_id="municipal"))
+    streamed = [item async for item in orchestrator.respond_stream(ChatRequest(session_id="s", message=CHIP, bot_id="municipal"))]
+
+    assert response.session_id == "chip"
+    assert (response.reply, response.source) == (expected.reply, expected.source)
+    assert streamed[-1].session_id == "s" and streamed[-1].reply == expected.reply
+    assert orchestrator._menu.stats()["hits"] == 2
+
+
+@pytest.mark.asyncio
+async def test_settings_change_falls_back_to_pipeline_and_rewarms(monkeypatch) -> None:
+    version = {"value": "v1"}
+    monkeypatch.setattr(service_module, "settings_version", lambda bot_id: version["value"])
+    orchestrator = ChatOrchestrator()
+    await orchestrator.prewarm_menu([("municipal", "web")])
+
+    version["value"] = "v2"
+    await orchestrator.respond(ChatRequest(session_id="a", message=CHIP, bot_id="municipal"))
+    await asyncio.gather(*orchestrator._menu_tasks.values())
+
+    assert orchestrator._menu.is_current("municipal", "web", orchestrator._menu_version("municipal"))
+    assert orchestrator._menu.stats()["refreshes"] == 2
+
+
+@pytest.mark.asyncio
+async def test_intents_reload_invalidates_prewarmed_chips(tmp_path, monkeypatch) -> None:
+    from services.orchestrator import intent_classifier
+
+    intents = tmp_path / "intents.json"
+    monkeypatch.setattr(intent_classifier, "intents_path", lambda: intents)
+    monkeypatch.setattr(service_module, "settings_version", lambda bot_id: "v1")
+    orchestrator = ChatOrchestrator()
+    await orchestrator.prewarm_menu([("municipal", "web")])
+    chip = await orchestrator.respond(ChatRequest(session_id="a", message=CHIP, bot_id="municipal"))
+    assert not chip.escalated
+
+    intents.write_text('{"patterns": [{"intent": "handoff", "keywords": ["tramites"]}]}', encoding="utf-8")
+    await orchestrator.apply_change("intents")
+    routed = await orchestrator.respond(ChatRequest(session_id="b", message=CHIP, bot_id="municipal"))
+    await asyncio.gather(*orchestrator._menu_tasks.values())
+
+    assert routed.escalated
+    assert orchestrator._menu.is_current("municipal", "web", orchestrator._menu_version("municipal"))
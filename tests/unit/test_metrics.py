@@ -0,0 +1,62 @@
+"""Pruebas de temporizadores por etapa, Server-Timing y GET /metrics."""
+
+from fastapi.testclient import TestClient
+
+from services.api.main import create_app
+from services.observability.metrics import REQUEST_SECONDS, Histogram, StageTimer, bounded_labels
+
+
+def test_histogram_renders_cumulative_buckets() -> None:
+    hist = Histogram("demo_seconds", "demo", ("bot",), buckets=(0.1, 1.0))
+    hist.observe(0.05, bot="a")
+    hist.observe(0.5, bot="a")
+    hist.observe(5.0, bot="a")
+
+    lines = list(hist.render())
+
+    assert 'demo_seconds_bucket{bot="a",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{bot="a",le="1"} 2' in lines
+    assert 'demo_seconds_bucket{bot="a",le="+Inf"} 3' in lines
+    assert 'demo_seconds_count{bot="a"} 3' in lines
+
+
+def test_server_timing_lists_stages_and_total() -> None:
+    timer = StageTimer()
+    with timer.stage("rules"):
+        pass
+    timer.add("rag", 0.0125)
+
+    header = timer.server_timing()
+
+    assert header.startswith("rules;dur=")
+    assert "rag;dur=12.50" in header
+    assert "total;dur=" in header
+
+
+def test_chat_message_sets_server_timing_and_feeds_metrics() -> None:
+    client = TestClient(create_app())
+
+    resp = client.post(
+        "/chat/message",
+        json={"session_id": "m", "message": "¿Cuál es el horario de atención?", "channel": "web"},
+    )
+    body = client.get("/metrics").text
+
+    assert resp.status_code == 200
+    timing = resp.headers["server-timing"]
+    assert "settings;dur=" in timing and "rules;dur=" in timing
+    assert 'webchatbot_stage_seconds_count{stage="rules",bot="municipal",channel="web",source="faq"}' in body
+    assert "# TYPE webchatbot_request_seconds histogram" in body
+
+
+def test_client_supplied_bot_and_channel_are_bounded_to_known_values() -> None:
+    assert bounded_labels("municipal", "WEB") == ("municipal", "web")
+    assert bounded_labels("bot-inventado-123", "canal-raro") == ("other", "other")
+    assert bounded_labels("", "") == ("", "")
+
+    timer = StageTimer()
+    timer.bot, timer.channel = "x" * 40, "y" * 40
+    before = REQUEST_SECONDS.count(bot="other", channel="other", source="faq")
+    timer.finish(source="faq")
+
+    assert REQUEST_SECONDS.count(bot="other", channel="other", source="faq") == before + 1
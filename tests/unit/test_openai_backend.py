@@ -0,0 +1,68 @@
+"""Pruebas del backend OpenAI-compatible contra un servidor stub (ASGI vía httpx)."""
+
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from services.llm_adapter.openai_backend import OpenAICompatBackend
+from services.llm_adapter.scheduler import SchedulerBusy
+
+
+def _stub_app(fail_first: int = 0, always_busy: bool = False) -> tuple[FastAPI, list[dict]]:
+    app = FastAPI()
+    seen: list[dict] = []
+
+    @app.post("/v1/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        seen.append(body)
+        if always_busy or len(seen) <= fail_first:
+            return JSONResponse({"error": "busy"}, status_code=503, headers={"Retry-After": "0"})
+        if body.get("stream"):
+            async def events():
+                for word in ("Hola", " vecino"):
+                    yield f"data: {json.dumps({'choices': [{'text': word}]})}\n\n"
+                yield "data: [DONE]\n\n"
+            return StreamingResponse(events(), media_type="text/event-stream")
+        return {"choices": [{"text": f" eco: {body['prompt']} "}]}
+
+    return app, seen
+
+
+def _backend(app: FastAPI, **kwargs) -> OpenAICompatBackend:
+    return OpenAICompatBackend(
+        "http://stub/v1", model="gemma", backoff_s=0, transport=httpx.ASGITransport(app=app), **kwargs
+    )
+
+
+@pytest.mark.asyncio
+async def test_generate_retries_then_streams() -> None:
+    app, seen = _stub_app(fail_first=1)
+    backend = _backend(app, retries=2, defaults={"max_tokens": 64})
+    try:
+        text = await backend.generate("hola", temperature=0.1, bot_id="municipal", prefix_len=3)
+        chunks = [c async for c in backend.generate_stream("hola")]
+    finally:
+        await backend.aclose()
+
+    assert text == "eco: hola"
+    assert "".join(chunks) == "Hola vecino"
+    assert seen[1] == {"max_tokens": 64, "model": "gemma", "prompt": "hola", "stream": False, "temperature": 0.1}
+    assert backend.readiness()["retries"] == 1
+    assert backend.state == "ready"
+
+
+@pytest.mark.asyncio
+async def test_persistent_overload_maps_to_busy() -> None:
+    app, seen = _stub_app(always_busy=True)
+    backend = _backend(app, retries=1)
+    try:
+        with pytest.raises(SchedulerBusy):
+            await backend.generate("hola")
+    finally:
+        await backend.aclose()
+
+    assert len(seen) == 2
@@ -143,3 +143,17 @@ async def test_who_we_are_rule() -> None:
 
     assert response.source == "faq"
     assert "atención digital" in response.reply.lower()
+
+
+@pytest.mark.asyncio
+async def test_static_replies_are_memoized_lazily_in_a_bounded_lru() -> None:
+    orchestrator = ChatOrchestrator()
+    orchestrator._static_replies_max = 2
+
+    await orchestrator.respond(ChatRequest(session_id="1", message="¿Cuál es el horario de atención?", channel="web"))
+    assert len(orchestrator._static_replies) == 1
+
+    profile = orchestrator._sanitize_profile_for(None)
+    for text in ("uno", "dos", "tres"):
+        orchestrator._sanitize_static(text, profile)
+    assert [text for _, text in orchestrator._static_replies] == ["dos", "tres"]
@@ -0,0 +1,195 @@
+"""Pruebas de la reutilización de prefijos KV (backend falso)."""
+
+import pickle
+import sys
+from types import ModuleType, SimpleNamespace
+
+import pytest
+
+from services.llm_adapter import prefix_cache
+from services.llm_adapter.prefix_cache import PrefixCache, create_completion_with_prefix
+from services.orchestrator.schema import ChatRequest
+from services.orchestrator.service import ChatOrchestrator, LLMPlan
+
+
+def _state(tokens: list[int]) -> SimpleNamespace:
+    """Estado con la forma de `llama_cpp.LlamaState` (bytes crudos = tokens serializados)."""
+    raw = bytes(tokens)
+    return SimpleNamespace(input_ids=list(tokens), n_tokens=len(tokens), llama_state=raw, llama_state_size=len(raw), seed=7)
+
+
+_REAL_BUILD_STATE = prefix_cache._build_state
+
+
+@pytest.fixture(autouse=True)
+def _fake_state_builder(monkeypatch) -> None:
+    # Sin llama_cpp/numpy en las pruebas: el estado se arma con la misma forma
+    monkeypatch.setattr(prefix_cache, "_build_state", lambda llama, tokens, raw, seed: _state(list(raw)))
+
+
+class _FakeLlama:
+    """Simula el estado KV como la lista de tokens evaluados."""
+
+    def __init__(self) -> None:
+        self.tokens: list[int] = []
+        self.evaluated = 0
+
+    def n_ctx(self) -> int:
+        return 4096
+
+    def tokenize(self, data: bytes, add_bos: bool = True) -> list[int]:
+        return ([1] if add_bos else []) + list(data)
+
+    def reset(self) -> None:
+        self.tokens = []
+
+    def eval(self, tokens: list[int]) -> None:
+        self.evaluated += len(tokens)
+        self.tokens.extend(tokens)
+
+    def save_state(self) -> SimpleNamespace:
+        return _state(self.tokens)
+
+    def load_state(self, state: SimpleNamespace) -> None:
+        self.tokens = list(state.llama_state[: state.llama_state_size])
+
+    def create_completion(self, prompt: str, **kwargs):
+        wanted = self.tokenize(prompt.encode())
+        common = 0
+        for a, b in zip(self.tokens, wanted):
+            if a != b:
+                break
+            common += 1
+        self.tokens = self.tokens[:common]
+        self.eval(wanted[common:])
+        return {"choices": [{"text": "ok"}]}
+
+
+def test_prefix_state_is_reused_and_persisted(tmp_path) -> None:
+    prefix = "Usá exclusivamente el CONTEXTO.\n- Sé breve.\n\n"
+    cache = PrefixCache(directory=tmp_path, model_id="m")
+    llama = _FakeLlama()
+
+    create_completion_with_prefix(llama, cache, prefix + "PREGUNTA: a", prefix=prefix, prefix_key="municipal")
+    llama.reset()  # otro bot usó el modelo en el medio
+    llama.evaluated = 0
+    create_completion_with_prefix(llama, cache, prefix + "PREGUNTA: b", prefix=prefix, prefix_key="municipal")
+
+    assert llama.evaluated == len("PREGUNTA: b")
+    assert cache.stats()["hits"] == 1
+
+    # Un proceso nuevo arranca en caliente desde disco
+    fresh = PrefixCache(directory=tmp_path, model_id="m")
+    other = _FakeLlama()
+    assert fresh.prepare(other, "municipal", prefix) is True
+    assert fresh.stats()["disk_hits"] == 1
+    assert other.tokens == _FakeLlama().tokenize(prefix.encode())
+    assert PrefixCache(directory=tmp_path, model_id="otro").prepare(_FakeLlama(), "municipal", prefix) is False
+
+
+def test_disk_state_header_is_verified_before_load(tmp_path) -> None:
+    prefix = "Sé breve.\n\n"
+    PrefixCache(directory=tmp_path, model_id="m").prepare(_FakeLlama(), "municipal", prefix)
+    (path,) = tmp_path.glob("*.state")
+    assert path.read_bytes().startswith(b"WCKV")
+
+    # Mismo nombre de archivo, pero la cabecera dice otro modelo: se descarta sin cargarlo
+    meta, raw = prefix_cache._decode(path.read_bytes())
+    path.write_bytes(prefix_cache._encode({**meta, "model": "otro"}, raw))
+    cache = PrefixCache(directory=tmp_path, model_id="m")
+    llama = _FakeLlama()
+    assert cache.prepare(llama, "municipal", prefix) is False
+    assert cache.stats()["errors"] == 1 and llama.evaluated > 0
+
+    # Un archivo del formato anterior (pickle) nunca se deserializa
+    path.write_bytes(pickle.dumps([1, 2, 3]))
+    legacy = PrefixCache(directory=tmp_path, model_id="m")
+    assert legacy.prepare(_FakeLlama(), "municipal", prefix) is False
+    assert legacy.stats()["errors"] == 1
+
+
+class _LlamaState066:
+    """Misma firma que `llama_cpp.LlamaState` en llama-cpp-python==0.2.66 (sin `seed`)."""
+
+    def __init__(self, input_ids, scores, n_tokens: int, llama_state: bytes, llama_state_size: int) -> None:
+        self.input_ids = input_ids
+        self.scores = scores
+        self.n_tokens = n_tokens
+        self.llama_state = llama_state
+        self.llama_state_size = llama_state_size
+
+
+class _Llama066:
+    """Buffers y `load_state` como en llama-cpp-python 0.2.66."""
+
+    def __init__(self, np, n_ctx: int = 64, n_vocab: int = 8) -> None:
+        self._n_ctx, self._n_vocab = n_ctx, n_vocab
+        self.input_ids = np.zeros((n_ctx,), dtype=np.intc)
+        self.scores = np.ones((n_ctx, n_vocab), dtype=np.single)
+        self.n_tokens = 0
+        self.restored = b""
+
+    def n_ctx(self) -> int:
+        return self._n_ctx
+
+    def n_vocab(self) -> int:
+        return self._n_vocab
+
+    def tokenize(self, data: bytes, add_bos: bool = True) -> list[int]:
+        return ([1] if add_bos else []) + list(data)
+
+    def load_state(self, state) -> None:
+        self.scores[: state.n_tokens, :] = state.scores.copy()
+        self.scores[state.n_tokens :, :] = 0.0
+        self.input_ids = state.input_ids.copy()
+        self.n_tokens = state.n_tokens
+        self.restored = bytes(state.llama_state[: state.llama_state_size])
+
+
+def test_disk_state_is_rebuilt_for_the_pinned_llama_state(tmp_path, monkeypatch) -> None:
+    np = pytest.importorskip("numpy")
+    monkeypatch.setattr(prefix_cache, "_build_state", _REAL_BUILD_STATE)
+    fake_module = ModuleType("llama_cpp")
+    fake_module.LlamaState = _LlamaState066  # type: ignore[attr-defined]
+    monkeypatch.setitem(sys.modules, "llama_cpp", fake_module)
+
+    prefix = "Sé breve."
+    llama = _Llama066(np)
+    tokens = llama.tokenize(prefix.encode())
+    cache = PrefixCache(directory=tmp_path, model_id="m")
+    meta = {"model": "m", "n_tokens": len(tokens), "prefix": prefix_cache._prefix_hash(prefix), "seed": 3, "size": 5}
+    (tmp_path / f"{cache.key('municipal', prefix)}.state").write_bytes(prefix_cache._encode(meta, b"\x01kv\x02\x03"))
+
+    assert cache.prepare(llama, "municipal", prefix) is True
+    assert cache.stats() == {**cache.stats(), "disk_hits": 1, "errors": 0}
+    # El buffer de tokens conserva el tamaño n_ctx y empieza con el prefijo
+    assert llama.input_ids.shape == (64,) and llama.input_ids[: len(tokens)].tolist() == tokens
+    assert llama.n_tokens == len(tokens) and llama.restored == b"\x01kv\x02\x03"
+    assert not llama.scores.any()
+    # Una fila de scores por estado, no n_tokens × n_vocab
+    assert cache._states[cache.key("municipal", prefix)].scores.shape == (1, 8)
+
+
+class _CapturingLLM:
+    def __init__(self) -> None:
+        self.calls: list[tuple[str, dict]] = []
+
+    async def generate(self, prompt: str, **kwargs) -> str:
+        self.calls.append((prompt, kwargs))
+        return "respuesta"
+
+
+@pytest.mark.asyncio
+async def test_plan_marks_stable_prefix() -> None:
+    orchestrator = ChatOrchestrator()
+    llm = _CapturingLLM()
+    orchestrator._llm = llm  # type: ignore[assignment]
+
+    await orchestrator.respond(ChatRequest(session_id="p", message="contame algo", channel="mar2"))
+    await orchestrator.respond(ChatRequest(session_id="p", message="otra cosa", channel="mar2"))
+
+    (p1, k1), (p2, k2) = llm.calls
+    assert k1["prefix_len"] == k2["prefix_len"]
+    assert p1[: k1["prefix_len"]] == p2[: k2["prefix_len"]]
+    assert p1.endswith("contame algo")
+    assert LLMPlan(prompt="x").llm_kwargs()["prefix_len"] == 0
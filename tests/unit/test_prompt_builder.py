@@ -0,0 +1,71 @@
+"""Pruebas del presupuesto de tokens del prompt."""
+
+import pytest
+
+from services.chatbots.models import load_settings
+from services.orchestrator.prompt_builder import PromptBudget, estimate_tokens
+from services.orchestrator.schema import ChatRequest
+from services.orchestrator.service import ChatOrchestrator
+
+
+def _words(text: str) -> int:
+    return len(text.split())
+
+
+def test_contexts_are_kept_by_priority_and_trimmed_to_fit() -> None:
+    budget = PromptBudget(context_window=110, max_tokens=40, count=_words, margin=0)
+    fixed = "uno " * 10
+    contexts = ["alta " * 20, "media " * 50, "baja " * 5]
+
+    kept = budget.fit_contexts(fixed, contexts)
+
+    assert kept[0] == contexts[0]
+    assert kept[1].endswith("…") and _words(kept[1]) <= 70 - 10 - 24 - 4
+    assert len(kept) == 2
+    assert sum(_words(k) + 4 for k in kept) + _words(fixed) <= budget.available
+
+
+def test_question_never_overflows_a_full_fixed_part() -> None:
+    budget = PromptBudget(context_window=100, max_tokens=40, count=_words, margin=0)
+    question = "pregunta " * 30
+    full, reduced = "pre " * 55, "pre " * 20
+
+    assert _words(full) + _words(budget.fit_question(full, question)) <= budget.available
+    assert budget.fit_question("pre " * 60, question) == ""
+    assert budget.pick_fixed([full, reduced]) == 1
+    assert budget.pick_fixed([full, full]) == 1
+    assert budget.pick_fixed([reduced, full]) == 0
+
+
+def test_estimator_overestimates_spanish_text() -> None:
+    text = "¿Cómo saco la licencia de conducir en la municipalidad?"
+    assert estimate_tokens(text) >= len(text.split())
+    assert estimate_tokens("") == 0
+
+
+class _SmallWindowLLM:
+    context_window = 600
+    token_counter = staticmethod(_words)
+
+    def __init__(self) -> None:
+        self.prompts: list[str] = []
+
+    async def generate(self, prompt: str, **kwargs) -> str:
+        self.prompts.append(prompt)
+        return "ok"
+
+
+@pytest.mark.asyncio
+async def test_long_question_is_clipped_to_context_window() -> None:
+    orchestrator = ChatOrchestrator()
+    llm = _SmallWindowLLM()
+    orchestrator._llm = llm  # type: ignore[assignment]
+    message = "contame " * 400
+
+    await orchestrator.respond(ChatRequest(session_id="w", message=message, channel="mar2"))
+
+    (prompt,) = llm.prompts
+    budget = orchestrator._prompt_budget(load_settings("mar2", channel="mar2"))
+    assert budget.count is _words
+    assert _words(prompt) <= budget.available
+    assert prompt.rstrip().endswith("…")
@@ -0,0 +1,123 @@
+"""Pruebas del rate limiting por sesión/IP y del tope de solicitudes en curso."""
+
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+
+from services.api.rate_limit import RATE_LIMITED, RateLimiter, RateLimitMiddleware
+
+
+def _app(limiter: RateLimiter, gate: asyncio.Event | None = None) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(RateLimitMiddleware, limiter=limiter)
+
+    @app.post("/chat/message")
+    async def message(request: Request) -> dict:
+        body = await request.json()
+        if gate is not None:
+            await gate.wait()
+        return {"session_id": body["session_id"]}
+
+    return app
+
+
+def _client(app: FastAPI) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+def test_bucket_refills_over_time_and_overrides_by_bot() -> None:
+    limiter = RateLimiter(session="2/10", ip="0", overrides={"mar2": {"session": "1/10"}}, max_inflight=0)
+
+    assert limiter.check(ip="1.1.1.1", session_id="s", bot_id="", channel="web", now=0.0) is None
+    assert limiter.check(ip="1.1.1.1", session_id="s", bot_id="", channel="web", now=0.0) is None
+    reason, wait = limiter.check(ip="1.1.1.1", session_id="s", bot_id="", channel="web", now=0.0)
+    assert reason == "session" and wait == pytest.approx(5.0)
+    assert limiter.check(ip="1.1.1.1", session_id="s", bot_id="", channel="web", now=5.0) is None
+
+    assert limiter.check(ip="", session_id="m", bot_id="mar2", channel="mar2", now=0.0) is None
+    assert limiter.check(ip="", session_id="m", bot_id="mar2", channel="mar2", now=0.0) is not None
+
+
+@pytest.mark.asyncio
+async def test_session_and_ip_limits_answer_429_before_the_app() -> None:
+    limiter = RateLimiter(session="2/60", ip="3/60", overrides={}, max_inflight=0)
+    before = RATE_LIMITED.value(reason="ip", bot="", channel="web")
+
+    async with _client(_app(limiter)) as client:
+        codes = [(await client.post("/chat/message", json={"session_id": "a", "message": "hola"})).status_code for _ in range(3)]
+        other = await client.post("/chat/message", json={"session_id": "b", "message": "hola"})
+        other_again = await client.post("/chat/message", json={"session_id": "c", "message": "hola"})
+
+    assert codes == [200, 200, 429]
+    assert other.status_code == 200
+    assert other_again.status_code == 429 and int(other_again.headers["retry-after"]) >= 1
+    assert RATE_LIMITED.value(reason="ip", bot="", channel="web") == before + 1
+
+
+@pytest.mark.asyncio
+async def test_global_inflight_cap_answers_503() -> None:
+    limiter = RateLimiter(session="0", ip="0", overrides={}, max_inflight=1)
+    gate = asyncio.Event()
+
+    async with _client(_app(limiter, gate)) as client:
+        slow = asyncio.create_task(client.post("/chat/message", json={"session_id": "a", "message": "hola"}))
+        while limiter.inflight == 0:
+            await asyncio.sleep(0.01)
+        rejected = await client.post("/chat/message", json={"session_id": "b", "message": "hola"})
+        gate.set()
+        assert (await slow).status_code == 200
+
+    assert rejected.status_code == 503
+    assert limiter.inflight == 0
+
+
+def test_websocket_frames_use_session_buckets_and_inflight_cap() -> None:
+    from fastapi import WebSocket
+    from fastapi.testclient import TestClient
+
+    from services.orchestrator.schema import ChatResponse
+    from services.orchestrator.ws import ChatSocketSession
+
+    class _Orchestrator:
+        async def respond_stream(self, request):
+            yield ChatResponse(session_id=request.session_id, reply="ok", source="faq")
+
+    limiter = RateLimiter(session="1/60", ip="0", overrides={}, max_inflight=4)
+    app = FastAPI()
+
+    @app.websocket("/ws")
+    async def ws(websocket: WebSocket) -> None:
+        await ChatSocketSession(websocket, _Orchestrator(), limiter=limiter).run()
+
+    limited = RATE_LIMITED.value(reason="session", bot="other", channel="web")
+    with TestClient(app).websocket_connect("/ws") as socket:
+        socket.send_json({"type": "message", "id": "a", "session_id": "s", "message": "hola"})
+        assert socket.receive_json()["type"] == "done"
+        socket.send_json({"type": "message", "id": "b", "session_id": "s", "message": "hola", "bot_id": "inventado"})
+        rejected = socket.receive_json()
+
+    assert rejected["status"] == 429 and rejected["retry_after"] >= 1
+    # bot_id lo elige el cliente: la métrica lo etiqueta "other"
+    assert RATE_LIMITED.value(reason="session", bot="other", channel="web") == limited + 1
+    assert limiter.inflight == 0
+
+    limiter.inflight = limiter.max_inflight
+    before = RATE_LIMITED.value(reason="inflight")
+    with TestClient(app).websocket_connect("/ws") as socket:
+        socket.send_json({"type": "message", "id": "c", "session_id": "otra", "message": "hola"})
+        busy = socket.receive_json()
+    assert busy["status"] == 503 and RATE_LIMITED.value(reason="inflight") == before + 1
+
+
+def test_forwarded_ip_is_taken_from_the_trusted_hops_on_the_right() -> None:
+    scope = {
+        "client": ("10.0.0.2", 5000),
+        "headers": [(b"x-forwarded-for", b"6.6.6.6, 203.0.113.7"), (b"x-forwarded-for", b"10.0.0.1")],
+    }
+
+    assert RateLimiter(trust_proxy=0).client_ip(scope) == "10.0.0.2"
+    assert RateLimiter(trust_proxy=1).client_ip(scope) == "10.0.0.1"
+    assert RateLimiter(trust_proxy=2).client_ip(scope) == "203.0.113.7"
+    assert RateLimiter(trust_proxy=5).client_ip(scope) == "10.0.0.2"
@@ -0,0 +1,43 @@
+"""Pruebas de carga diferida del LLM y sondas de salud."""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from services.api.main import create_app
+from services.orchestrator.schema import ChatRequest
+from services.orchestrator.service import ChatOrchestrator
+
+
+class _WarmingLLM:
+    warming_up = True
+
+    def readiness(self) -> dict:
+        return {"ready": False, "state": "loading"}
+
+    async def generate(self, prompt: str, **kwargs) -> str:  # pragma: no cover - no debe llamarse
+        raise AssertionError("el LLM todavía se está cargando")
+
+
+@pytest.mark.asyncio
+async def test_llm_bound_request_gets_warming_reply_while_rules_answer() -> None:
+    orchestrator = ChatOrchestrator()
+    orchestrator._llm = _WarmingLLM()  # type: ignore[assignment]
+
+    warming = await orchestrator.respond(ChatRequest(session_id="w", message="¿Cuál es la capital de Marte?"))
+    rule = await orchestrator.respond(ChatRequest(session_id="w", message="¿Cuál es el horario de atención?"))
+
+    assert warming.source == "fallback"
+    assert "iniciando" in warming.reply
+    assert rule.source == "faq"
+    assert orchestrator.readiness()["ready"] is False
+
+
+def test_health_and_ready_endpoints() -> None:
+    client = TestClient(create_app())
+
+    assert client.get("/healthz").json() == {"status": "ok"}
+    ready = client.get("/readyz")
+    assert ready.status_code == 200
+    body = ready.json()
+    assert body["components"]["llm"]["state"] == "disabled"
+    assert body["components"]["rag"]["ready"] is True
@@ -0,0 +1,80 @@
+"""Pruebas del sanitizador de salidas."""
+
+import random
+
+from services.orchestrator.sanitizer import DomainAllowlist, StreamingSanitizer, _sanitize_llm_output
+
+
+def test_drops_meta_lines_and_code() -> None:
+    text = (
+        "Respuesta: esto no va\n"
+        "Para pagar usá el portal.\n"
+        "Para pagar usá el portal.\n"
+        "import os\n"
+        "```python\nprint('x')\n```\n"
+        "Explicación: tampoco va"
+    )
+
+    assert _sanitize_llm_output(text) == "Para pagar usá el portal."
+
+
+def test_filters_pre_prompt_echo() -> None:
+    pre = ["Respondé con frases cortas."]
+    text = "- Respondé con frases cortas.\nHorario: 9 a 17 hs."
+
+    assert _sanitize_llm_output(text, pre_prompts=pre) == "Horario: 9 a 17 hs."
+
+
+def test_url_allowlist_keeps_suffix_semantics() -> None:
+    allow = DomainAllowlist(["municipio.gob"])
+
+    assert allow.allows("tramites.municipio.gob")
+    assert allow.allows("municipio.gob")
+    assert not allow.allows("municipio.gob.ar")
+    assert not allow.allows("ejemplo.com")
+
+    text = "Ver https://tramites.municipio.gob/x y http://otro.com/y"
+    assert _sanitize_llm_output(text, allowed_domains=["Municipio.gob"]) == "Ver https://tramites.municipio.gob/x y"
+
+
+def _stream(text: str, sizes: list[int], **kwargs) -> str:
+    san = StreamingSanitizer(**kwargs)
+    out: list[str] = []
+    pos = 0
+    i = 0
+    while pos < len(text):
+        size = sizes[i % len(sizes)]
+        out.append(san.feed(text[pos:pos + size]))
+        pos += size
+        i += 1
+    out.append(san.finish())
+    return "".join(out)
+
+
+def test_streaming_matches_batch_for_any_chunking() -> None:
+    samples = [
+        "Respuesta: x\nHola\r\nHola\n\n\n  Chau  \n",
+        "antes ```python\nprint(1)\n``` después\nfin",
+        "sin cierre ```python\nprint(1)\nlínea",
+        "````\n`` `\nok``",
+        "\n\n http://malo.com hola\nver https://tramites.municipio.gob/a http://x.com \n\n",
+        "- Respondé con frases cortas.\ntexto\rotro\x1cmás final\r",
+        "",
+    ]
+    kwargs = {"allowed_domains": ["municipio.gob"], "pre_prompts": ["Respondé con frases cortas."]}
+    rnd = random.Random(1234)
+    for text in samples:
+        expected = _sanitize_llm_output(text, **kwargs)
+        for _ in range(200):
+            sizes = [rnd.randint(1, 6) for _ in range(8)]
+            assert _stream(text, sizes, **kwargs) == expected, (text, sizes)
+
+
+def test_streaming_emits_before_end() -> None:
+    san = StreamingSanitizer()
+
+    first = san.feed("Primera línea completa\nsegunda")
+
+    assert first == "Primera línea completa"
+    assert san.feed(" parte\n") == "\nsegunda parte"
+    assert san.finish() == ""
@@ -0,0 +1,64 @@
+"""Pruebas del planificador de inferencia."""
+
+import asyncio
+import threading
+
+import pytest
+
+from services.llm_adapter.scheduler import InferenceScheduler, SchedulerBusy, SchedulerTimeout
+
+
+@pytest.mark.asyncio
+async def test_priority_order_and_metrics() -> None:
+    sched = InferenceScheduler(concurrency=1, max_queue=8, queue_timeout_s=None)
+    gate = threading.Event()
+    order: list[str] = []
+
+    blocker = sched.submit(gate.wait)
+    await asyncio.sleep(0.05)  # el worker toma el primer trabajo
+    low = sched.submit(order.append, "low", priority=9)
+    high = sched.submit(order.append, "high", priority=0)
+    gate.set()
+    await asyncio.gather(blocker, low, high)
+    await sched.aclose()
+
+    assert order == ["high", "low"]
+    metrics = sched.metrics()
+    assert metrics["completed"] == 3
+    assert metrics["queue_depth"] == 0
+    assert metrics["wait_time"]["count"] == 3
+
+
+@pytest.mark.asyncio
+async def test_rejects_when_queue_full() -> None:
+    sched = InferenceScheduler(concurrency=1, max_queue=1, queue_timeout_s=None)
+    gate = threading.Event()
+
+    running = sched.submit(gate.wait)
+    await asyncio.sleep(0.05)
+    queued = sched.submit(lambda: None)
+    with pytest.raises(SchedulerBusy):
+        sched.submit(lambda: None)
+    gate.set()
+    await asyncio.gather(running, queued)
+    await sched.aclose()
+
+    assert sched.metrics()["rejected_busy"] == 1
+
+
+@pytest.mark.asyncio
+async def test_queue_deadline_expires_waiting_job() -> None:
+    sched = InferenceScheduler(concurrency=1, max_queue=4, queue_timeout_s=0.05)
+    gate = threading.Event()
+    ran: list[bool] = []
+
+    running = sched.submit(gate.wait, queue_timeout_s=0)
+    await asyncio.sleep(0.01)
+    with pytest.raises(SchedulerTimeout):
+        await sched.submit(ran.append, True)
+    gate.set()
+    await running
+    await sched.aclose()
+
+    assert ran == []
+    assert sched.metrics()["rejected_timeout"] == 1
@@ -0,0 +1,127 @@
+"""Pruebas de la memoria de conversación acotada (SessionStore) y su uso en prompts."""
+
+import pytest
+
+from services.chatbots.models import defaults_for
+from services.orchestrator import service as service_module
+from services.orchestrator.schema import ChatRequest
+from services.orchestrator.service import ChatOrchestrator, LLMPlan
+from services.orchestrator.session_store import SessionStore, render_history
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_ring_buffer_and_token_budget_keep_the_latest_turns() -> None:
+    store = SessionStore(max_turns=4, max_tokens=40, count=lambda text: len(text.split()))
+
+    for i in range(5):
+        store.record("s", f"pregunta {i}", f"respuesta {i}")
+    assert [t.text for t in store.recent("s")] == ["pregunta 3", "respuesta 3", "pregunta 4", "respuesta 4"]
+
+    store.append("s", "user", "palabra " * 35)
+    turns = store.recent("s")
+    assert sum(t.tokens for t in turns) <= 40
+    assert turns[-1].role == "user" and len(turns) == 3
+
+    store.append("s", "assistant", "muy " * 100)
+    assert store.recent("s")[-1].tokens <= 40
+
+
+def test_ttl_and_lru_caps_with_sqlite_spill(tmp_path) -> None:
+    clock = _Clock()
+    store = SessionStore(max_sessions=2, ttl_s=60, spill_path=tmp_path / "sessions.db", clock=clock)
+
+    store.record("a", "hola", "¿en qué te ayudo?")
+    store.record("b", "hola", "buenas")
+    store.record("c", "hola", "qué tal")  # desaloja "a" al spill
+    assert store.stats()["sessions"] == 2 and store.stats()["spilled_sessions"] == 1
+
+    assert [t.text for t in store.recent("a")] == ["hola", "¿en qué te ayudo?"]
+    assert store.stats()["restored"] == 1
+
+    clock.now += 61
+    assert store.recent("b") == []
+    assert store.stats()["expired"] >= 1
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_mar2_prompt_includes_previous_turns(monkeypatch) -> None:
+    settings = defaults_for("mar2", channel="mar2")
+    monkeypatch.setattr(service_module, "load_settings", lambda bot_id, channel=None: settings)
+    orchestrator = ChatOrchestrator()
+    orchestrator._sessions = SessionStore()
+
+    await orchestrator.respond(ChatRequest(session_id="m", message="Me llamo Ana", channel="mar2"))
+    plan = await orchestrator._route(ChatRequest(session_id="m", message="¿Cómo me llamo?", channel="mar2"))
+    other = await orchestrator._route(ChatRequest(session_id="otra", message="¿Cómo me llamo?", channel="mar2"))
+
+    assert isinstance(plan, LLMPlan) and isinstance(other, LLMPlan)
+    assert "Usuario: Me llamo Ana" in plan.prompt
+    assert plan.prompt.index("Me llamo Ana") < plan.prompt.index("¿Cómo me llamo?")
+    assert "CONVERSACIÓN PREVIA" not in other.prompt
+    assert plan.prompt[: plan.prefix_len] == other.prompt[: other.prefix_len]
+
+
+def test_render_history_labels_roles() -> None:
+    store = SessionStore()
+    store.record("s", "hola\n", "buenas   tardes")
+
+    assert render_history(store.recent("s")) == ["Usuario: hola", "Asistente: buenas tardes"]
+
+
+@pytest.mark.asyncio
+async def test_only_follow_up_questions_carry_history() -> None:
+    orchestrator = ChatOrchestrator()
+    orchestrator._sessions = SessionStore()
+    orchestrator._sessions.record("s", "Hola", "¿En qué te ayudo?")
+
+    plain = await orchestrator._route(ChatRequest(session_id="s", message="¿Cuál es la capital de Marte?"))
+    follow = await orchestrator._route(ChatRequest(session_id="s", message="¿Y la capital de Venus?"))
+
+    assert isinstance(plain, LLMPlan) and isinstance(follow, LLMPlan)
+    assert "CONVERSACIÓN PREVIA" not in plain.prompt and plain.cacheable
+    assert "Usuario: Hola" in follow.prompt and not follow.cacheable
+
+
+def test_spill_skips_sqlite_for_unknown_sessions_and_purges_periodically(tmp_path) -> None:
+    clock = _Clock()
+    store = SessionStore(max_sessions=1, ttl_s=60, spill_path=tmp_path / "sessions.db", clock=clock)
+    store.record("a", "hola", "buenas")
+    store.record("b", "hola", "buenas")  # "a" al spill
+
+    calls: list[str] = []
+    store._spill.pop = lambda session_id: calls.append(session_id)  # type: ignore[method-assign]
+    assert store.recent("desconocida") == [] and calls == []
+
+    purges: list[float] = []
+    store._spill.purge = lambda older_than: purges.append(older_than) or 0  # type: ignore[method-assign]
+    store.record("c", "hola", "buenas")
+    store.record("d", "hola", "buenas")
+    assert purges == []
+    clock.now += 61
+    store.record("e", "hola", "buenas")
+    store.record("f", "hola", "buenas")
+    assert len(purges) == 1 and "a" not in store._spilled
+    store.close()
+
+
+def test_spill_is_capped_without_ttl(tmp_path) -> None:
+    store = SessionStore(max_sessions=1, ttl_s=0, spill_path=tmp_path / "sessions.db", max_spilled=2)
+    for name in "abcde":
+        store.record(name, "hola", "buenas")
+
+    assert list(store._spilled) == ["c", "d"]
+    assert store._spill.count() == 2 and store.stats()["spill_dropped"] == 2
+    assert store.recent("a") == [] and len(store.recent("d")) == 2
+    store.close()
+
+    reopened = SessionStore(max_sessions=1, ttl_s=0, spill_path=tmp_path / "sessions.db", max_spilled=1)
+    assert list(reopened._spilled) == ["c"] and reopened._spill.count() == 1
+    reopened.close()
@@ -0,0 +1,63 @@
+"""Pruebas del backend LLM simulado (LLM_BACKEND=sim)."""
+
+import asyncio
+import time
+
+import pytest
+
+from services.llm_adapter.client import PLACEHOLDER_REPLY, LLMClient
+from services.llm_adapter.settings import LLMSettings
+
+
+def _sim_client(**env) -> LLMClient:
+    values = {
+        "LLM_BACKEND": "sim",
+        "LLM_LAZY_LOAD": False,
+        "LLM_SIM_PROMPT_MS_PER_TOKEN": 0.0,
+        "LLM_SIM_TOKENS_PER_S": 100.0,
+        "LLM_SIM_JITTER": 0.0,
+        "LLM_SIM_REPLY_TOKENS": 10,
+        **env,
+    }
+    return LLMClient(settings=LLMSettings(**values))
+
+
+@pytest.mark.asyncio
+async def test_generation_takes_decode_time_and_reports_usage() -> None:
+    client = _sim_client()
+
+    started = time.perf_counter()
+    text = await client.generate("hola", max_tokens=5)
+    elapsed = time.perf_counter() - started
+
+    assert text != PLACEHOLDER_REPLY and len(text.split()) == 5
+    assert elapsed >= 0.05
+    assert client.model_id == "sim"
+
+
+@pytest.mark.asyncio
+async def test_single_instance_lock_serializes_even_with_concurrency() -> None:
+    client = _sim_client(LLM_CONCURRENCY=2)
+
+    started = time.perf_counter()
+    await asyncio.gather(client.generate("uno"), client.generate("dos"))
+
+    assert time.perf_counter() - started >= 0.2
+
+
+@pytest.mark.asyncio
+async def test_stream_yields_one_chunk_per_token() -> None:
+    client = _sim_client()
+
+    chunks = [c async for c in client.generate_stream("hola")]
+
+    assert len(chunks) == 10
+    assert "".join(chunks).endswith(".")
+
+
+def test_lazy_load_reports_loading_until_ready() -> None:
+    client = _sim_client(LLM_LAZY_LOAD=True, LLM_SIM_LOAD_S=0.2)
+
+    assert client.state == "loading"
+    assert client.wait_ready(timeout=5)
+    assert client.readiness()["ready"]
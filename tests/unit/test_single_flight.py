@@ -0,0 +1,80 @@
+"""Pruebas de la coalescencia de consultas idénticas concurrentes (single-flight)."""
+
+import asyncio
+
+import pytest
+
+from services.orchestrator.schema import ChatRequest, ChatResponse
+from services.orchestrator.service import ChatOrchestrator
+
+QUESTION = "¿Cuál es la capital de Marte?"
+
+
+class _SlowLLM:
+    model_id = "fake"
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def generate(self, prompt: str, **kwargs) -> str:
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        return "No hay información municipal sobre Marte."
+
+    async def generate_stream(self, prompt: str, **kwargs):
+        self.calls += 1
+        for part in ("No hay información ", "municipal sobre Marte."):
+            await asyncio.sleep(0.03)
+            yield part
+
+
+def _orchestrator() -> tuple[ChatOrchestrator, _SlowLLM]:
+    orchestrator = ChatOrchestrator()
+    orchestrator._answers = None  # aislar del cache de respuestas
+    llm = _SlowLLM()
+    orchestrator._llm = llm  # type: ignore[assignment]
+    return orchestrator, llm
+
+
+@pytest.mark.asyncio
+async def test_concurrent_duplicates_share_one_generation_with_own_session_ids() -> None:
+    orchestrator, llm = _orchestrator()
+
+    responses = await asyncio.gather(
+        *(orchestrator.respond(ChatRequest(session_id=f"s{i}", message=QUESTION if i % 2 else QUESTION.upper())) for i in range(6))
+    )
+
+    assert llm.calls == 1
+    assert [r.session_id for r in responses] == [f"s{i}" for i in range(6)]
+    assert len({r.reply for r in responses}) == 1
+    assert orchestrator._flights.stats()["coalesced"] == 5
+
+
+@pytest.mark.asyncio
+async def test_stream_leader_feeds_message_waiters() -> None:
+    orchestrator, llm = _orchestrator()
+
+    async def _stream() -> list:
+        return [item async for item in orchestrator.respond_stream(ChatRequest(session_id="lead", message=QUESTION))]
+
+    streamed, waiter = await asyncio.gather(_stream(), orchestrator.respond(ChatRequest(session_id="w", message=QUESTION)))
+
+    assert llm.calls == 1
+    assert isinstance(streamed[-1], ChatResponse) and streamed[-1].session_id == "lead"
+    assert waiter.session_id == "w" and waiter.reply == streamed[-1].reply
+
+
+@pytest.mark.asyncio
+async def test_aborted_stream_leader_lets_waiters_compute_their_own() -> None:
+    orchestrator, llm = _orchestrator()
+    stream = orchestrator.respond_stream(ChatRequest(session_id="lead", message=QUESTION))
+    await stream.__anext__()  # líder registrado y generando
+
+    waiter = asyncio.create_task(orchestrator.respond(ChatRequest(session_id="w", message=QUESTION)))
+    await asyncio.sleep(0)
+    await stream.aclose()
+    response = await waiter
+
+    assert response.session_id == "w" and response.source == "llm"
+    assert llm.calls == 2
+    assert orchestrator._flights.stats() == {"inflight": 0, "leaders": 2, "coalesced": 1, "aborted": 1}
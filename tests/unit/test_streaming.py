@@ -0,0 +1,98 @@
+"""Pruebas del camino streaming (orquestador y endpoint SSE)."""
+
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from services.api.main import create_app
+from services.orchestrator.schema import ChatRequest, ChatResponse
+from services.orchestrator.service import ChatOrchestrator
+
+
+class _FakeStreamingLLM:
+    def __init__(self, chunks: list[str]) -> None:
+        self.chunks = chunks
+
+    async def generate(self, prompt: str, **kwargs) -> str:
+        return "".join(self.chunks)
+
+    async def generate_stream(self, prompt: str, **kwargs):
+        for chunk in self.chunks:
+            yield chunk
+
+
+@pytest.mark.asyncio
+async def test_stream_rule_is_single_event() -> None:
+    orchestrator = ChatOrchestrator()
+    request = ChatRequest(session_id="s", message="¿Cuál es el horario de atención?", channel="web")
+
+    items = [item async for item in orchestrator.respond_stream(request)]
+
+    assert len(items) == 1
+    assert isinstance(items[0], ChatResponse)
+    assert items[0].source == "faq"
+
+
+@pytest.mark.asyncio
+async def test_stream_llm_matches_batch_reply() -> None:
+    chunks = ["Resp", "uesta: meta\nHola ", "vecino.\n```py", "\nx\n```\nChau"]
+    orchestrator = ChatOrchestrator()
+    orchestrator._llm = _FakeStreamingLLM(chunks)  # type: ignore[assignment]
+    request = ChatRequest(session_id="free", message="contame algo", channel="mar2")
+
+    items = [item async for item in orchestrator.respond_stream(request)]
+    batch = await orchestrator.respond(request)
+
+    *deltas, final = items
+    assert isinstance(final, ChatResponse)
+    assert final.source == "llm"
+    assert "".join(deltas) == final.reply == batch.reply
+    assert "Respuesta" not in final.reply
+
+
+def test_sse_endpoint_sends_done_event() -> None:
+    client = TestClient(create_app())
+
+    with client.stream(
+        "POST", "/chat/stream", json={"session_id": "sse", "message": "hola", "channel": "web"}
+    ) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        body = "".join(response.iter_text())
+
+    frames = [f for f in body.split("\n\n") if f.strip()]
+    event, data = frames[-1].split("\n", 1)
+    assert event == "event: done"
+    payload = json.loads(data.removeprefix("data: "))
+    assert payload["session_id"] == "sse"
+
+
+def test_websocket_multiplexes_sessions() -> None:
+    client = TestClient(create_app())
+
+    with client.websocket_connect("/chat/ws") as ws:
+        ws.send_json({"type": "ping"})
+        assert ws.receive_json() == {"type": "pong"}
+        ws.send_json({"type": "message", "id": "a", "session_id": "s1", "message": "¿Cuál es el horario de atención?"})
+        ws.send_json({"type": "message", "id": "b", "session_id": "s2", "message": "hola"})
+        done = {}
+        while len(done) < 2:
+            frame = ws.receive_json()
+            if frame["type"] == "done":
+                done[frame["id"]] = frame
+
+    assert done["a"]["session_id"] == "s1"
+    assert done["a"]["source"] == "faq"
+    assert done["b"]["session_id"] == "s2"
+
+
+def test_websocket_rejects_invalid_frame() -> None:
+    client = TestClient(create_app())
+
+    with client.websocket_connect("/chat/ws") as ws:
+        ws.send_json({"type": "message", "id": "x", "session_id": "s"})
+        frame = ws.receive_json()
+
+    assert frame["type"] == "error"
+    assert frame["id"] == "x"
@@ -0,0 +1,48 @@
+"""Pruebas de trazas OpenTelemetry (no-op sin configurar; exportador en memoria si está el SDK)."""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from services.observability import tracing
+
+
+def test_disabled_tracing_is_a_shared_noop() -> None:
+    assert tracing.configure_tracing(mode="0") is False
+
+    with tracing.span("x", {"a": 1}) as current:
+        tracing.set_attributes({"b": 2})
+
+    assert current is tracing.NOOP_SPAN
+    assert tracing.start_span("y") is tracing.NOOP_SPAN
+
+
+def test_spans_cover_request_stages_and_rag() -> None:
+    pytest.importorskip("opentelemetry.sdk")
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+    from services.api.main import create_app
+
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    assert tracing.configure_tracing(provider)
+    try:
+        client = TestClient(create_app())
+        resp = client.post(
+            "/chat/message",
+            json={"session_id": "t", "message": "¿Dónde pago la tasa de abasto?", "channel": "web"},
+        )
+    finally:
+        tracing.configure_tracing(mode="0")
+
+    assert resp.status_code == 200
+    spans = {s.name: s for s in exporter.get_finished_spans()}
+    assert "POST /chat/message" in spans
+    assert {"webchatbot.settings", "webchatbot.classify"} <= spans.keys()
+    server = spans["POST /chat/message"]
+    assert spans["webchatbot.settings"].parent.span_id == server.context.span_id
+    rag_spans = [s for s in spans.values() if "rag.best_score" in (s.attributes or {})]
+    assert rag_spans, "la consulta debe pasar por la búsqueda RAG"
+    assert all("rag.hits" in s.attributes for s in rag_spans)